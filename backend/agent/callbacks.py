@@ -0,0 +1,53 @@
+from langchain_core.callbacks import BaseCallbackHandler
+from core.metrics import AGENT_TOOL_ERRORS, AGENT_TOOL_SECONDS, LLM_ERRORS, LLM_SECONDS, LLM_TOKENS
+from core.tracing import record
+import time
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times the agent's tool and LLM calls into Prometheus metrics and the request trace."""
+
+    run_inline = True  # Called in the agent's own context, so spans reach the request trace
+
+    def __init__(self, model: str):
+        self.model = model
+        self._started: dict = {}  # run_id -> (name, start time)
+
+    def _start(self, run_id, name: str):
+        self._started[run_id] = (name, time.perf_counter())
+
+    def _finish(self, run_id) -> tuple[str, float]:
+        name, started = self._started.pop(run_id, ("unknown", time.perf_counter()))
+        return name, time.perf_counter() - started
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, (serialized or {}).get("name", "unknown"))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        tool, seconds = self._finish(run_id)
+        record(f"tool.{tool}", seconds, AGENT_TOOL_SECONDS, tool=tool)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        tool, seconds = self._finish(run_id)
+        record(f"tool.{tool}", seconds, AGENT_TOOL_SECONDS, tool=tool)
+        AGENT_TOOL_ERRORS.labels(tool=tool).inc()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, self.model)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, self.model)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model, seconds = self._finish(run_id)
+        record(f"llm.{model}", seconds, LLM_SECONDS, model=model)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_TOKENS.labels(model=model, type="input").inc(usage.get("input_tokens", 0))
+                    LLM_TOKENS.labels(model=model, type="output").inc(usage.get("output_tokens", 0))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        model, seconds = self._finish(run_id)
+        record(f"llm.{model}", seconds, LLM_SECONDS, model=model)
+        LLM_ERRORS.labels(model=model).inc()
\ No newline at end of file
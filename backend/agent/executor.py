@@ -1,29 +1,33 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 from agent.prompt import get_agent_prompt
+from agent.callbacks import MetricsCallbackHandler
 from tools.pdf_tool import PDFSearchTool
 from tools.web_tool import WebSearchTool
 from tools.google_tool import GoogleSearchTool
+from tools.knowledge_tool import KnowledgeSearchTool
 from core.config import get_settings
-from functools import lru_cache
 
-@lru_cache()
-def get_agent_executor() -> AgentExecutor:
-    """Singleton agent executor."""
+def build_agent_executor(services) -> AgentExecutor:
+    """Agent executor whose tools search through the app's shared services (a ServiceContainer)."""
     settings = get_settings()
+    model = "gemini-2.5-pro"
+    metrics = [MetricsCallbackHandler(model)]  # Times every LLM and tool call
     
     # Initialize LLM
     llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-pro",
+        model=model,
         max_retries=2,
-        google_api_key=settings.gemini_api_key
+        google_api_key=settings.gemini_api_key,
+        callbacks=metrics
     )
     
     # Initialize tools
     tools = [
-        GoogleSearchTool(),
-        PDFSearchTool(),
-        WebSearchTool()
+        KnowledgeSearchTool(search_service=services.search_service, callbacks=metrics),
+        GoogleSearchTool(callbacks=metrics),
+        PDFSearchTool(pdf_service=services.pdf_service, callbacks=metrics),
+        WebSearchTool(web_service=services.web_service, callbacks=metrics)
     ]
     
     # Create agent
@@ -24,15 +24,21 @@ def get_agent_prompt() -> ChatPromptTemplate:
 {utc_now}
 
 --- TOOL CAPABILITIES ---
-You have access to three tools:
+You have access to four tools:
 
-1. pdf_search → Search uploaded PDFs stored in the knowledge base
+1. knowledge_search → Search uploaded PDFs and added web pages together in one call
+   - Results are ranked across both and labeled with their collection and source
+   - Preferred first step for any knowledge-base question
+
+2. pdf_search → Search uploaded PDFs stored in the knowledge base
+   - Can be restricted to one PDF (source filename) and/or a page range
    - Cannot read new PDFs from chat; users must upload via sidebar first
 
-2. web_data_search → Search web pages added to the knowledge base
+3. web_data_search → Search web pages added to the knowledge base
+   - Can be restricted to one page (url) or one site (domain)
    - Cannot fetch new URLs from chat; users must add via sidebar first
 
-3. google_search → Perform live Google searches for fresh information
+4. google_search → Perform live Google searches for fresh information
    - Most powerful for recency, news, and fact-checking
 
 --- DATE AWARENESS ---
@@ -42,8 +48,8 @@ You have access to three tools:
 - Politely correct users if they provide conflicting dates
 
 --- TOOL USAGE STRATEGY ---
-- Use PDF Search for questions about uploaded PDFs
-- Use Web Data Search for questions about added web pages
+- Use Knowledge Search for questions about uploaded PDFs or added web pages
+- Use PDF Search or Web Data Search only when the user wants one source type
 - Use Google Search proactively for fresh info or when in doubt
 - If new URLs/PDFs mentioned in chat, inform user to add via sidebar
 
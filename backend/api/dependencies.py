@@ -1,16 +1,22 @@
-from functools import lru_cache
-from agent.executor import get_agent_executor
+from fastapi import Depends, Request
+from services.container import ServiceContainer
 from services.pdf_service import PDFService
 from services.web_service import WebService
+from services.search_service import KnowledgeSearchService
+from services.storage import StorageService
 
-@lru_cache()
-def get_pdf_service() -> PDFService:
-    return PDFService()
+def get_services(request: Request) -> ServiceContainer:
+    """The app's service container (built at startup, see api.main)."""
+    return request.app.state.services
 
-@lru_cache()
-def get_web_service() -> WebService:
-    return WebService()
+def get_pdf_service(services: ServiceContainer = Depends(get_services)) -> PDFService:
+    return services.pdf_service
 
-@lru_cache()
-def get_agent():
-    return get_agent_executor()
\ No newline at end of file
+def get_web_service(services: ServiceContainer = Depends(get_services)) -> WebService:
+    return services.web_service
+
+def get_search_service(services: ServiceContainer = Depends(get_services)) -> KnowledgeSearchService:
+    return services.search_service
+
+def get_storage_service(services: ServiceContainer = Depends(get_services)) -> StorageService:
+    return services.storage_service
\ No newline at end of file
@@ -1,10 +1,19 @@
-from api.routes import health, pdf, web, agent
-from fastapi import FastAPI
+from api.routes import health, pdf, web, agent, jobs, search
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_fastapi_instrumentator import Instrumentator
 from core.config import get_settings
 from core.logging import setup_logging
+from core.tracing import server_timing, trace
+from services.jobs import get_job_manager
+from services.crawler import get_crawler
+from services.container import ServiceContainer
+from services.lexical_index import claim_lexical_index_directory
+from services.near_duplicates import claim_near_duplicate_directory
+from services.registry import get_ingestion_registry
+import asyncio
 import logging
+import time
 
 # Create app
 app = FastAPI(
@@ -19,11 +28,31 @@ async def startup_event():
     setup_logging(settings.log_level, settings.log_file)
     logger = logging.getLogger(__name__)
     logger.info(f"Starting OmniKnow API [Environment: {settings.environment}, Vector Store: {settings.vector_store_type}]")
+    if settings.lexical_index_enabled:
+        claim_lexical_index_directory()  # A second worker fails to boot here rather than serving a diverging index
+    if settings.near_duplicate_detection:
+        claim_near_duplicate_directory()
+    app.state.services = ServiceContainer()  # Shared by all requests and agent tools
+    get_job_manager()  # Start ingestion workers
+    
+    if settings.web_refresh_interval_minutes > 0:
+        app.state.web_refresh_task = asyncio.create_task(
+            web.refresh_periodically(app.state.services.web_service, settings.web_refresh_interval_minutes * 60)
+        )
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger = logging.getLogger(__name__)
     logger.info("Shutting down OmniKnow API")
+    if getattr(app.state, "web_refresh_task", None):
+        app.state.web_refresh_task.cancel()
+    get_job_manager().shutdown()
+    if get_crawler.cache_info().currsize:
+        get_crawler().close()  # Close pooled crawl connections
+    if get_ingestion_registry.cache_info().currsize:
+        get_ingestion_registry().close()
+    if getattr(app.state, "services", None):
+        app.state.services.close()  # After the jobs that use them have finished
 
 # CORS configuration
 settings = get_settings()
@@ -49,8 +78,22 @@ app.add_middleware(
 # Prometheus metrics
 Instrumentator().instrument(app).expose(app)
 
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next):
+    """Per-request stage timings (embedding, search, tools, LLM, ...) in a Server-Timing header, when enabled."""
+    if not settings.request_timings_enabled:
+        return await call_next(request)
+    
+    started = time.perf_counter()
+    with trace() as spans:
+        response = await call_next(request)
+    response.headers["Server-Timing"] = server_timing(spans, total=time.perf_counter() - started)
+    return response
+
 # Include routers
 app.include_router(health.router)
 app.include_router(pdf.router)
 app.include_router(web.router)
-app.include_router(agent.router)
\ No newline at end of file
+app.include_router(agent.router)
+app.include_router(jobs.router)
+app.include_router(search.router)
\ No newline at end of file
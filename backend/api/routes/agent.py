@@ -1,18 +1,20 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from models.schemas import QueryRequest
-from agent.executor import get_agent_executor
+from api.dependencies import get_services
+from services.container import ServiceContainer
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/agent", tags=["Agent"])
 
 @router.post("/chat")
-async def chat(request: QueryRequest):
+async def chat(request: QueryRequest, services: ServiceContainer = Depends(get_services)):
     """Chat with the RAG agent."""
     try:
-        agent_executor = get_agent_executor()
+        agent_executor = services.agent_executor
         
-        result = agent_executor.invoke({
+        # Async path: tool calls await vector store searches instead of blocking the worker
+        result = await agent_executor.ainvoke({
             "input": request.input,
             "chat_history": []  # Simplified for now
         })
@@ -0,0 +1,14 @@
+from dataclasses import asdict
+from fastapi import APIRouter, HTTPException
+from models.schemas import JobStatusResponse
+from services.jobs import get_job_manager
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+@router.get("/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """Get ingestion job status and progress."""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return JobStatusResponse(**asdict(job))
\ No newline at end of file
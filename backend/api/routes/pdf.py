@@ -1,72 +1,203 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from concurrent.futures import wait
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pathlib import Path
-from models.schemas import QueryRequest, PDFUploadResponse, SearchResponse
-from services.pdf_service import PDFService
+from typing import Callable
+from core.config import get_settings
+from api.dependencies import get_pdf_service, get_storage_service
+from models.schemas import PDFSearchRequest, PDFUploadResponse, SearchResponse, IngestedSource, SourceListResponse, SourceDeleteResponse
+from services.pdf_service import PDFService, pdf_filter
 from services.storage import StorageService
+from services.staging import get_staging_cache
+from services.upload import receive_upload, SpooledUpload, UploadTooLargeError, InvalidUploadError
+from services.jobs import get_job_manager, JobQueueFullError
+from services.ingestion import ingestion_stage
+from services.vector_store import run_blocking
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/pdf", tags=["PDF"])
 
-# Initialize pdf service
-def get_pdf_service():
-    return PDFService()
-
-# Storage management
-def get_storage_service():
-    return StorageService()
-
-@router.post("/upload", response_model=PDFUploadResponse)
+@router.post(
+    "/upload",
+    response_model=PDFUploadResponse,
+    status_code=202,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {"file": {"type": "string", "format": "binary"}}
+                    }
+                }
+            }
+        }
+    }
+)
 async def upload_pdf(
-    file: UploadFile = File(...),
-    force_reprocess: bool = False
+    request: Request,
+    force_reprocess: bool = False,
+    revision_of: str | None = None,
+    pdf_service: PDFService = Depends(get_pdf_service),
+    storage_service: StorageService = Depends(get_storage_service)
 ):
-    """Upload and process PDF."""
-    if not file.filename.endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Only PDF files allowed")
+    """
+    Upload PDF and queue it for processing (poll /jobs/{job_id} for status).
     
-    # Instantiate services when needed
-    storage_service = get_storage_service()
-    pdf_service = get_pdf_service()
+    With revision_of=<filename>, the PDF is a new revision of that processed
+    document and only its changed pages are re-embedded.
+    """
+    settings = get_settings()
     
-    # Read file content
-    content = await file.read()
+    # Stream body to a local spool file, hashing as it arrives
+    staging = get_staging_cache()
+    try:
+        with ingestion_stage("pdf", "receive"):
+            upload = await receive_upload(
+                request,
+                settings.upload_spool_directory or staging.incoming_dir,
+                settings.max_upload_size
+            )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Save to storage
-    storage_path = storage_service.save_file(file.filename, content)
-    logger.info(f"Saved PDF: {storage_path}")
+    if revision_of and pdf_service.registry.find_by_name("pdf", revision_of) is None:
+        upload.path.unlink(missing_ok=True)
+        raise HTTPException(status_code=404, detail=f"No processed PDF named '{revision_of}' to revise")
+    
+    # Reject known duplicates before anything is written to storage
+    if not force_reprocess and pdf_service._is_already_processed(upload.sha256):
+        upload.path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=409,
+            detail=f"PDF '{upload.filename}' has already been processed. Use force_reprocess=True to override."
+        )
+    
+    # Pin the staged file until the ingestion job has finished with it
+    staging.pin(upload.sha256)
+    staged_path = staging.put(upload.path, upload.sha256)
     
     try:
-        # Get path for processing
-        processing_path = storage_service.get_file_path(file.filename)
-        
-        # Process PDF
-        chunks_stored = pdf_service.process_pdf(Path(processing_path), force_reprocess=force_reprocess)
-        
-        return PDFUploadResponse(
-            message="PDF uploaded and processed successfully",
-            filename=file.filename,
-            chunks_stored=chunks_stored
+        job = get_job_manager().submit(
+            "pdf",
+            upload.filename,
+            _ingest_uploaded_pdf,
+            pdf_service,
+            storage_service,
+            staged_path,
+            upload,
+            force_reprocess,
+            revision_of
         )
-    except ValueError as e:
-        raise HTTPException(status_code=409, detail=str(e))
-    except Exception as e:
-        logger.exception("PDF processing failed")
-        raise HTTPException(status_code=500, detail=f"PDF processing failed: {str(e)}")
+    except JobQueueFullError as e:
+        staging.unpin(upload.sha256)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    
+    return PDFUploadResponse(
+        message="PDF upload accepted for processing",
+        filename=upload.filename,
+        job_id=job.job_id,
+        status=job.status
+    )
 
-@router.post("/search", response_model=SearchResponse)
-async def search_pdf(request: QueryRequest):
-    """Search PDF knowledge base."""
-    pdf_service = get_pdf_service()
+def _ingest_uploaded_pdf(
+    pdf_service: PDFService,
+    storage_service: StorageService,
+    staged_path: Path,
+    upload: SpooledUpload,
+    force_reprocess: bool,
+    revision_of: str | None,
+    progress: Callable
+) -> dict:
+    """
+    Ingestion job: process the staged PDF while the storage upload runs concurrently.
     
+    A failed upload doesn't fail the job once the PDF is ingested (its chunks
+    are already searchable); it is reported in the result's storage_error.
+    """
     try:
-        results = pdf_service.search(request.input, k=5)
+        save_future = storage_service.save_file_async(upload.filename, staged_path)
+        try:
+            chunks_stored = pdf_service.process_pdf(
+                staged_path,
+                force_reprocess=force_reprocess,
+                pdf_hash=upload.sha256,
+                filename=upload.filename,
+                progress=progress,
+                revision_of=revision_of
+            )
+        except BaseException:
+            # Keep the processing error; an upload already reading the pinned file is left to finish
+            if not save_future.cancel():
+                wait([save_future])
+            raise
+        
+        result = {
+            "filename": upload.filename,
+            "revision_of": revision_of,
+            "chunks_stored": chunks_stored,
+            "storage_path": None
+        }
+        try:
+            with ingestion_stage("pdf", "storage_wait"):
+                result["storage_path"] = save_future.result()
+            logger.info(f"Saved PDF: {result['storage_path']}")
+        except Exception as e:
+            logger.exception(f"Storage upload of ingested PDF '{upload.filename}' failed")
+            result["storage_error"] = str(e)
+        return result
+    finally:
+        get_staging_cache().unpin(upload.sha256)
+
+@router.post("/search", response_model=SearchResponse)
+async def search_pdf(request: PDFSearchRequest, pdf_service: PDFService = Depends(get_pdf_service)):
+    """Search PDF knowledge base, optionally within one document or page range."""
+    try:
+        filter = pdf_filter(request.source, request.pdf_hash, request.page_from, request.page_to)
+        results = await pdf_service.asearch(request.input, k=5, mode=request.mode, filter=filter)
         
         return SearchResponse(
             query=request.input,
             results=results,
             num_results=len(results)
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.exception("PDF search failed")
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+@router.get("/documents", response_model=SourceListResponse)
+async def list_documents(pdf_service: PDFService = Depends(get_pdf_service)):
+    """List processed PDFs."""
+    sources = [
+        IngestedSource(
+            key=record.key,
+            name=record.name,
+            status=record.status,
+            chunks_count=record.chunks_count,
+            created_at=record.created_at,
+            updated_at=record.updated_at
+        )
+        for record in pdf_service.list_documents()
+    ]
+    return SourceListResponse(sources=sources, num_sources=len(sources))
+
+@router.delete("/{pdf_hash}", response_model=SourceDeleteResponse)
+async def delete_document(pdf_hash: str, pdf_service: PDFService = Depends(get_pdf_service)):
+    """Delete a processed PDF and all of its chunks."""
+    try:
+        chunks_deleted = await run_blocking(pdf_service.delete_document, pdf_hash)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"PDF '{pdf_hash}' not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.exception("PDF delete failed")
+        raise HTTPException(status_code=500, detail=f"Delete failed: {str(e)}")
+    
+    return SourceDeleteResponse(message="PDF deleted", key=pdf_hash, chunks_deleted=chunks_deleted)
\ No newline at end of file
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from models.schemas import KnowledgeSearchRequest, SearchResponse
+from services.search_service import KnowledgeSearchService
+from api.dependencies import get_search_service
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["Search"])
+
+@router.post("/search", response_model=SearchResponse)
+async def search_knowledge(
+    request: KnowledgeSearchRequest,
+    search_service: KnowledgeSearchService = Depends(get_search_service)
+):
+    """Search PDFs and web pages together, ranked as one list."""
+    try:
+        results = await search_service.asearch(request.input, k=request.k, mode=request.mode, sources=request.sources)
+        
+        return SearchResponse(
+            query=request.input,
+            results=results,
+            num_results=len(results)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Knowledge search failed")
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
\ No newline at end of file
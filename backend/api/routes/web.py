@@ -1,54 +1,177 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException
-from models.schemas import WebDataRequest, QueryRequest, SearchResponse
-from services.web_service import WebService
+from fastapi import APIRouter, Depends, HTTPException
+from models.schemas import WebDataRequest, CrawlRequest, WebScrapeResponse, JobAcceptedResponse, WebSearchRequest, SearchResponse, IngestedSource, SourceListResponse, SourceDeleteResponse
+from services.web_service import WebService, web_filter
+from services.crawler import CrawlPlan
+from core.config import get_settings
+from services.jobs import get_job_manager, JobQueueFullError
+from services.vector_store import run_blocking
+from api.dependencies import get_web_service
+import asyncio
 import logging
+import os
+import socket
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/web", tags=["Web"])
 
-# Initialize web service
-def get_web_service():
-    return WebService()
-
-@router.post("/scrape")
+@router.post("/scrape", response_model=WebScrapeResponse, status_code=202)
 async def scrape_url(
     request: WebDataRequest,
-    background_tasks: BackgroundTasks,
-    force_reprocess: bool = False
+    force_reprocess: bool = False,
+    web_service: WebService = Depends(get_web_service)
 ):
-    """Scrape and store web page."""
-    web_service = get_web_service()
+    """Queue a web page for scraping (poll /jobs/{job_id} for status)."""
+    url = str(request.url)
     
-    try:
-        # Queue scraping task with force flag
-        background_tasks.add_task(
-            web_service.process_url,
-            str(request.url),
-            force_reprocess
+    # Duplicate detected
+    if not force_reprocess and web_service._is_already_processed(web_service._calculate_url_hash(url)):
+        raise HTTPException(
+            status_code=409,
+            detail=f"URL '{url}' has already been processed. Use force_reprocess=True to override."
         )
-        
-        logger.info(f"Scraping queued for: {request.url}")
-        return {"message": f"Scraping started for {request.url}"}
-    except ValueError as e:
-        # Duplicate detected
-        raise HTTPException(status_code=409, detail=str(e))
-    except Exception as e:
-        logger.exception("URL scraping failed")
-        raise HTTPException(status_code=500, detail=f"Scraping failed: {str(e)}")
+    
+    try:
+        # Queue scraping job with force flag
+        job = get_job_manager().submit("web", url, web_service.process_url, url, force_reprocess)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    
+    logger.info(f"Scraping queued for: {url} (job {job.job_id})")
+    return WebScrapeResponse(
+        message=f"Scraping started for {url}",
+        url=url,
+        job_id=job.job_id,
+        status=job.status
+    )
 
-@router.post("/search", response_model=SearchResponse)
-async def search_web(request: QueryRequest):
-    """Search web knowledge base."""
-    web_service = get_web_service()
+@router.post("/crawl", response_model=JobAcceptedResponse, status_code=202)
+async def crawl(request: CrawlRequest, web_service: WebService = Depends(get_web_service)):
+    """Queue a crawl of a URL list, or of a seed URL's site via its sitemap and/or links."""
+    seeds = [str(url) for url in request.urls] + ([str(request.seed_url)] if request.seed_url else [])
+    if not seeds:
+        raise HTTPException(status_code=400, detail="Provide urls or a seed_url")
+    
+    max_pages = min(request.max_pages, get_settings().crawl_max_pages)
+    if not request.seed_url:
+        max_pages = min(max_pages, len(seeds))  # URL list only: nothing is discovered
+    plan = CrawlPlan(
+        seeds=seeds,
+        use_sitemap=request.use_sitemap and request.seed_url is not None,
+        follow_links=request.follow_links and request.seed_url is not None,
+        max_depth=request.max_depth,
+        max_pages=max_pages
+    )
+    
+    description = str(request.seed_url) if request.seed_url else f"{len(seeds)} URLs"
+    try:
+        job = get_job_manager().submit("web-crawl", description, web_service.crawl, plan, request.force_reprocess)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    
+    logger.info(f"Crawl queued for: {description} (job {job.job_id})")
+    return JobAcceptedResponse(message=f"Crawl started for {description}", job_id=job.job_id, status=job.status)
+
+@router.post("/refresh", response_model=WebScrapeResponse, status_code=202)
+async def refresh_url(request: WebDataRequest, web_service: WebService = Depends(get_web_service)):
+    """Queue a conditional refresh of a web page; only changed chunks are re-embedded."""
+    url = str(request.url)
+    
+    try:
+        job = get_job_manager().submit("web-refresh", url, web_service.refresh_url, url)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
     
+    logger.info(f"Refresh queued for: {url} (job {job.job_id})")
+    return WebScrapeResponse(
+        message=f"Refresh started for {url}",
+        url=url,
+        job_id=job.job_id,
+        status=job.status
+    )
+
+@router.post("/refresh-all", response_model=JobAcceptedResponse, status_code=202)
+async def refresh_all(web_service: WebService = Depends(get_web_service)):
+    """Queue a conditional refresh of every tracked web page."""
     try:
-        results = web_service.search(request.input, k=10)
+        job = submit_refresh_all(web_service)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    
+    return JobAcceptedResponse(message="Refresh started for all tracked web pages", job_id=job.job_id, status=job.status)
+
+def submit_refresh_all(web_service: WebService):
+    """Queue a bulk refresh job."""
+    job = get_job_manager().submit("web-refresh", "all tracked pages", web_service.refresh_all)
+    logger.info(f"Bulk refresh queued (job {job.job_id})")
+    return job
+
+async def refresh_periodically(web_service: WebService, interval_seconds: float):
+    """
+    Queue a bulk refresh every interval (started at app startup when configured).
+    
+    Every worker runs this loop, but only the holder of the registry's
+    "web_refresh" lease queues refreshes. The lease lasts two intervals and
+    is renewed each round, so another worker takes over if the holder stops.
+    """
+    holder = f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            if not await asyncio.to_thread(web_service.registry.acquire_lease, "web_refresh", holder, interval_seconds * 2):
+                continue
+        except Exception:
+            logger.exception("Scheduled web refresh skipped: could not check the refresh lease")
+            continue
+        try:
+            submit_refresh_all(web_service)
+        except JobQueueFullError:
+            logger.warning("Scheduled web refresh skipped: ingestion queue is full")
+
+@router.post("/search", response_model=SearchResponse)
+async def search_web(request: WebSearchRequest, web_service: WebService = Depends(get_web_service)):
+    """Search web knowledge base, optionally within one page or site."""
+    try:
+        filter = web_filter(request.url, request.url_hash, request.domain)
+        results = await web_service.asearch(request.input, k=10, mode=request.mode, filter=filter)
         
         return SearchResponse(
             query=request.input,
             results=results,
             num_results=len(results)
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.exception("Web search failed")
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+@router.get("/pages", response_model=SourceListResponse)
+async def list_pages(web_service: WebService = Depends(get_web_service)):
+    """List processed web pages."""
+    sources = [
+        IngestedSource(
+            key=record.key,
+            name=record.name,
+            status=record.status,
+            chunks_count=record.chunks_count,
+            created_at=record.created_at,
+            updated_at=record.updated_at
+        )
+        for record in web_service.list_pages()
+    ]
+    return SourceListResponse(sources=sources, num_sources=len(sources))
+
+@router.delete("/{url_hash}", response_model=SourceDeleteResponse)
+async def delete_page(url_hash: str, web_service: WebService = Depends(get_web_service)):
+    """Delete a processed web page and all of its chunks."""
+    try:
+        chunks_deleted = await run_blocking(web_service.delete_page, url_hash)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Web page '{url_hash}' not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.exception("Web page delete failed")
+        raise HTTPException(status_code=500, detail=f"Delete failed: {str(e)}")
+    
+    return SourceDeleteResponse(message="Web page deleted", key=url_hash, chunks_deleted=chunks_deleted)
\ No newline at end of file
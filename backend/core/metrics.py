@@ -0,0 +1,134 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Exposed on /metrics alongside the HTTP metrics from prometheus-fastapi-instrumentator
+
+# Embedding cache
+EMBEDDING_CACHE_HITS = Counter(
+    "omniknow_embedding_cache_hits_total",
+    "Texts whose embedding was served from the embedding cache",
+    ["kind"]
+)
+EMBEDDING_CACHE_MISSES = Counter(
+    "omniknow_embedding_cache_misses_total",
+    "Texts that had to be embedded by the model",
+    ["kind"]
+)
+EMBEDDING_CACHE_EVICTIONS = Counter(
+    "omniknow_embedding_cache_evictions_total",
+    "Cached embeddings evicted to stay under the size limit"
+)
+EMBEDDING_CACHE_BYTES = Gauge(
+    "omniknow_embedding_cache_bytes",
+    "Size of cached embedding vectors"
+)
+# Embedding calls, as seen by callers (cache hits and batching waits included)
+EMBEDDING_SECONDS = Histogram(
+    "omniknow_embedding_seconds",
+    "Latency of embed_query / embed_documents calls",
+    ["kind"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "omniknow_embedding_batch_size",
+    "Texts per embed_documents call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+)
+# Query embedding micro-batching
+EMBEDDING_QUERY_BATCH_SIZE = Histogram(
+    "omniknow_embedding_query_batch_size",
+    "Queries embedded per model call by the micro-batching scheduler",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+EMBEDDING_QUERY_QUEUE_WAIT = Histogram(
+    "omniknow_embedding_query_queue_wait_seconds",
+    "Time a query waited for its batch to start",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+# Pinecone upserts
+PINECONE_UPSERTED_VECTORS = Counter(
+    "omniknow_pinecone_upserted_vectors_total",
+    "Vectors upserted to Pinecone"
+)
+PINECONE_UPSERT_RETRIES = Counter(
+    "omniknow_pinecone_upsert_retries_total",
+    "Pinecone upsert requests retried after a failure"
+)
+PINECONE_UPSERT_SECONDS = Histogram(
+    "omniknow_pinecone_upsert_seconds",
+    "Latency of successful Pinecone upsert requests",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+# Vector stores
+VECTOR_STORE_SECONDS = Histogram(
+    "omniknow_vector_store_seconds",
+    "Latency of vector store operations (upserts include embedding the batch)",
+    ["backend", "collection", "operation"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+VECTOR_STORE_ERRORS = Counter(
+    "omniknow_vector_store_errors_total",
+    "Vector store operations that raised",
+    ["backend", "collection", "operation"]
+)
+VECTOR_STORE_DOCUMENTS = Counter(
+    "omniknow_vector_store_documents_total",
+    "Chunks upserted into or deleted from vector stores",
+    ["backend", "collection", "operation"]
+)
+# Ingestion
+INGESTION_STAGE_SECONDS = Histogram(
+    "omniknow_ingestion_stage_seconds",
+    "Time one ingestion spent in each stage (fetch, extract, parse, split, store, cleanup, ...)",
+    ["source", "stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+INGESTION_STAGE_ITEMS = Counter(
+    "omniknow_ingestion_stage_items_total",
+    "Items through each ingestion stage (pages parsed, chunks split, chunks stored)",
+    ["source", "stage"]
+)
+INGESTION_STAGE_ERRORS = Counter(
+    "omniknow_ingestion_stage_errors_total",
+    "Ingestion stages that raised",
+    ["source", "stage"]
+)
+INGESTION_JOB_SECONDS = Histogram(
+    "omniknow_ingestion_job_seconds",
+    "Run time of ingestion jobs, end to end",
+    ["kind", "status"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+STORAGE_UPLOAD_SECONDS = Histogram(
+    "omniknow_storage_upload_seconds",
+    "Time to save an uploaded file to storage",
+    ["backend"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+# Agent
+AGENT_TOOL_SECONDS = Histogram(
+    "omniknow_agent_tool_seconds",
+    "Latency of agent tool calls",
+    ["tool"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+AGENT_TOOL_ERRORS = Counter(
+    "omniknow_agent_tool_errors_total",
+    "Agent tool calls that raised",
+    ["tool"]
+)
+LLM_SECONDS = Histogram(
+    "omniknow_llm_seconds",
+    "Latency of LLM calls made by the agent",
+    ["model"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+)
+LLM_ERRORS = Counter(
+    "omniknow_llm_errors_total",
+    "LLM calls that raised",
+    ["model"]
+)
+LLM_TOKENS = Counter(
+    "omniknow_llm_tokens_total",
+    "Tokens used by LLM calls, as reported by the model",
+    ["model", "type"]
+)
\ No newline at end of file
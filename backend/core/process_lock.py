@@ -0,0 +1,41 @@
+from pathlib import Path
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock; the local dev server runs a single process anyway
+    fcntl = None
+
+# Lock files held by this process, kept open (and so locked) until it exits
+_held: dict[Path, int] = {}
+_held_lock = threading.Lock()
+
+def hold_process_lock(path: Path, setting: str):
+    """
+    Take an exclusive lock on path for the rest of this process's life.
+
+    Guards on-disk state that one process keeps in memory and rewrites
+    (the lexical and near-duplicate indexes): a second process on the
+    same host, such as another gunicorn worker, is refused instead of
+    silently diverging. Calling again from the owning process is a no-op.
+    Replicas on other hosts have their own disks and are not detected.
+
+    Raises:
+        RuntimeError: If another process holds the lock
+    """
+    path = path.resolve()
+    with _held_lock:
+        if path in _held or fcntl is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise RuntimeError(
+                f"{path} is held by another process. {setting} keeps its index in one process's memory, "
+                f"so it needs a single worker (WEB_CONCURRENCY=1) and a single replica; disable it otherwise."
+            ) from None
+        _held[path] = fd
\ No newline at end of file
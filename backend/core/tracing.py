@@ -0,0 +1,65 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+import re
+import time
+
+# Spans (stage, seconds) of the request or job being traced, if any. Tasks and
+# executor calls started from the request share the same list.
+_spans: ContextVar[list | None] = ContextVar("omniknow_trace_spans", default=None)
+
+@contextmanager
+def trace():
+    """Collect the stage timings recorded while the block runs (a request, or an ingestion job)."""
+    spans = []
+    token = _spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _spans.reset(token)
+
+def record(span: str, seconds: float, histogram=None, /, **labels):
+    """Observe a duration in a Prometheus histogram (if given) and add it to the current trace (if any) as span."""
+    if histogram is not None:
+        (histogram.labels(**labels) if labels else histogram).observe(seconds)
+    if (spans := _spans.get()) is not None:
+        spans.append((span, seconds))
+
+@contextmanager
+def timed(span: str, histogram=None, errors=None, /, **labels):
+    """Time a block with record(); errors (a Counter with the same labels) counts blocks that raised."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if errors is not None:
+            (errors.labels(**labels) if labels else errors).inc()
+        raise
+    finally:
+        record(span, time.perf_counter() - started, histogram, **labels)
+
+def _by_stage(spans: list) -> dict[str, list]:
+    """Seconds and call count per stage, in order of first appearance."""
+    stages: dict[str, list] = {}
+    for stage, seconds in spans:
+        entry = stages.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    return stages
+
+def timings(spans: list, total: float | None = None) -> dict[str, float]:
+    """Seconds per stage (repeated stages summed), plus the total if given."""
+    result = {stage: round(seconds, 4) for stage, (seconds, _) in _by_stage(spans).items()}
+    if total is not None:
+        result["total"] = round(total, 4)
+    return result
+
+def server_timing(spans: list, total: float | None = None) -> str:
+    """Server-Timing header value: one metric per stage, with repeated stages summed."""
+    metrics = []
+    for stage, (seconds, count) in _by_stage(spans).items():
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", stage)
+        description = f';desc="{count} calls"' if count > 1 else ""
+        metrics.append(f"{name}{description};dur={seconds * 1000:.1f}")
+    if total is not None:
+        metrics.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(metrics)
\ No newline at end of file
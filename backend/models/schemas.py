@@ -1,22 +1,91 @@
 from pydantic import BaseModel, HttpUrl, Field
+from typing import Literal
 
 class QueryRequest(BaseModel):
     input: str = Field(..., min_length=1, max_length=50000)
     conversation_id: str | None = None
 
+class SearchRequest(QueryRequest):
+    mode: Literal["dense", "lexical", "hybrid"] = "dense"  # lexical = BM25 only, hybrid = RRF of both
+
+class PDFSearchRequest(SearchRequest):
+    source: str | None = None  # Filename, e.g. "manual_v3.pdf"
+    pdf_hash: str | None = None
+    page_from: int | None = Field(None, ge=1)
+    page_to: int | None = Field(None, ge=1)
+
+class WebSearchRequest(SearchRequest):
+    url: str | None = None
+    url_hash: str | None = None
+    domain: str | None = None  # Host, e.g. "docs.python.org"
+
+class KnowledgeSearchRequest(SearchRequest):
+    k: int = Field(8, ge=1, le=50)
+    sources: list[Literal["pdf", "web"]] = ["pdf", "web"]
+
 class WebDataRequest(BaseModel):
     url: HttpUrl
 
+class CrawlRequest(BaseModel):
+    urls: list[HttpUrl] = []  # Pages to fetch as given
+    seed_url: HttpUrl | None = None  # Start of a same-host crawl
+    use_sitemap: bool = False  # Also crawl the URLs listed in the seed host's sitemap
+    follow_links: bool = False  # Follow same-host links up to max_depth
+    max_depth: int = Field(2, ge=0, le=10)
+    max_pages: int = Field(100, ge=1)
+    force_reprocess: bool = False
+
 class PDFUploadResponse(BaseModel):
     message: str
     filename: str
-    chunks_stored: int
+    job_id: str
+    status: str
+
+class WebScrapeResponse(BaseModel):
+    message: str
+    url: str
+    job_id: str
+    status: str
+
+class JobAcceptedResponse(BaseModel):
+    message: str
+    job_id: str
+    status: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    description: str
+    status: str
+    stage: str | None = None
+    progress: dict = {}
+    result: dict | None = None
+    error: str | None = None
+    created_at: str
+    updated_at: str
 
 class SearchResponse(BaseModel):
     query: str
     results: list[dict]
     num_results: int
 
+class IngestedSource(BaseModel):
+    key: str
+    name: str
+    status: str
+    chunks_count: int
+    created_at: str
+    updated_at: str
+
+class SourceListResponse(BaseModel):
+    sources: list[IngestedSource]
+    num_sources: int
+
+class SourceDeleteResponse(BaseModel):
+    message: str
+    key: str
+    chunks_deleted: int
+
 class HealthResponse(BaseModel):
     status: str
     environment: str
@@ -0,0 +1,46 @@
+from services.vector_store import VectorStore, get_vector_store
+from services.pdf_service import PDFService
+from services.web_service import WebService
+from services.search_service import KnowledgeSearchService
+from services.storage import StorageService
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class ServiceContainer:
+    """
+    Application-scoped services, built once at startup and shared by every request and agent tool call.
+
+    All services share one vector store, so its clients, collection handles
+    and (for Pinecone) index connection are set up once instead of on every
+    call. The agent executor is built on first use, as it needs the LLM
+    credentials only chat requires.
+    """
+
+    def __init__(self, vector_store: VectorStore | None = None):
+        self.vector_store = vector_store or get_vector_store()
+        self.pdf_service = PDFService(self.vector_store)
+        self.web_service = WebService(self.vector_store)
+        self.search_service = KnowledgeSearchService(self.pdf_service, self.web_service)
+        self.storage_service = StorageService()
+        self._agent_executor = None
+        self._agent_lock = threading.Lock()
+        logger.info("Initialized service container")
+
+    @property
+    def agent_executor(self):
+        with self._agent_lock:
+            if self._agent_executor is None:
+                from agent.executor import build_agent_executor
+                self._agent_executor = build_agent_executor(self)
+            return self._agent_executor
+
+    def close(self):
+        """Close the vector store and storage clients (in-flight jobs must have finished)."""
+        for name, resource in (("vector store", self.vector_store), ("storage", self.storage_service)):
+            try:
+                resource.close()
+            except Exception:
+                logger.exception(f"Error closing {name}")
+        logger.info("Closed service container")
\ No newline at end of file
@@ -0,0 +1,306 @@
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator
+from urllib.parse import urldefrag, urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+from core.config import get_settings
+from services.web_fetch import FetchResult
+import asyncio
+import gzip
+import logging
+import queue
+import threading
+import xml.etree.ElementTree as ElementTree
+import httpx
+import lxml.html
+
+logger = logging.getLogger(__name__)
+
+# Nested sitemap indexes are followed this deep
+_MAX_SITEMAP_DEPTH = 3
+
+@dataclass
+class CrawlPlan:
+    """What to crawl: explicit URLs, or seeds expanded by sitemaps and/or same-host links."""
+    seeds: list[str]
+    use_sitemap: bool = False
+    follow_links: bool = False
+    max_depth: int = 2
+    max_pages: int = 100
+
+@dataclass
+class CrawledPage:
+    url: str
+    depth: int
+    result: FetchResult | None = None
+    error: str | None = None
+
+@dataclass
+class _HostState:
+    """Politeness state for one host: concurrent requests and spacing between them."""
+    semaphore: asyncio.Semaphore
+    delay: float
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    next_request_at: float = 0.0
+
+class Crawler:
+    """
+    Concurrent, polite page fetcher shared by all crawl jobs.
+    
+    Runs its own event loop on a background thread with one keep-alive
+    pooled httpx.AsyncClient, so connections are reused across pages and
+    across jobs. Requests are capped globally (max_concurrency) and per
+    host (per_host_concurrency, at least host_delay seconds apart, or the
+    robots.txt Crawl-delay if longer). robots.txt is fetched once per host
+    and cached for robots_ttl seconds.
+    
+    crawl() is called from a worker thread and yields pages as they are
+    fetched; a bounded hand-off queue applies backpressure when the
+    consumer (embedding and upserting) falls behind.
+    """
+    
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        per_host_concurrency: int = 2,
+        host_delay: float = 0.5,
+        timeout: float = 30.0,
+        user_agent: str = "OmniKnowBot",
+        respect_robots: bool = True,
+        robots_ttl: float = 3600
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.host_delay = host_delay
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self.robots_ttl = robots_ttl
+        
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="crawler", daemon=True)
+        self._thread.start()
+        
+        self._client = httpx.AsyncClient(
+            headers={"User-Agent": user_agent},
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        )
+        self._global = asyncio.Semaphore(self.max_concurrency)
+        self._hosts: dict[str, _HostState] = {}
+        self._robots: dict[str, tuple[float, RobotFileParser]] = {}
+        self._robots_locks: dict[str, asyncio.Lock] = {}
+    
+    def close(self):
+        """Close pooled connections and stop the event loop."""
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+    
+    # Politeness
+    
+    def _host(self, host: str) -> _HostState:
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(asyncio.Semaphore(self.per_host_concurrency), self.host_delay)
+        return self._hosts[host]
+    
+    @asynccontextmanager
+    async def _slot(self, url: str):
+        """Hold a per-host slot (after the host's delay) and a global slot for one request."""
+        state = self._host(urlparse(url).netloc)
+        async with state.semaphore:
+            async with state.lock:
+                wait = state.next_request_at - self._loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                state.next_request_at = self._loop.time() + state.delay
+            async with self._global:
+                yield
+    
+    async def _robots_for(self, url: str) -> RobotFileParser:
+        parts = urlparse(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        lock = self._robots_locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            cached = self._robots.get(origin)
+            if cached and self._loop.time() - cached[0] < self.robots_ttl:
+                return cached[1]
+            
+            parser = RobotFileParser(origin + "/robots.txt")
+            try:
+                async with self._slot(origin):
+                    response = await self._client.get(origin + "/robots.txt")
+                if response.status_code in (401, 403):
+                    parser.disallow_all = True
+                elif response.status_code >= 400:
+                    parser.allow_all = True
+                else:
+                    parser.parse(response.text.splitlines())
+            except httpx.HTTPError as e:
+                logger.warning(f"Could not fetch robots.txt for {origin}: {e}")
+                parser.allow_all = True
+            
+            delay = parser.crawl_delay(self.user_agent)
+            if delay:
+                state = self._host(parts.netloc)
+                state.delay = max(state.delay, float(delay))
+            self._robots[origin] = (self._loop.time(), parser)
+            return parser
+    
+    async def _allowed(self, url: str) -> bool:
+        if not self.respect_robots:
+            return True
+        return (await self._robots_for(url)).can_fetch(self.user_agent, url)
+    
+    # Fetching
+    
+    async def _fetch(self, url: str, depth: int) -> CrawledPage:
+        if not await self._allowed(url):
+            return CrawledPage(url, depth, error="Disallowed by robots.txt")
+        try:
+            async with self._slot(url):
+                response = await self._client.get(url)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            return CrawledPage(url, depth, error=str(e) or type(e).__name__)
+        
+        content_type = response.headers.get("Content-Type", "")
+        if content_type and "html" not in content_type:
+            return CrawledPage(url, depth, error=f"Not an HTML page ({content_type})")
+        return CrawledPage(url, depth, FetchResult(
+            str(response.url),
+            response.status_code,
+            html=response.text,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified")
+        ))
+    
+    async def _sitemap_urls(self, sitemap_url: str, limit: int, depth: int = 0) -> list[str]:
+        """Page URLs listed in a sitemap (following sitemap indexes)."""
+        if not await self._allowed(sitemap_url):
+            return []
+        try:
+            async with self._slot(sitemap_url):
+                response = await self._client.get(sitemap_url)
+            response.raise_for_status()
+            content = response.content
+            if sitemap_url.endswith(".gz"):
+                content = gzip.decompress(content)
+            root = ElementTree.fromstring(content)
+        except (httpx.HTTPError, ElementTree.ParseError, OSError) as e:
+            logger.info(f"No usable sitemap at {sitemap_url}: {e}")
+            return []
+        
+        locations = [element.text.strip() for element in root.iter() if element.tag.endswith("loc") and element.text]
+        if not root.tag.endswith("sitemapindex"):
+            return locations[:limit]
+        
+        urls = []
+        if depth < _MAX_SITEMAP_DEPTH:
+            for location in locations:
+                if len(urls) >= limit:
+                    break
+                urls.extend(await self._sitemap_urls(location, limit - len(urls), depth + 1))
+        return urls[:limit]
+    
+    async def _seed_urls(self, plan: CrawlPlan) -> list[str]:
+        if not plan.use_sitemap:
+            return list(plan.seeds)
+        urls = list(plan.seeds)
+        for seed in plan.seeds:
+            parts = urlparse(seed)
+            origin = f"{parts.scheme}://{parts.netloc}"
+            sitemaps = ((await self._robots_for(seed)).site_maps() if self.respect_robots else None) or [origin + "/sitemap.xml"]
+            for sitemap in sitemaps:
+                urls.extend(await self._sitemap_urls(sitemap, plan.max_pages))
+        return urls
+    
+    @staticmethod
+    def _links(page: CrawledPage) -> list[str]:
+        try:
+            document = lxml.html.fromstring(page.result.html)
+        except (ValueError, lxml.etree.ParserError):
+            return []
+        links = []
+        for href in document.xpath("//a/@href"):
+            url, _ = urldefrag(urljoin(page.result.url, href.strip()))
+            if urlparse(url).scheme in ("http", "https"):
+                links.append(url)
+        return links
+    
+    async def _crawl(self, plan: CrawlPlan, out: queue.Queue, stop: threading.Event):
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    out.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        try:
+            hosts = {urlparse(seed).netloc for seed in plan.seeds}
+            frontier: asyncio.Queue[tuple[str, int]] = asyncio.Queue()
+            seen: set[str] = set()
+            
+            def schedule(url: str, depth: int):
+                url = urldefrag(url)[0]
+                if url not in seen and len(seen) < plan.max_pages and urlparse(url).netloc in hosts:
+                    seen.add(url)
+                    frontier.put_nowait((url, depth))
+            
+            for url in await self._seed_urls(plan):
+                schedule(url, 0)
+            
+            async def worker():
+                while True:
+                    url, depth = await frontier.get()
+                    try:
+                        page = await self._fetch(url, depth)
+                        if page.result is not None and plan.follow_links and depth < plan.max_depth:
+                            for link in self._links(page):
+                                schedule(link, depth + 1)
+                        if not await asyncio.to_thread(put, page):
+                            return  # Consumer has stopped
+                    finally:
+                        frontier.task_done()
+            
+            workers = [asyncio.create_task(worker()) for _ in range(min(self.max_concurrency, plan.max_pages))]
+            join = asyncio.create_task(frontier.join())
+            await asyncio.wait([join, *workers], return_when=asyncio.FIRST_COMPLETED)
+            for task in [join, *workers]:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            for task in workers:
+                if task.done() and not task.cancelled() and task.exception():
+                    raise task.exception()
+        finally:
+            await asyncio.to_thread(put, None)
+    
+    def crawl(self, plan: CrawlPlan) -> Iterator[CrawledPage]:
+        """Crawl per the plan, yielding each page (or failure) as soon as it is fetched."""
+        out: queue.Queue = queue.Queue(maxsize=self.max_concurrency * 2)
+        stop = threading.Event()
+        future = asyncio.run_coroutine_threadsafe(self._crawl(plan, out, stop), self._loop)
+        try:
+            while (page := out.get()) is not None:
+                yield page
+            future.result()
+        finally:
+            stop.set()  # Unblocks the crawl if the consumer stopped early
+            future.cancel()
+
+@lru_cache()
+def get_crawler() -> Crawler:
+    """Singleton crawler (one connection pool and politeness state per process)."""
+    settings = get_settings()
+    return Crawler(
+        max_concurrency=settings.crawl_max_concurrency,
+        per_host_concurrency=settings.crawl_per_host_concurrency,
+        host_delay=settings.crawl_host_delay_seconds,
+        timeout=settings.web_request_timeout,
+        user_agent=settings.web_user_agent,
+        respect_robots=settings.crawl_respect_robots,
+        robots_ttl=settings.crawl_robots_ttl_seconds
+    )
\ No newline at end of file
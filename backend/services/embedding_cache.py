@@ -0,0 +1,191 @@
+from datetime import datetime
+from pathlib import Path
+from langchain_core.embeddings import Embeddings
+from core.metrics import (
+    EMBEDDING_CACHE_HITS,
+    EMBEDDING_CACHE_MISSES,
+    EMBEDDING_CACHE_EVICTIONS,
+    EMBEDDING_CACHE_BYTES
+)
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import unicodedata
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys (Unicode NFC, collapsed whitespace)."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+class EmbeddingCache:
+    """
+    SQLite blob store of embedding vectors keyed by content hash.
+    
+    Vectors are stored as raw float32 or float16 bytes. When the stored
+    vectors exceed max_bytes, the least recently used entries are evicted
+    down to 90% of the limit.
+    """
+    
+    def __init__(self, db_path: str, max_bytes: int, dtype: str = "float32"):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    dtype TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        EMBEDDING_CACHE_BYTES.set(self._bytes)
+    
+    @staticmethod
+    def make_key(model_name: str, kind: str, text: str) -> str:
+        """Cache key for a text embedded by a model as a document or query."""
+        return hashlib.sha256(f"{model_name}\0{kind}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+    
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Look up vectors for keys, returning only the ones that are cached."""
+        if not keys:
+            return {}
+        
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, dtype, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=dtype).astype(np.float32).tolist()
+            
+            if found:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(datetime.utcnow().isoformat(), key) for key in found]
+                    )
+        return found
+    
+    def put_many(self, items: dict[str, list[float]]):
+        """Store vectors, evicting old entries if the cache grows past max_bytes."""
+        if not items:
+            return
+        
+        now = datetime.utcnow().isoformat()
+        rows = [
+            (key, self.dtype.name, np.asarray(vector, dtype=self.dtype).tobytes(), now)
+            for key, vector in items.items()
+        ]
+        with self._lock:
+            with self._conn:
+                # Vectors being replaced no longer count towards the stored bytes
+                replaced = 0
+                keys = list(items)
+                for start in range(0, len(keys), 500):
+                    batch = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    replaced += self._conn.execute(
+                        f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings WHERE key IN ({placeholders})", batch
+                    ).fetchone()[0]
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, dtype, vector, last_used) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+            self._bytes += sum(len(row[2]) for row in rows) - replaced
+            if self._bytes > self.max_bytes:
+                self._evict()
+        EMBEDDING_CACHE_BYTES.set(self._bytes)
+    
+    def _evict(self):
+        # Recount first, since other worker processes may share the file
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        if self._bytes <= target:
+            return
+        
+        evicted = 0
+        with self._conn:
+            for key, size in self._conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used"
+            ).fetchall():
+                if self._bytes <= target:
+                    break
+                self._conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self._bytes -= size
+                evicted += 1
+        EMBEDDING_CACHE_EVICTIONS.inc(evicted)
+        logger.info(f"Evicted {evicted} cached embeddings ({self._bytes} bytes remain)")
+    
+    def stats(self) -> dict:
+        """Entry count and stored bytes."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from an EmbeddingCache.
+    
+    Only cache misses are sent to the underlying model, and identical texts
+    within one call are embedded once, so re-ingesting a document or
+    re-scraping a page with unchanged content costs no model time.
+    """
+    
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+    
+    def _embed(self, texts: list[str], kind: str, embed_func) -> list[list[float]]:
+        keys = [EmbeddingCache.make_key(self.model_name, kind, text) for text in texts]
+        vectors = self.cache.get_many(list(dict.fromkeys(keys)))
+        
+        # One model call for the distinct texts that aren't cached
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        
+        EMBEDDING_CACHE_HITS.labels(kind=kind).inc(len(texts) - len(missing))
+        EMBEDDING_CACHE_MISSES.labels(kind=kind).inc(len(missing))
+        
+        if missing:
+            computed = dict(zip(missing, embed_func(list(missing.values()))))
+            self.cache.put_many(computed)
+            vectors.update(computed)
+        
+        return [vectors[key] for key in keys]
+    
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed(texts, "document", self.embeddings.embed_documents)
+    
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed([text], "query", lambda texts: [self.embeddings.embed_query(texts[0])])[0]
+    
+    async def aembed_query(self, text: str) -> list[float]:
+        key = EmbeddingCache.make_key(self.model_name, "query", text)
+        cached = await asyncio.to_thread(self.cache.get_many, [key])
+        if key in cached:
+            EMBEDDING_CACHE_HITS.labels(kind="query").inc()
+            return cached[key]
+        
+        EMBEDDING_CACHE_MISSES.labels(kind="query").inc()
+        vector = await self.embeddings.aembed_query(text)
+        await asyncio.to_thread(self.cache.put_many, {key: vector})
+        return vector
\ No newline at end of file
@@ -1,13 +1,155 @@
-from langchain_huggingface import HuggingFaceEmbeddings
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from langchain_core.embeddings import Embeddings
 from functools import lru_cache
 from core.config import get_settings
+from core.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_QUERY_BATCH_SIZE, EMBEDDING_QUERY_QUEUE_WAIT, EMBEDDING_SECONDS
+from core.tracing import timed
+from services.embedding_cache import CachedEmbeddings, EmbeddingCache
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class _PendingQuery:
+    text: str
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    Coalesces concurrent embed_query calls into batched model calls.
+    
+    A scheduler thread takes the first waiting query, collects more until
+    max_batch_size is reached or max_wait_ms has passed since the first one
+    arrived, embeds them in one embed_documents call, and hands each caller
+    its own vector. Sync callers block on their result; async callers await
+    it without holding the event loop. embed_documents passes straight
+    through, since ingestion already embeds in batches.
+    
+    The wrapped model must embed a query exactly like a one-text document
+    batch, which holds for HuggingFaceEmbeddings.
+    """
+    
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.embeddings = embeddings
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue[_PendingQuery] = queue.Queue()
+        self._scheduler = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._scheduler.start()
+    
+    def _submit(self, text: str) -> Future:
+        pending = _PendingQuery(text)
+        self._queue.put(pending)
+        return pending.future
+    
+    def _collect_batch(self) -> list[_PendingQuery]:
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                # Past the deadline, still take whatever is already queued
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        while True:
+            try:
+                self._embed_batch(self._collect_batch())
+            except Exception:
+                # The scheduler must outlive any one batch, or every later query would hang
+                logger.exception("Query embedding scheduler failed to process a batch")
+    
+    def _embed_batch(self, batch: list[_PendingQuery]):
+        # Drop queries whose caller gave up (cancelled or timed out) before they were embedded
+        batch = [pending for pending in batch if pending.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        
+        started = time.monotonic()
+        for pending in batch:
+            EMBEDDING_QUERY_QUEUE_WAIT.observe(started - pending.enqueued_at)
+        EMBEDDING_QUERY_BATCH_SIZE.observe(len(batch))
+        
+        try:
+            vectors = self.embeddings.embed_documents([pending.text for pending in batch])
+        except Exception as e:
+            logger.exception(f"Query embedding batch of {len(batch)} failed")
+            for pending in batch:
+                self._resolve(pending.future.set_exception, e)
+            return
+        
+        for pending, vector in zip(batch, vectors):
+            self._resolve(pending.future.set_result, vector)
+    
+    @staticmethod
+    def _resolve(setter, value):
+        """Hand a caller its result or error; a future that can't take it must not strand the rest of the batch."""
+        try:
+            setter(value)
+        except Exception:
+            logger.exception("Could not deliver a query embedding result")
+    
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> list[float]:
+        return self._submit(text).result()
+    
+    async def aembed_query(self, text: str) -> list[float]:
+        return await asyncio.wrap_future(self._submit(text))
+
+class InstrumentedEmbeddings(Embeddings):
+    """Times every embed_query / embed_documents call (and records document batch sizes)."""
+    
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+    
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        EMBEDDING_BATCH_SIZE.observe(len(texts))
+        with timed("embed_documents", EMBEDDING_SECONDS, kind="documents"):
+            return self.embeddings.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> list[float]:
+        with timed("embed_query", EMBEDDING_SECONDS, kind="query"):
+            return self.embeddings.embed_query(text)
+    
+    async def aembed_query(self, text: str) -> list[float]:
+        with timed("embed_query", EMBEDDING_SECONDS, kind="query"):
+            return await self.embeddings.aembed_query(text)
 
 @lru_cache()
 def get_embeddings():
-    """Singleton embedding model."""
+    """Singleton embedding model (query batching and persistent cache applied per settings, then timed)."""
+    from langchain_huggingface import HuggingFaceEmbeddings  # Pulls in sentence-transformers / torch
+    
     settings = get_settings()
-    return HuggingFaceEmbeddings(
+    embeddings = HuggingFaceEmbeddings(
         model_name=settings.embedding_model,
         model_kwargs={'device': 'cpu'},
         encode_kwargs={'normalize_embeddings': True}
-    )
\ No newline at end of file
+    )
+    if settings.embedding_batching_enabled:
+        embeddings = MicroBatchingEmbeddings(
+            embeddings,
+            max_batch_size=settings.embedding_batch_max_size,
+            max_wait_ms=settings.embedding_batch_max_wait_ms
+        )
+    if settings.embedding_cache_enabled:
+        # Cache above batching, so cache hits never wait for a batch
+        cache = EmbeddingCache(
+            settings.embedding_cache_path,
+            max_bytes=settings.embedding_cache_max_bytes,
+            dtype=settings.embedding_cache_dtype
+        )
+        embeddings = CachedEmbeddings(embeddings, cache, model_name=settings.embedding_model)
+    
+    # Timed outermost: the latency callers see, cache hits and batching waits included
+    return InstrumentedEmbeddings(embeddings)
\ No newline at end of file
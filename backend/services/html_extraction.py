@@ -0,0 +1,170 @@
+from dataclasses import dataclass, field
+import re
+import lxml.etree
+import lxml.html
+
+# Never content
+_NON_CONTENT_TAGS = ("script", "style", "noscript", "template", "svg", "canvas", "iframe", "object", "button", "select", "dialog")
+
+# Page chrome; header and footer are kept when they belong to an article
+_CHROME_TAGS = ("nav", "aside", "menu")
+_CHROME_OUTSIDE_ARTICLE_TAGS = ("header", "footer")
+
+# class/id tokens of navigation, banners, share bars, and similar
+_BOILERPLATE_HINT = re.compile(
+    r"(?:^|[\s_-])(?:nav|navbar|navigation|menu|breadcrumbs?|sidebar|footer|masthead|cookies?|consent|gdpr|banner|"
+    r"share|sharing|social|related|newsletter|subscribe|signup|advert|ads|promo|popup|modal|skip|pagination|toc)(?:$|[\s_-])",
+    re.IGNORECASE
+)
+
+_BLOCK_TAGS = (
+    "p", "div", "section", "article", "main", "li", "dd", "dt", "tr", "pre", "blockquote", "figcaption",
+    "h1", "h2", "h3", "h4", "h5", "h6", "table", "ul", "ol", "dl", "br", "hr"
+)
+
+# Paragraph-like elements whose text scores their ancestors as content containers
+_SCORED_TAGS = ("p", "pre", "blockquote", "li")
+
+# Link-dense blocks (link lists, tag clouds) are boilerplate below this much
+# text; almost entirely linked blocks are boilerplate at any length
+_LINK_DENSITY = 0.5
+_LINK_BLOCK_MAX_CHARS = 400
+_LINK_LIST_DENSITY = 0.8
+
+@dataclass
+class ExtractedPage:
+    """Main text and head metadata of an HTML page."""
+    text: str
+    metadata: dict = field(default_factory=dict)
+
+def _text_length(element) -> int:
+    return len(" ".join(element.text_content().split()))
+
+def _link_density(element) -> float:
+    text = _text_length(element)
+    if text == 0:
+        return 0.0
+    return sum(_text_length(link) for link in element.iter("a")) / text
+
+def _is_hidden(element) -> bool:
+    style = (element.get("style") or "").replace(" ", "").lower()
+    return element.get("hidden") is not None or element.get("aria-hidden") == "true" or "display:none" in style
+
+def _is_link_block(element) -> bool:
+    density = _link_density(element)
+    return density > _LINK_LIST_DENSITY or (density > _LINK_DENSITY and _text_length(element) < _LINK_BLOCK_MAX_CHARS)
+
+def _has_boilerplate_hint(element) -> bool:
+    hint = f"{element.get('class', '')} {element.get('id', '')} {element.get('role', '')}"
+    return bool(hint.strip()) and bool(_BOILERPLATE_HINT.search(hint))
+
+def _drop(elements):
+    for element in elements:
+        if element.getparent() is not None:
+            element.drop_tree()  # Keeps the tail text, which belongs to the parent
+
+def _head_metadata(document) -> dict:
+    """Same metadata keys and defaults as WebBaseLoader."""
+    metadata = {}
+    if titles := document.xpath("//title"):
+        metadata["title"] = titles[0].text_content()
+    if descriptions := document.xpath("//meta[@name='description']"):
+        metadata["description"] = descriptions[0].get("content", "No description found.")
+    metadata["language"] = document.get("lang", "No language found.") if document.tag == "html" else "No language found."
+    return metadata
+
+def _main_content(body):
+    """
+    The element holding the page's main content.
+    
+    An explicit <main>, <article>, or role="main" wins (the one with the
+    most text); otherwise each paragraph-like element credits its text to
+    its parent and, at half weight, its grandparent, and the best-scoring
+    container is chosen, widened to its parent when the content is split
+    across sibling containers. Falls back to the whole body.
+    """
+    explicit = body.xpath(".//main | .//article | .//*[@role='main']")
+    if explicit:
+        best = max(explicit, key=_text_length)
+        if _text_length(best) > 0:
+            return best
+    
+    scores: dict = {}
+    for element in body.iter(*_SCORED_TAGS):
+        length = _text_length(element)
+        if length < 25:
+            continue
+        parent = element.getparent()
+        if parent is None:
+            continue
+        # Capped, so one huge layout cell can't outweigh many real paragraphs
+        score = (1 + min(length / 100, 3)) * (1 - _link_density(element))
+        scores[parent] = scores.get(parent, 0.0) + score
+        if (grandparent := parent.getparent()) is not None:
+            scores[grandparent] = scores.get(grandparent, 0.0) + score / 2
+    if not scores:
+        return body
+    best = max(scores, key=scores.get)
+    while (parent := best.getparent()) is not None and scores.get(parent, 0.0) >= 0.75 * scores[best]:
+        best = parent
+    return best
+
+def _strip_boilerplate(root):
+    _drop([element for element in root.iter(*_CHROME_TAGS) if element is not root])
+    _drop([
+        element for element in root.iter(*_CHROME_OUTSIDE_ARTICLE_TAGS)
+        if element is not root and not any(ancestor.tag in ("article", "main") for ancestor in element.iterancestors())
+    ])
+    _drop([
+        element for element in root.iter(lxml.etree.Element)
+        if element is not root and (_is_hidden(element) or _has_boilerplate_hint(element))
+    ])
+    _drop([
+        element for element in root.iter("ul", "ol", "div", "section", "table", "td", "p")
+        if element is not root and _is_link_block(element)
+    ])
+
+def _block_text(root) -> str:
+    """Text with one blank line between blocks and collapsed whitespace within them."""
+    for element in root.iter("td", "th"):
+        element.tail = " " + (element.tail or "")
+    for element in root.iter(*_BLOCK_TAGS):
+        element.tail = "\n\n" + (element.tail or "")
+        if element is not root and element.tag not in ("br", "hr"):
+            element.text = "\n\n" + (element.text or "")
+    blocks = (" ".join(block.split()) for block in root.text_content().split("\n\n"))
+    return "\n\n".join(block for block in blocks if block)
+
+def extract_html(html: str) -> ExtractedPage:
+    """
+    Extract a page's main text, without navigation, banners, and other boilerplate.
+    
+    Parses with lxml, removes non-content elements and page chrome (nav,
+    sidebars, cookie banners, share bars, link lists, hidden elements),
+    locates the main content container, and returns its text with
+    paragraphs separated by blank lines.
+    
+    Args:
+        html: Page HTML
+    
+    Returns:
+        ExtractedPage with the text and title/description/language metadata
+    """
+    try:
+        document = lxml.html.document_fromstring(html)
+    except ValueError:
+        # Unicode strings with an XML encoding declaration must be parsed as bytes
+        document = lxml.html.document_fromstring(html.encode("utf-8"))
+    except lxml.etree.ParserError:
+        return ExtractedPage("", {"language": "No language found."})
+    
+    metadata = _head_metadata(document)
+    _drop(list(document.iter(*_NON_CONTENT_TAGS)))
+    _drop(list(document.iter(lxml.etree.Comment)))
+    
+    body = document.find("body")
+    if body is None:
+        body = document
+    root = _main_content(body)
+    _strip_boilerplate(root)
+    return ExtractedPage(_block_text(root), metadata)
\ No newline at end of file
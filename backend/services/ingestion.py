@@ -0,0 +1,184 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+from langchain.text_splitter import TextSplitter
+from langchain_core.documents import Document
+from core.metrics import INGESTION_STAGE_ERRORS, INGESTION_STAGE_ITEMS, INGESTION_STAGE_SECONDS
+from core.tracing import record, timed
+from services.vector_store import VectorStore
+import contextvars
+import hashlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+def ingestion_stage(source: str, stage: str):
+    """Time one ingestion stage of a source type ("pdf" or "web") into the ingestion metrics."""
+    return timed(f"ingest.{stage}", INGESTION_STAGE_SECONDS, INGESTION_STAGE_ERRORS, source=source, stage=stage)
+
+def make_chunk_id(source_key: str, position: int) -> str:
+    """Deterministic chunk ID, so re-ingesting a source overwrites its chunks in place."""
+    return f"{source_key}:{position}"
+
+def content_chunk_id(source_key: str, text: str, occurrence: int = 0) -> str:
+    """Chunk ID derived from the chunk text, so an unchanged chunk keeps its ID wherever it moves."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return f"{source_key}:{digest}" if occurrence == 0 else f"{source_key}:{digest}-{occurrence}"
+
+def stale_chunk_ids(previous_ids: list[str], current_ids: list[str]) -> list[str]:
+    """Chunk IDs of an earlier ingestion that the new one did not overwrite."""
+    current = set(current_ids)
+    return [chunk_id for chunk_id in previous_ids if chunk_id not in current]
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """Group an iterable into lists of at most size items."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+@dataclass
+class IngestionResult:
+    """Outcome of one pipeline run."""
+    chunk_ids: list[str] = field(default_factory=list)  # All chunks, in document order
+    chunks_stored: int = 0  # Embedded and upserted
+    chunks_skipped: int = 0  # Already stored (skip predicate)
+    chunks_duplicate: int = 0  # Near-duplicates stored with an embedded chunk's vector instead of being embedded
+
+class IngestionPipeline:
+    """
+    Streaming page -> chunk -> embed -> upsert pipeline.
+    
+    Pages are split as they arrive, chunks are grouped into fixed-size
+    batches, and each batch is embedded and upserted as soon as it is full.
+    At most max_in_flight batches are being stored at once; the producer
+    waits for the oldest one when the window is full, so memory stays flat
+    regardless of document size and early chunks are searchable before the
+    rest of the document has been parsed.
+    
+    As the stages interleave, each run adds up the time spent pulling pages
+    (parse), splitting them (split) and storing batches (store: embedding
+    and upsert, overlapping with the other two) and records each total once
+    in the ingestion stage metrics, labelled with source_type.
+    """
+    
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        collection_name: str,
+        text_splitter: TextSplitter,
+        batch_size: int = 64,
+        max_in_flight: int = 2,
+        source_type: str = "unknown"
+    ):
+        self.vector_store = vector_store
+        self.collection_name = collection_name
+        self.source_type = source_type
+        self.text_splitter = text_splitter
+        self.batch_size = batch_size
+        self.max_in_flight = max(1, max_in_flight)
+    
+    def run(
+        self,
+        pages: Iterable[Document],
+        annotate: Callable[[Document, int], None],
+        progress: Callable | None = None,
+        skip: Callable[[Document], bool] | None = None
+    ) -> IngestionResult:
+        """
+        Ingest a stream of pages.
+        
+        Args:
+            pages: Page Documents, typically a generator
+            annotate: Called as annotate(chunk, index) to set chunk metadata,
+                including a unique "chunk_id"
+            progress: Optional callback(stage, **counts) for job status reporting
+            skip: Optional predicate on annotated chunks that are already stored
+                and need no embedding (e.g. unchanged content)
+        
+        Returns:
+            IngestionResult with the IDs of all chunks (stored, skipped, or
+            linked as near-duplicates) in document order, and counts
+        """
+        progress = progress or (lambda *args, **kwargs: None)
+        counts = {"pages": 0, "chunks_total": 0, "chunks_stored": 0, "chunks_skipped": 0, "chunks_duplicate": 0}
+        stage_seconds = {"parse": 0.0, "split": 0.0, "store": 0.0}
+        chunk_ids = []
+        
+        def counted_pages():
+            iterator = iter(pages)
+            while True:
+                started = time.perf_counter()
+                page = next(iterator, None)
+                stage_seconds["parse"] += time.perf_counter() - started
+                if page is None:
+                    break
+                counts["pages"] += 1
+                yield page
+            progress("parsed", pages=counts["pages"])
+        
+        def split_chunks():
+            # Lazily, one page at a time
+            for page in counted_pages():
+                started = time.perf_counter()
+                chunks = self.text_splitter.split_documents([page])
+                stage_seconds["split"] += time.perf_counter() - started
+                yield from chunks
+        
+        def store(batch: list[Document]) -> tuple[int, float]:
+            started = time.perf_counter()
+            stored = self.vector_store.add_documents(batch, self.collection_name)
+            return stored, time.perf_counter() - started
+        
+        def annotated_chunks():
+            for chunk in split_chunks():
+                annotate(chunk, counts["chunks_total"])
+                counts["chunks_total"] += 1
+                chunk_ids.append(chunk.metadata["chunk_id"])
+                if skip is not None and skip(chunk):
+                    counts["chunks_skipped"] += 1
+                    continue
+                yield chunk
+            progress("chunked", chunks_total=counts["chunks_total"], chunks_skipped=counts["chunks_skipped"])
+        
+        in_flight: deque[tuple[Future, int]] = deque()
+        
+        def wait_oldest():
+            future, batch_size = in_flight.popleft()
+            stored, seconds = future.result()
+            stage_seconds["store"] += seconds
+            counts["chunks_stored"] += stored
+            counts["chunks_duplicate"] += batch_size - stored
+            progress(chunks_stored=counts["chunks_stored"], chunks_duplicate=counts["chunks_duplicate"])
+        
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="ingestion-upsert") as executor:
+            try:
+                for batch in batched(annotated_chunks(), self.batch_size):
+                    if len(in_flight) >= self.max_in_flight:
+                        wait_oldest()
+                    # In a copy of the caller's context, so the store's spans join its trace
+                    in_flight.append((executor.submit(contextvars.copy_context().run, store, batch), len(batch)))
+                    progress(pages=counts["pages"], chunks_total=counts["chunks_total"])
+                while in_flight:
+                    wait_oldest()
+            except BaseException:
+                for future, _ in in_flight:
+                    future.cancel()
+                raise
+        
+        for stage, seconds in stage_seconds.items():
+            record(f"ingest.{stage}", seconds, INGESTION_STAGE_SECONDS, source=self.source_type, stage=stage)
+        INGESTION_STAGE_ITEMS.labels(source=self.source_type, stage="parse").inc(counts["pages"])
+        INGESTION_STAGE_ITEMS.labels(source=self.source_type, stage="split").inc(counts["chunks_total"])
+        INGESTION_STAGE_ITEMS.labels(source=self.source_type, stage="store").inc(counts["chunks_stored"])
+        
+        # add_documents embeds and upserts each batch in one call
+        progress("embedded", chunks_embedded=counts["chunks_stored"], chunks_duplicate=counts["chunks_duplicate"])
+        logger.info(
+            f"Ingested {counts['pages']} pages as {counts['chunks_stored']} chunks "
+            f"into '{self.collection_name}' (batch size {self.batch_size}, "
+            f"{counts['chunks_duplicate']} near-duplicates linked instead of embedded)"
+        )
+        return IngestionResult(chunk_ids, counts["chunks_stored"], counts["chunks_skipped"], counts["chunks_duplicate"])
\ No newline at end of file
@@ -0,0 +1,179 @@
+from dataclasses import dataclass, field, asdict, replace
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable
+from core.config import get_settings
+from core.metrics import INGESTION_JOB_SECONDS
+from core.tracing import trace, timings
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+class JobQueueFullError(Exception):
+    """Raised when the ingestion queue has no free slots."""
+    pass
+
+@dataclass
+class Job:
+    """Status of a background ingestion job."""
+    job_id: str
+    kind: str
+    description: str
+    status: str = JOB_QUEUED
+    stage: str | None = None  # Last completed stage: parsed, chunked, embedded, stored
+    progress: dict = field(default_factory=dict)
+    result: dict | None = None
+    error: str | None = None
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    updated_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+class _JobStore:
+    """SQLite-backed job snapshots, so any worker process can report a job's status."""
+    
+    def __init__(self, db_path: str, retention: int):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, created_at TEXT NOT NULL, data TEXT NOT NULL)"
+            )
+    
+    def save(self, job: Job):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, created_at, data) VALUES (?, ?, ?)",
+                (job.job_id, job.created_at, json.dumps(asdict(job)))
+            )
+    
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return Job(**json.loads(row[0])) if row else None
+    
+    def prune(self):
+        """Keep only the most recent jobs."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE job_id NOT IN (SELECT job_id FROM jobs ORDER BY created_at DESC LIMIT ?)",
+                (self.retention,)
+            )
+
+class JobManager:
+    """
+    Bounded ingestion queue served by a pool of worker threads.
+    
+    Submitting to a full queue raises JobQueueFullError instead of blocking,
+    so the API can push back on clients while long ingestions run off the
+    event loop.
+    """
+    
+    def __init__(self, max_workers: int, max_queue_size: int, db_path: str, retention: int = 1000):
+        self.store = _JobStore(db_path, retention)
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"ingestion-worker-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        logger.info(f"Started ingestion job queue ({max_workers} workers, queue size {max_queue_size})")
+    
+    def submit(self, kind: str, description: str, func: Callable, *args, **kwargs) -> Job:
+        """
+        Queue a job.
+        
+        The function is called as func(*args, progress=callback, **kwargs), where
+        callback(stage, **counts) records stage completion and progress counters.
+        Its return value (a dict or int) becomes the job result.
+        
+        Raises:
+            JobQueueFullError: If the queue is at capacity
+        """
+        job = Job(job_id=uuid.uuid4().hex, kind=kind, description=description)
+        self.store.save(job)
+        snapshot = replace(job)  # Workers mutate the queued instance
+        try:
+            self._queue.put_nowait((job, func, args, kwargs))
+        except queue.Full:
+            job.status = JOB_FAILED
+            job.error = "Ingestion queue is full"
+            self.store.save(job)
+            raise JobQueueFullError("Ingestion queue is full, retry later")
+        logger.info(f"Queued {kind} job {job.job_id}: {description}")
+        return snapshot
+    
+    def get(self, job_id: str) -> Job | None:
+        """Look up a job by ID."""
+        return self.store.get(job_id)
+    
+    def shutdown(self):
+        """Stop workers once queued jobs are drained."""
+        for _ in self._workers:
+            self._queue.put(None)
+    
+    def _update(self, job: Job, **changes):
+        for key, value in changes.items():
+            setattr(job, key, value)
+        job.updated_at = datetime.utcnow().isoformat()
+        self.store.save(job)
+    
+    def _progress_callback(self, job: Job) -> Callable:
+        def progress(stage: str | None = None, **counts):
+            if stage is not None:
+                job.stage = stage
+            job.progress.update(counts)
+            self._update(job)
+        return progress
+    
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            
+            job, func, args, kwargs = item
+            self._update(job, status=JOB_RUNNING)
+            started = time.perf_counter()
+            try:
+                with trace() as spans:
+                    result = func(*args, progress=self._progress_callback(job), **kwargs)
+                if not isinstance(result, dict):
+                    result = {"chunks_stored": result}
+                if get_settings().request_timings_enabled:
+                    result["timings"] = timings(spans, total=time.perf_counter() - started)
+                self._update(job, status=JOB_COMPLETED, result=result)
+                INGESTION_JOB_SECONDS.labels(kind=job.kind, status=JOB_COMPLETED).observe(time.perf_counter() - started)
+                logger.info(f"Job {job.job_id} completed")
+            except Exception as e:
+                self._update(job, status=JOB_FAILED, error=str(e))
+                INGESTION_JOB_SECONDS.labels(kind=job.kind, status=JOB_FAILED).observe(time.perf_counter() - started)
+                logger.exception(f"Job {job.job_id} failed")
+            finally:
+                self._queue.task_done()
+                self.store.prune()
+
+@lru_cache()
+def get_job_manager() -> JobManager:
+    """Singleton ingestion job manager."""
+    settings = get_settings()
+    return JobManager(
+        max_workers=settings.ingestion_workers,
+        max_queue_size=settings.ingestion_queue_size,
+        db_path=settings.jobs_db_path,
+        retention=settings.job_retention
+    )
\ No newline at end of file
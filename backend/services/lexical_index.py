@@ -0,0 +1,269 @@
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from langchain_core.documents import Document
+from core.config import get_settings
+from core.process_lock import hold_process_lock
+from services.metadata_filter import Condition, MetadataIndex
+import json
+import logging
+import math
+import re
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Identifiers like "AB-1234", "E_1042" or "v2.3.1" are kept whole as well as split into parts
+_TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+_PART_PATTERN = re.compile(r"[-./_]")
+
+# Deleted chunks are only reclaimed once they outnumber the live ones (and at least this many)
+_COMPACTION_MIN_DEAD_ROWS = 1024
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens, plus the parts of compound identifiers."""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = [part for part in _PART_PATTERN.split(token) if part]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+class LexicalIndex:
+    """
+    In-process BM25 inverted index for one collection.
+    
+    Each term maps to two compact arrays: the rows of the chunks containing
+    it and the term frequency in each. Chunks are indexed incrementally as
+    they are added, and appended to a JSONL file so the index is rebuilt
+    on startup. Queries score only the postings of their terms, with
+    vectorized NumPy, and never touch the embedding model. Metadata filters
+    are resolved through a secondary index on source fields.
+    
+    Re-adding a chunk_id replaces the chunk and deletions are logged as
+    {"delete": id} lines; superseded rows stay in the postings, marked
+    dead, until they outnumber live ones and the file is rewritten.
+    
+    The file is owned by one process: others neither see its additions
+    nor survive its rewrites, so the shared indexes are only opened after
+    claim_lexical_index_directory().
+    """
+    
+    def __init__(self, path: Path, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._reset()
+        
+        if self.path.exists():
+            self._load()
+    
+    def _reset(self):
+        self.ids: list[str] = []
+        self.texts: list[str] = []
+        self.metadatas: list[dict] = []
+        self._row_of: dict[str, int] = {}  # Live row of each chunk_id
+        self._metadata_index = MetadataIndex()
+        self._postings: dict[str, tuple[array, array]] = {}  # term -> (rows, term frequencies)
+        self._doc_lengths = np.zeros(1024, dtype=np.float32)
+        self._dead = np.zeros(1024, dtype=bool)
+        self._num_dead = 0
+        self._total_length = 0
+    
+    @property
+    def live_count(self) -> int:
+        return len(self.ids) - self._num_dead
+    
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Partial line from an interrupted write
+                if "delete" in record:
+                    self._remove(record["delete"])
+                else:
+                    self._index(record["id"], record["text"], record["metadata"])
+        logger.info(f"Loaded lexical index with {self.live_count} chunks from {self.path}")
+    
+    def _index(self, chunk_id: str, text: str, metadata: dict):
+        self._remove(chunk_id)
+        row = len(self.ids)
+        self.ids.append(chunk_id)
+        self.texts.append(text)
+        self.metadatas.append(metadata)
+        self._row_of[chunk_id] = row
+        self._metadata_index.add(row, metadata)
+        
+        tokens = tokenize(text)
+        counts: dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, tf in counts.items():
+            rows, freqs = self._postings.setdefault(term, (array("I"), array("I")))
+            rows.append(row)
+            freqs.append(tf)
+        
+        if row >= len(self._doc_lengths):
+            self._doc_lengths = np.concatenate([self._doc_lengths, np.zeros_like(self._doc_lengths)])
+            self._dead = np.concatenate([self._dead, np.zeros_like(self._dead)])
+        self._doc_lengths[row] = len(tokens)
+        self._total_length += len(tokens)
+    
+    def _remove(self, chunk_id: str) -> bool:
+        row = self._row_of.pop(chunk_id, None)
+        if row is None:
+            return False
+        self._dead[row] = True
+        self._num_dead += 1
+        self._total_length -= int(self._doc_lengths[row])
+        return True
+    
+    def _compact(self):
+        """Rewrite the file with live chunks only and rebuild the postings."""
+        live = [(self.ids[row], self.texts[row], self.metadatas[row]) for row in sorted(self._row_of.values())]
+        tmp_path = self.path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for chunk_id, text, metadata in live:
+                f.write(json.dumps({"id": chunk_id, "text": text, "metadata": metadata}) + "\n")
+        tmp_path.replace(self.path)
+        
+        dropped = self._num_dead
+        self._reset()
+        for chunk_id, text, metadata in live:
+            self._index(chunk_id, text, metadata)
+        logger.info(f"Compacted lexical index {self.path}: dropped {dropped} dead chunks, {self.live_count} remain")
+    
+    def _maybe_compact(self):
+        if self._num_dead >= _COMPACTION_MIN_DEAD_ROWS and self._num_dead > self.live_count:
+            self._compact()
+    
+    def add_documents(self, documents: list[Document]):
+        """Index chunks (each needs a "chunk_id" in its metadata, replacing any chunk with that ID) and persist them."""
+        if not documents:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                for doc in documents:
+                    chunk_id = doc.metadata["chunk_id"]
+                    f.write(json.dumps({"id": chunk_id, "text": doc.page_content, "metadata": doc.metadata}) + "\n")
+                    self._index(chunk_id, doc.page_content, dict(doc.metadata))
+            self._maybe_compact()
+    
+    def delete(self, chunk_ids: list[str]) -> int:
+        """Remove chunks by ID (unknown IDs are ignored); returns the number removed."""
+        with self._lock:
+            chunk_ids = [chunk_id for chunk_id in dict.fromkeys(chunk_ids) if chunk_id in self._row_of]
+            if not chunk_ids:
+                return 0
+            with open(self.path, "a", encoding="utf-8") as f:
+                for chunk_id in chunk_ids:
+                    f.write(json.dumps({"delete": chunk_id}) + "\n")
+                    self._remove(chunk_id)
+            self._maybe_compact()
+            return len(chunk_ids)
+    
+    def search(self, query: str, k: int = 5, conditions: list[Condition] | None = None) -> list[Document]:
+        """Top-k chunks by BM25 score, best first, among chunks matching the conditions."""
+        terms = set(tokenize(query))
+        with self._lock:
+            num_docs = self.live_count
+            if not terms or num_docs == 0 or k <= 0:
+                return []
+            selected = self._metadata_index.select(conditions or [], self.metadatas, len(self.ids))
+            if selected is not None and len(selected) == 0:
+                return []
+            avg_length = self._total_length / num_docs
+            doc_lengths = self._doc_lengths[:len(self.ids)]
+            
+            all_rows, all_weights = [], []
+            for term in terms:
+                if term not in self._postings:
+                    continue
+                # Copy out of the growable arrays while holding the lock
+                rows = np.frombuffer(self._postings[term][0], dtype=np.uint32).astype(np.int64)
+                tf = np.frombuffer(self._postings[term][1], dtype=np.uint32).astype(np.float32)
+                idf = math.log(1 + (num_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * doc_lengths[rows] / avg_length)
+                all_rows.append(rows)
+                all_weights.append(idf * tf * (self.k1 + 1) / (tf + norm))
+            
+            if not all_rows:
+                return []
+            rows = np.concatenate(all_rows)
+            weights = np.concatenate(all_weights)
+            
+            # Sum per-term contributions per chunk, then rank the matched chunks
+            if len(all_rows) == 1:
+                matched, scores = rows, weights
+            else:
+                matched, inverse = np.unique(rows, return_inverse=True)
+                scores = np.bincount(inverse, weights=weights)
+            keep = None
+            if self._num_dead:
+                keep = ~self._dead[matched]
+            if selected is not None:
+                in_selection = np.isin(matched, selected, assume_unique=True)
+                keep = in_selection if keep is None else keep & in_selection
+            if keep is not None:
+                matched, scores = matched[keep], scores[keep]
+                if len(matched) == 0:
+                    return []
+            k = min(k, len(matched))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                Document(id=self.ids[row], page_content=self.texts[row], metadata=dict(self.metadatas[row]))
+                for row in matched[top]
+            ]
+
+def fuse_ranked(result_lists: list[list[Document]], k: int, rrf_k: int = 60) -> list[tuple[Document, float]]:
+    """
+    Merge ranked result lists by reciprocal rank fusion.
+    
+    Each chunk scores sum(1 / (rrf_k + rank)) over the lists it appears in,
+    keyed by its chunk_id, so a chunk found by several retrievers ranks first.
+    
+    Returns:
+        Top-k (document, fused score) pairs, best first
+    """
+    scores: dict[str, float] = {}
+    documents: dict[str, Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = doc.metadata.get("chunk_id") or doc.id or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [(documents[key], scores[key]) for key in ranked]
+
+def reciprocal_rank_fusion(result_lists: list[list[Document]], k: int, rrf_k: int = 60) -> list[Document]:
+    """Merge ranked result lists by reciprocal rank fusion (see fuse_ranked)."""
+    return [doc for doc, _ in fuse_ranked(result_lists, k, rrf_k)]
+
+_open_lock = threading.Lock()
+
+def claim_lexical_index_directory():
+    """Make this process the only one using the lexical index directory (see hold_process_lock)."""
+    hold_process_lock(Path(get_settings().lexical_index_directory) / ".lock", "LEXICAL_INDEX_ENABLED")
+
+def get_lexical_index(collection_name: str) -> LexicalIndex:
+    """Shared lexical index for a collection."""
+    # lru_cache alone may open an index twice when upsert threads ask for it at once
+    with _open_lock:
+        return _open_lexical_index(collection_name)
+
+@lru_cache()
+def _open_lexical_index(collection_name: str) -> LexicalIndex:
+    settings = get_settings()
+    claim_lexical_index_directory()
+    return LexicalIndex(
+        Path(settings.lexical_index_directory) / f"{collection_name}.jsonl",
+        k1=settings.bm25_k1,
+        b=settings.bm25_b
+    )
\ No newline at end of file
@@ -0,0 +1,130 @@
+from array import array
+import numpy as np
+
+# Comparison operators shared by Chroma "where" clauses and Pinecone metadata filters
+OPERATORS = ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin")
+
+# Metadata fields with a secondary index in the in-process backends
+INDEXED_FIELDS = ("source", "pdf_hash", "url_hash", "source_url", "source_domain")
+
+Condition = tuple[str, str, object]
+
+def parse_filter(filter: dict | None) -> list[Condition]:
+    """
+    Validate a metadata filter and flatten it into (field, operator, value) conditions.
+    
+    A filter maps fields to a value (equality) or to {operator: value}, e.g.
+    {"source": "manual_v3.pdf", "page_number": {"$gte": 10, "$lte": 40}}.
+    All conditions must hold.
+    
+    Raises:
+        ValueError: If the filter is malformed or uses an unknown operator
+    """
+    if not filter:
+        return []
+    if not isinstance(filter, dict):
+        raise ValueError("Filter must be an object mapping metadata fields to conditions")
+    
+    conditions = []
+    for field, condition in filter.items():
+        if field.startswith("$"):
+            raise ValueError(f"Unsupported top-level filter operator: {field}")
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        if not condition:
+            raise ValueError(f"Empty condition for filter field '{field}'")
+        for op, value in condition.items():
+            if op not in OPERATORS:
+                raise ValueError(f"Unsupported filter operator '{op}' (expected one of {', '.join(OPERATORS)})")
+            if op in ("$in", "$nin") and not isinstance(value, list):
+                raise ValueError(f"Filter operator '{op}' on '{field}' needs a list")
+            conditions.append((field, op, value))
+    return conditions
+
+def to_chroma_where(conditions: list[Condition]) -> dict | None:
+    """Chroma "where" clause (several conditions are combined with $and)."""
+    clauses = [{field: {op: value}} for field, op, value in conditions]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def to_pinecone_filter(conditions: list[Condition]) -> dict | None:
+    """Pinecone metadata filter (several conditions are combined with $and)."""
+    return to_chroma_where(conditions)
+
+def _holds(value, op: str, expected) -> bool:
+    if op == "$eq":
+        return value == expected
+    if op == "$ne":
+        return value != expected
+    if op == "$in":
+        return value in expected
+    if op == "$nin":
+        return value not in expected
+    if value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > expected
+        if op == "$gte":
+            return value >= expected
+        if op == "$lt":
+            return value < expected
+        return value <= expected
+    except TypeError:
+        return False
+
+def matches(metadata: dict, conditions: list[Condition]) -> bool:
+    """Whether a chunk's metadata satisfies every condition."""
+    return all(_holds(metadata.get(field), op, value) for field, op, value in conditions)
+
+class MetadataIndex:
+    """Secondary index from (field, value) to rows, for the in-process backends."""
+    
+    def __init__(self, fields: tuple[str, ...] = INDEXED_FIELDS):
+        self.fields = fields
+        self._rows: dict[str, dict[object, array]] = {field: {} for field in fields}
+    
+    def add(self, row: int, metadata: dict):
+        for field in self.fields:
+            value = metadata.get(field)
+            if value is not None:
+                self._rows[field].setdefault(value, array("I")).append(row)
+    
+    def _lookup(self, field: str, values: list) -> np.ndarray:
+        postings = [self._rows[field][value] for value in values if value in self._rows[field]]
+        if not postings:
+            return np.empty(0, dtype=np.int64)
+        rows = np.concatenate([np.frombuffer(p, dtype=np.uint32).astype(np.int64) for p in postings])
+        return np.unique(rows) if len(postings) > 1 else rows
+    
+    def select(self, conditions: list[Condition], metadatas: list[dict], count: int) -> np.ndarray | None:
+        """
+        Rows among the first count that satisfy the conditions, in ascending order.
+        
+        Equality and $in conditions on indexed fields are answered from the
+        index; any remaining conditions are checked only on those candidate
+        rows. Returns None when there are no conditions (every row matches).
+        """
+        if not conditions:
+            return None
+        
+        candidates = None
+        remaining = []
+        for field, op, value in conditions:
+            if field in self.fields and op in ("$eq", "$in"):
+                rows = self._lookup(field, value if op == "$in" else [value])
+                candidates = rows if candidates is None else np.intersect1d(candidates, rows, assume_unique=True)
+            else:
+                remaining.append((field, op, value))
+        
+        if candidates is None:
+            candidates = np.arange(count, dtype=np.int64)  # No indexed condition: check every row
+        else:
+            candidates = candidates[candidates < count]
+        if remaining:
+            candidates = np.array(
+                [row for row in candidates if matches(metadatas[row], remaining)],
+                dtype=np.int64
+            )
+        return candidates
\ No newline at end of file
@@ -0,0 +1,356 @@
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from langchain_core.documents import Document
+from core.config import get_settings
+from core.process_lock import hold_process_lock
+from services.lexical_index import tokenize
+import base64
+import hashlib
+import json
+import logging
+import re
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+# MinHash signature: 128 16-bit minima, banded 16 x 8 for LSH. Pairs with
+# Jaccard similarity 0.85 share a band with probability 0.99, pairs at 0.5
+# with probability 0.06.
+_NUM_PERMUTATIONS = 128
+_BANDS = 16
+_ROWS_PER_BAND = _NUM_PERMUTATIONS // _BANDS
+
+# Fixed seed: signatures are persisted and must stay comparable across restarts
+_rng = np.random.default_rng(20240917)
+_PERMUTATION_A = _rng.integers(0, 1 << 63, _NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)  # Odd
+_PERMUTATION_B = _rng.integers(0, 1 << 63, _NUM_PERMUTATIONS, dtype=np.uint64)
+
+# Superseded log lines are only reclaimed once they outnumber the live entries (and at least this many)
+_COMPACTION_MIN_DEAD_LINES = 1024
+
+def minhash(text: str, shingle_size: int = 3) -> bytes | None:
+    """MinHash signature of the text's lowercased word shingles (None for text without words)."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if not words:
+        return None
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))}
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little") for shingle in shingles],
+        dtype=np.uint64
+    )
+    # Multiply-shift hashing: the high 32 bits of (a * x + b) mod 2^64; minima keep their low 16 bits
+    permuted = (hashes[:, None] * _PERMUTATION_A + _PERMUTATION_B) >> np.uint64(32)
+    return (permuted.min(axis=0) & np.uint64(0xFFFF)).astype(np.uint16).tobytes()
+
+def identifier_digest(text: str) -> str:
+    """Digest of the numbers and identifiers (tokens containing a digit) in a text; near-duplicates must share it."""
+    identifiers = sorted({token for token in tokenize(text) if any(char.isdigit() for char in token)})
+    return hashlib.blake2b("\n".join(identifiers).encode("utf-8"), digest_size=8).hexdigest()
+
+def similarity(a: bytes, b: bytes) -> float:
+    """Estimated Jaccard similarity of two signatures' shingle sets."""
+    return float(np.count_nonzero(np.frombuffer(a, dtype=np.uint16) == np.frombuffer(b, dtype=np.uint16))) / _NUM_PERMUTATIONS
+
+def _band_keys(signature: bytes) -> list[tuple[int, bytes]]:
+    width = _ROWS_PER_BAND * 2
+    return [(band, signature[band * width:(band + 1) * width]) for band in range(_BANDS)]
+
+@dataclass
+class DeduplicationPlan:
+    """Split of a batch into chunks to embed and chunks linked to a stored near-duplicate."""
+    unique: list[Document] = field(default_factory=list)
+    signatures: dict[str, bytes] = field(default_factory=dict)  # chunk_id -> signature, for unique chunks
+    identifiers: dict[str, str] = field(default_factory=dict)  # chunk_id -> identifier digest, for unique chunks
+    links: dict[str, tuple[str, Document]] = field(default_factory=dict)  # chunk_id -> (canonical chunk_id, chunk)
+    unindexed: list[str] = field(default_factory=list)  # Unique chunks without a signature (no words)
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH index of one collection's embedded chunks.
+    
+    Before a batch is stored, each chunk's MinHash signature is looked up
+    in banded hash tables; a chunk whose estimated Jaccard similarity (of
+    word 3-shingles) to an embedded chunk, or to an earlier chunk in the
+    batch, reaches the threshold, and whose numbers and identifiers are
+    the same, is linked to it: the vector store stores it with that
+    chunk's vector instead of embedding it. Linked chunks keep their text
+    and metadata here, so deleting the embedded chunk re-embeds its
+    duplicates.
+    
+    Entries are appended to a JSONL file and replayed on startup; the file
+    is rewritten once superseded lines outnumber live entries. Like the
+    lexical index, the file is owned by one process, so the shared indexes
+    are only opened after claim_near_duplicate_directory().
+    """
+    
+    def __init__(self, path: Path, threshold: float = 0.85):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._reset()
+        
+        if self.path.exists():
+            self._load()
+    
+    def _reset(self):
+        self._signatures: dict[str, bytes] = {}  # Embedded (canonical) chunk_id -> signature
+        self._identifiers: dict[str, str] = {}  # Canonical chunk_id -> identifier digest
+        self._buckets: dict[tuple[int, bytes], set[str]] = {}  # (band, band values) -> canonical chunk_ids
+        self._canonical_of: dict[str, str] = {}  # Linked chunk_id -> canonical chunk_id
+        self._duplicates: dict[str, dict[str, Document]] = {}  # Canonical chunk_id -> linked chunks
+        self._log_lines = 0
+    
+    @property
+    def live_count(self) -> int:
+        return len(self._signatures) + len(self._canonical_of)
+    
+    @property
+    def duplicate_count(self) -> int:
+        return len(self._canonical_of)
+    
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Partial line from an interrupted write
+                self._apply(record)
+        logger.info(
+            f"Loaded near-duplicate index with {len(self._signatures)} chunks "
+            f"and {self.duplicate_count} linked duplicates from {self.path}"
+        )
+    
+    def _apply(self, record: dict):
+        self._log_lines += 1
+        if "delete" in record:
+            self._forget(record["delete"])
+        elif "duplicate_of" in record:
+            self._forget(record["id"])
+            doc = Document(page_content=record["text"], metadata=record["metadata"])
+            self._canonical_of[record["id"]] = record["duplicate_of"]
+            self._duplicates.setdefault(record["duplicate_of"], {})[record["id"]] = doc
+        else:
+            self._forget(record["id"])
+            signature = base64.b64decode(record["minhash"])
+            self._signatures[record["id"]] = signature
+            if "identifiers" in record:  # Entries written before digests were recorded never match
+                self._identifiers[record["id"]] = record["identifiers"]
+            for key in _band_keys(signature):
+                self._buckets.setdefault(key, set()).add(record["id"])
+    
+    def _forget(self, chunk_id: str):
+        """Drop a chunk's entry (its own linked duplicates are left for the caller)."""
+        canonical = self._canonical_of.pop(chunk_id, None)
+        if canonical is not None:
+            linked = self._duplicates.get(canonical, {})
+            linked.pop(chunk_id, None)
+            if not linked:
+                self._duplicates.pop(canonical, None)
+        self._identifiers.pop(chunk_id, None)
+        signature = self._signatures.pop(chunk_id, None)
+        if signature is not None:
+            for key in _band_keys(signature):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(chunk_id)
+                    if not bucket:
+                        del self._buckets[key]
+    
+    @staticmethod
+    def _canonical_record(chunk_id: str, signature: bytes, identifiers: str | None) -> dict:
+        record = {"id": chunk_id, "minhash": base64.b64encode(signature).decode("ascii")}
+        if identifiers is not None:
+            record["identifiers"] = identifiers
+        return record
+    
+    @staticmethod
+    def _duplicate_record(chunk_id: str, canonical: str, doc: Document) -> dict:
+        return {"id": chunk_id, "duplicate_of": canonical, "text": doc.page_content, "metadata": doc.metadata}
+    
+    def _write(self, records: list[dict]):
+        if not records:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+                self._apply(record)
+        self._maybe_compact()
+    
+    def _compact(self):
+        """Rewrite the file with live entries only."""
+        records = [
+            self._canonical_record(chunk_id, signature, self._identifiers.get(chunk_id))
+            for chunk_id, signature in self._signatures.items()
+        ]
+        records += [
+            self._duplicate_record(chunk_id, canonical, doc)
+            for canonical, linked in self._duplicates.items()
+            for chunk_id, doc in linked.items()
+        ]
+        tmp_path = self.path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        tmp_path.replace(self.path)
+        
+        dropped = self._log_lines - len(records)
+        self._reset()
+        for record in records:
+            self._apply(record)
+        logger.info(f"Compacted near-duplicate index {self.path}: dropped {dropped} superseded lines, {self.live_count} remain")
+    
+    def _maybe_compact(self):
+        dead = self._log_lines - self.live_count
+        if dead >= _COMPACTION_MIN_DEAD_LINES and dead > self.live_count:
+            self._compact()
+    
+    def _find(self, signature: bytes, identifiers: str, exclude: set[str], plan: DeduplicationPlan) -> str | None:
+        """
+        Most similar canonical chunk at or above the threshold with the same
+        identifier digest, if any (the plan's unique chunks take precedence).
+        """
+        candidates = set()
+        for key in _band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+        candidates = {
+            chunk_id: self._signatures[chunk_id] for chunk_id in candidates - exclude - plan.signatures.keys()
+            if self._identifiers.get(chunk_id) == identifiers
+        }
+        candidates.update(
+            (chunk_id, other) for chunk_id, other in plan.signatures.items()
+            if chunk_id not in exclude and plan.identifiers[chunk_id] == identifiers
+        )
+        
+        best, best_similarity = None, self.threshold
+        for chunk_id, other in candidates.items():
+            if (score := similarity(signature, other)) >= best_similarity:
+                best, best_similarity = chunk_id, score
+        return best
+    
+    def plan(self, documents: list[Document]) -> DeduplicationPlan:
+        """
+        Decide which chunks of a batch to embed and which to link (nothing is recorded until commit).
+        
+        A canonical chunk_id stays canonical if its text is still similar to
+        its previous version, with the same identifiers; if its text changed
+        more, chunks linked to it are re-evaluated along with the batch.
+        """
+        plan = DeduplicationPlan()
+        with self._lock:
+            queue = deque(documents)
+            changed = set()  # Canonical chunks whose text changed; their old signatures must not match
+            while queue:
+                doc = queue.popleft()
+                chunk_id = doc.metadata["chunk_id"]
+                signature = minhash(doc.page_content)
+                if signature is None:
+                    plan.unique.append(doc)
+                    plan.unindexed.append(chunk_id)
+                    continue
+                
+                identifiers = identifier_digest(doc.page_content)
+                previous = self._signatures.get(chunk_id)
+                if (
+                    previous is not None
+                    and similarity(previous, signature) >= self.threshold
+                    and self._identifiers.get(chunk_id) == identifiers
+                ):
+                    match = None  # Still its own canonical copy
+                else:
+                    if previous is not None and chunk_id not in changed:
+                        changed.add(chunk_id)
+                        queue.extend(self._duplicates.get(chunk_id, {}).values())
+                    match = self._find(signature, identifiers, changed | {chunk_id}, plan)
+                
+                if match is None:
+                    plan.unique.append(doc)
+                    plan.signatures[chunk_id] = signature
+                    plan.identifiers[chunk_id] = identifiers
+                else:
+                    plan.links[chunk_id] = (match, doc)
+        return plan
+    
+    def commit(self, plan: DeduplicationPlan) -> list[Document]:
+        """
+        Record a plan after its chunks were stored.
+        
+        Returns:
+            Linked chunks whose canonical chunk was deleted in the meantime;
+            they must be embedded after all
+        """
+        orphans = []
+        with self._lock:
+            records = [
+                self._canonical_record(chunk_id, signature, plan.identifiers[chunk_id])
+                for chunk_id, signature in plan.signatures.items()
+            ]
+            records += [
+                {"delete": chunk_id} for chunk_id in plan.unindexed
+                if chunk_id in self._signatures or chunk_id in self._canonical_of
+            ]
+            for chunk_id, (canonical, doc) in plan.links.items():
+                if canonical in self._signatures or canonical in plan.signatures:
+                    records.append(self._duplicate_record(chunk_id, canonical, doc))
+                else:
+                    orphans.append(doc)
+            self._write(records)
+        return orphans
+    
+    def update_metadata(self, documents: list[Document]):
+        """Replace the text and metadata kept for linked chunks (other chunks are ignored)."""
+        with self._lock:
+            self._write([
+                self._duplicate_record(doc.metadata["chunk_id"], self._canonical_of[doc.metadata["chunk_id"]], doc)
+                for doc in documents if doc.metadata["chunk_id"] in self._canonical_of
+            ])
+    
+    def remove(self, chunk_ids: list[str]) -> list[Document]:
+        """
+        Forget chunks by ID (unknown IDs are ignored).
+        
+        Returns:
+            Linked duplicates of removed canonical chunks (not removed
+            themselves); their vector belonged to a deleted chunk, so they
+            must be embedded
+        """
+        with self._lock:
+            removed = set(chunk_ids)
+            records = [{"delete": chunk_id} for chunk_id in removed if chunk_id in self._canonical_of]
+            promoted = []
+            for chunk_id in removed:
+                if chunk_id in self._signatures:
+                    records.append({"delete": chunk_id})
+                    for linked_id, doc in self._duplicates.get(chunk_id, {}).items():
+                        if linked_id not in removed:
+                            records.append({"delete": linked_id})
+                            promoted.append(doc)
+            self._write(records)
+        return promoted
+
+_open_lock = threading.Lock()
+
+def claim_near_duplicate_directory():
+    """Make this process the only one using the near-duplicate directory (see hold_process_lock)."""
+    hold_process_lock(Path(get_settings().near_duplicate_directory) / ".lock", "NEAR_DUPLICATE_DETECTION")
+
+def get_near_duplicate_index(collection_name: str) -> NearDuplicateIndex:
+    """Shared near-duplicate index for a collection."""
+    # lru_cache alone may open an index twice when upsert threads ask for it at once
+    with _open_lock:
+        return _open_near_duplicate_index(collection_name)
+
+@lru_cache()
+def _open_near_duplicate_index(collection_name: str) -> NearDuplicateIndex:
+    settings = get_settings()
+    claim_near_duplicate_directory()
+    return NearDuplicateIndex(
+        Path(settings.near_duplicate_directory) / f"{collection_name}.jsonl",
+        threshold=settings.near_duplicate_threshold
+    )
\ No newline at end of file
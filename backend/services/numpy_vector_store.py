@@ -0,0 +1,425 @@
+from functools import lru_cache
+from pathlib import Path
+from langchain_core.documents import Document
+from core.config import get_settings
+from services.embeddings import get_embeddings
+from services.metadata_filter import Condition, MetadataIndex, parse_filter
+from services.vector_store import VectorStore
+import json
+import logging
+import shutil
+import threading
+import uuid
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rows re-encoded per block when int8 quantization is recalibrated (and copied per block on compaction)
+_CALIBRATION_BLOCK_ROWS = 65536
+
+# Deleted rows are only reclaimed once they outnumber the live ones (and at least this many)
+_COMPACTION_MIN_DEAD_ROWS = 1024
+
+def _quantize(vectors: np.ndarray, offset: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """int8 codes of vectors under per-dimension scale/offset scalar quantization."""
+    return np.clip(np.rint((vectors - offset) / scale), -127, 127).astype(np.int8)
+
+class NumpyCollection:
+    """
+    One collection held as a contiguous (capacity x dim) NumPy matrix.
+    
+    Vectors are L2-normalized on insert, so a single matmul gives cosine
+    scores. On disk the matrix is a preallocated vectors.npy opened as a
+    memory map (grown by doubling) and documents.jsonl holds one line of
+    id, text and metadata per row. New rows are written in place and
+    appended to the metadata file, so an add costs only the new rows, and
+    startup maps the existing matrix instead of reading it.
+    
+    With dtype float16 or int8 the scanned matrix is compact (2x or 4x
+    smaller) and the float32 vectors are kept in a separate memory-mapped
+    vectors_f32.npy. A search scans the compact matrix for
+    k * rescore_multiplier candidates and rescores only those rows
+    exactly in float32. int8 uses per-dimension scale/offset scalar
+    quantization, recalibrated whenever the collection doubles in size.
+    
+    A secondary metadata index (source, pdf_hash, url_hash, ...) narrows a
+    filtered search to the matching rows before anything is scanned.
+    
+    Adding an existing id replaces it (upsert). Replaced and deleted rows
+    are marked dead and skipped by search; deletions are appended to
+    deleted.txt, and a later row with the same id supersedes an earlier
+    one on load. Once dead rows outnumber live ones the collection is
+    compacted into a fresh directory that replaces the old one.
+    """
+    
+    def __init__(self, directory: Path, dtype: str = "float32", rescore_multiplier: int = 4):
+        self.directory = directory
+        self._compact_directory = directory.with_name(directory.name + ".compact")
+        if not self.directory.exists() and self._compact_directory.exists():
+            self._compact_directory.rename(self.directory)  # Finish an interrupted compaction
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.npy"
+        self.full_vectors_path = self.directory / "vectors_f32.npy"
+        self.quantization_path = self.directory / "quantization.npy"
+        self.documents_path = self.directory / "documents.jsonl"
+        self.deleted_path = self.directory / "deleted.txt"
+        self.dtype = np.dtype(dtype)
+        self.rescore_multiplier = rescore_multiplier
+        self._lock = threading.RLock()
+        self._compactions = 0  # Rows are renumbered by each compaction
+        self._reset()
+        
+        if self.vectors_path.exists() and self.documents_path.exists():
+            self._load()
+    
+    def _reset(self):
+        self.ids: list[str] = []
+        self.texts: list[str] = []
+        self.metadatas: list[dict] = []
+        self._row_of: dict[str, int] = {}  # Live row of each id
+        self._metadata_index = MetadataIndex()
+        self._matrix: np.memmap | None = None  # Full capacity; rows [0, count) are in use
+        self._full: np.memmap | None = None  # float32 copy for rescoring (compact dtypes only)
+        self._offset: np.ndarray | None = None  # int8 quantization parameters, per dimension
+        self._scale: np.ndarray | None = None
+        self._calibrated_rows = 0
+        self._dead = np.zeros(0, dtype=bool)
+        self._num_dead = 0
+    
+    @property
+    def count(self) -> int:
+        """Rows in use, including dead ones."""
+        return len(self.ids)
+    
+    @property
+    def live_count(self) -> int:
+        return self.count - self._num_dead
+    
+    @property
+    def quantized(self) -> bool:
+        return self.dtype != np.float32
+    
+    def _load(self):
+        self._matrix = np.lib.format.open_memmap(self.vectors_path, mode="r+")
+        if self._matrix.dtype != self.dtype:
+            logger.warning(f"Collection at {self.directory} is stored as {self._matrix.dtype}, ignoring configured {self.dtype}")
+        self.dtype = self._matrix.dtype
+        if self.quantized:
+            self._full = np.lib.format.open_memmap(self.full_vectors_path, mode="r+")
+        if self.dtype == np.int8:
+            self._offset, self._scale = np.load(self.quantization_path)
+        
+        with open(self.documents_path, encoding="utf-8") as f:
+            for line in f:
+                if len(self.ids) >= self._matrix.shape[0]:
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Partial line from an interrupted write
+                self._append(record["id"], record["text"], record["metadata"])
+        
+        if self.deleted_path.exists():
+            with open(self.deleted_path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.isdigit() and int(line) < self.count:
+                        self._kill(int(line))
+        self._calibrated_rows = self.count
+        logger.info(f"Loaded {self.live_count} {self.dtype} vectors from {self.vectors_path}")
+    
+    def _append(self, doc_id: str, text: str, metadata: dict):
+        """Register the next row, superseding any earlier row with the same id."""
+        row = self.count
+        if len(self._dead) <= row:
+            self._dead = np.concatenate([self._dead, np.zeros(max(1024, len(self._dead)), dtype=bool)])
+        if doc_id in self._row_of:
+            self._kill(self._row_of[doc_id])
+        self.ids.append(doc_id)
+        self.texts.append(text)
+        self.metadatas.append(metadata)
+        self._row_of[doc_id] = row
+        self._metadata_index.add(row, metadata)
+    
+    def _kill(self, row: int):
+        if self._dead[row]:
+            return
+        self._dead[row] = True
+        self._num_dead += 1
+        if self._row_of.get(self.ids[row]) == row:
+            del self._row_of[self.ids[row]]
+    
+    def _grow(self, path: Path, current: np.memmap | None, dtype, capacity: int, dim: int) -> np.memmap:
+        tmp_path = path.with_suffix(".npy.tmp")
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(capacity, dim))
+        if self.count:
+            grown[:self.count] = current[:self.count]
+        grown.flush()
+        tmp_path.replace(path)
+        return grown
+    
+    def _ensure_capacity(self, rows: int, dim: int):
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if self._matrix is not None and self._matrix.shape[1] != dim:
+            raise ValueError(f"Embedding dimension {dim} does not match collection dimension {self._matrix.shape[1]}")
+        if self.count + rows <= capacity:
+            return
+        
+        new_capacity = max(1024, capacity * 2, self.count + rows)
+        self._matrix = self._grow(self.vectors_path, self._matrix, self.dtype, new_capacity, dim)
+        if self.quantized:
+            self._full = self._grow(self.full_vectors_path, self._full, np.float32, new_capacity, dim)
+    
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.dtype == np.int8:
+            return _quantize(vectors, self._offset, self._scale)
+        return vectors.astype(self.dtype)
+    
+    def _calibrate(self, rows: int):
+        """
+        Fit int8 scale/offset to the first rows vectors and re-encode them.
+        
+        The codes go to a new matrix that then replaces the current one along
+        with the parameters, so a search already scanning the old matrix keeps
+        decoding it with the old parameters.
+        """
+        data = self._full[:rows]
+        low, high = data.min(axis=0), data.max(axis=0)
+        offset = ((high + low) / 2).astype(np.float32)
+        scale = np.maximum((high - low) / 254, 1e-8).astype(np.float32)
+        
+        matrix_path = self.vectors_path.with_suffix(".npy.tmp")
+        matrix = np.lib.format.open_memmap(matrix_path, mode="w+", dtype=np.int8, shape=self._matrix.shape)
+        for start in range(0, rows, _CALIBRATION_BLOCK_ROWS):
+            end = min(start + _CALIBRATION_BLOCK_ROWS, rows)
+            matrix[start:end] = _quantize(np.asarray(self._full[start:end]), offset, scale)
+        matrix.flush()
+        quantization_path = self.quantization_path.with_suffix(".npy.tmp")
+        with open(quantization_path, "wb") as f:
+            np.save(f, np.stack([offset, scale]))
+        
+        matrix_path.replace(self.vectors_path)
+        quantization_path.replace(self.quantization_path)
+        self._matrix, self._offset, self._scale = matrix, offset, scale
+        self._calibrated_rows = rows
+    
+    def add(self, ids: list[str], texts: list[str], metadatas: list[dict], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        
+        with self._lock:
+            self._ensure_capacity(len(ids), vectors.shape[1])
+            start, end = self.count, self.count + len(ids)
+            if self.quantized:
+                self._full[start:end] = vectors
+                self._full.flush()
+            if self.dtype == np.int8 and end >= 2 * self._calibrated_rows:
+                self._calibrate(end)
+            else:
+                self._matrix[start:end] = self._encode(vectors)
+            self._matrix.flush()
+            
+            # Metadata is appended after the vectors are on disk; rows beyond the
+            # metadata count are ignored on load
+            with open(self.documents_path, "a", encoding="utf-8") as f:
+                for doc_id, text, metadata in zip(ids, texts, metadatas):
+                    f.write(json.dumps({"id": doc_id, "text": text, "metadata": metadata}) + "\n")
+            
+            for doc_id, text, metadata in zip(ids, texts, metadatas):
+                self._append(doc_id, text, metadata)
+            self._maybe_compact()
+    
+    def delete(self, ids: list[str]) -> int:
+        """Delete rows by id (unknown ids are ignored); returns the number deleted."""
+        with self._lock:
+            rows = [self._row_of[doc_id] for doc_id in dict.fromkeys(ids) if doc_id in self._row_of]
+            if not rows:
+                return 0
+            with open(self.deleted_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{row}\n" for row in rows))
+            for row in rows:
+                self._kill(row)
+            self._maybe_compact()
+            return len(rows)
+    
+    def _maybe_compact(self):
+        if self._num_dead >= _COMPACTION_MIN_DEAD_ROWS and self._num_dead > self.live_count:
+            self.compact()
+    
+    def compact(self):
+        """Rewrite the collection without its dead rows."""
+        with self._lock:
+            live = np.flatnonzero(~self._dead[:self.count])
+            shutil.rmtree(self._compact_directory, ignore_errors=True)
+            compacted = NumpyCollection(self._compact_directory, str(self.dtype), self.rescore_multiplier)
+            source = self._full if self.quantized else self._matrix
+            for start in range(0, len(live), _CALIBRATION_BLOCK_ROWS):
+                rows = live[start:start + _CALIBRATION_BLOCK_ROWS]
+                compacted.add(
+                    [self.ids[row] for row in rows],
+                    [self.texts[row] for row in rows],
+                    [self.metadatas[row] for row in rows],
+                    np.asarray(source[rows])
+                )
+            del compacted
+            
+            # Swap directories; a crash in between is finished by the next __init__
+            retired = self.directory.with_name(self.directory.name + ".old")
+            shutil.rmtree(retired, ignore_errors=True)
+            self.directory.rename(retired)
+            self._compact_directory.rename(self.directory)
+            shutil.rmtree(retired, ignore_errors=True)
+            
+            dropped = self._num_dead
+            self._reset()
+            if self.vectors_path.exists():
+                self._load()
+            self._compactions += 1
+            logger.info(f"Compacted {self.directory}: dropped {dropped} dead rows, {self.live_count} remain")
+    
+    @staticmethod
+    def _scan(matrix: np.ndarray, query: np.ndarray, offset: np.ndarray | None, scale: np.ndarray | None) -> np.ndarray:
+        """Approximate (or, for float32, exact) scores of every row."""
+        if matrix.dtype == np.float32:
+            return matrix @ query
+        
+        # BLAS has no float16/int8 GEMV; einsum casts in small internal buffers
+        # instead of materializing a float32 copy of the matrix
+        if matrix.dtype == np.int8:
+            # x ~ offset + scale * code, so q.x ~ q.offset + (q * scale).code
+            return np.einsum("ij,j->i", matrix, query * scale) + float(offset @ query)
+        return np.einsum("ij,j->i", matrix, query)
+    
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+    
+    def search(self, query_vector: list[float], k: int, conditions: list[Condition] | None = None) -> list[tuple[int, float]]:
+        """Top-k (row, cosine score) pairs, best first, among rows matching the conditions."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        
+        with self._lock:
+            count = self.count
+            available = self.live_count
+            if available == 0 or k <= 0:
+                return []
+            selected = self._metadata_index.select(conditions or [], self.metadatas, count)
+            dead = self._dead[:count].copy() if self._num_dead else None
+            matrix = self._matrix[:count]
+            full = self._full[:count] if self._full is not None else None
+            offset, scale = self._offset, self._scale
+        
+        if selected is not None:
+            if dead is not None:
+                selected = selected[~dead[selected]]
+            if len(selected) == 0:
+                return []
+            available = len(selected)
+            matrix = matrix[selected]  # Gather only the matching rows
+        scores = self._scan(matrix, query, offset, scale)
+        if selected is None and dead is not None:
+            scores[dead] = -np.inf  # Dead rows rank last and are never among the top available
+        k = min(k, available)
+        if full is None or self.rescore_multiplier <= 0:
+            top = self._top(scores, k)
+            rows = top if selected is None else selected[top]
+            return [(int(row), float(scores[i])) for row, i in zip(rows, top)]
+        
+        # Exact float32 rescore of the best candidates from the compact scan
+        candidates = self._top(scores, min(available, k * self.rescore_multiplier))
+        rows = np.sort(candidates if selected is None else selected[candidates])  # Sequential reads from the memory map
+        exact = np.asarray(full[rows]) @ query
+        top = self._top(exact, k)
+        return [(int(rows[i]), float(exact[i])) for i in top]
+    
+    def search_documents(self, query_vector: list[float], k: int, conditions: list[Condition] | None = None) -> list[tuple[Document, float]]:
+        """search() with the document of each row, read before a compaction can renumber the rows."""
+        while True:
+            compactions = self._compactions
+            hits = self.search(query_vector, k, conditions)
+            with self._lock:
+                # The scan ran outside the lock; rescan if a compaction happened meanwhile
+                if self._compactions == compactions:
+                    return [(self.document(row), score) for row, score in hits]
+    
+    def get(self, ids: list[str]) -> dict[str, tuple[Document, list[float]]]:
+        """Live documents and their normalized float32 vectors by id (unknown ids are skipped)."""
+        with self._lock:
+            source = self._full if self.quantized else self._matrix
+            return {
+                doc_id: (self.document(self._row_of[doc_id]), source[self._row_of[doc_id]].tolist())
+                for doc_id in dict.fromkeys(ids) if doc_id in self._row_of
+            }
+    
+    def document(self, row: int) -> Document:
+        return Document(id=self.ids[row], page_content=self.texts[row], metadata=dict(self.metadatas[row]))
+
+_open_lock = threading.Lock()
+
+@lru_cache()
+def _open_collection(directory: str, collection_name: str, dtype: str, rescore_multiplier: int) -> NumpyCollection:
+    """Collections are shared process-wide, since services create stores per request."""
+    return NumpyCollection(Path(directory) / collection_name, dtype, rescore_multiplier)
+
+def _get_collection(directory: str, collection_name: str, dtype: str, rescore_multiplier: int) -> NumpyCollection:
+    # lru_cache alone may open a collection twice when upsert threads ask for it at once
+    with _open_lock:
+        return _open_collection(directory, collection_name, dtype, rescore_multiplier)
+
+class NumpyVectorStore(VectorStore):
+    """In-process NumPy implementation (small/medium corpora, CI, benchmarks)."""
+    
+    backend = "numpy"
+    
+    def __init__(self):
+        self.settings = get_settings()
+        self.embeddings = get_embeddings()
+        logger.info("Initialized NumPy vector store")
+    
+    def _get_collection(self, collection_name: str) -> NumpyCollection:
+        return _get_collection(
+            self.settings.numpy_persist_directory,
+            collection_name,
+            self.settings.numpy_vector_dtype,
+            self.settings.numpy_rescore_multiplier
+        )
+    
+    def _add_documents(self, documents: list, collection_name: str, embeddings: list[list[float]] | None = None) -> int:
+        if not documents:
+            return 0
+        collection = self._get_collection(collection_name)
+        texts = [doc.page_content for doc in documents]
+        vectors = self.embeddings.embed_documents(texts) if embeddings is None else embeddings
+        ids = [doc.metadata.get("chunk_id") or str(uuid.uuid4()) for doc in documents]
+        collection.add(ids, texts, [dict(doc.metadata) for doc in documents], vectors)
+        logger.info(f"Added {len(documents)} documents to NumPy collection '{collection_name}'")
+        return len(documents)
+    
+    def _fetch(self, ids: list[str], collection_name: str) -> dict[str, tuple[Document, list[float]]]:
+        return self._get_collection(collection_name).get(ids)
+    
+    def _delete(self, ids: list[str], collection_name: str) -> int:
+        deleted = self._get_collection(collection_name).delete(ids)
+        logger.info(f"Deleted {deleted} documents from NumPy collection '{collection_name}'")
+        return deleted
+    
+    def similarity_search(self, query: str, collection_name: str, k: int = 5, filter: dict | None = None) -> list:
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), collection_name, k=k, filter=filter)
+    
+    def similarity_search_by_vector(
+        self,
+        embedding: list[float],
+        collection_name: str,
+        k: int = 5,
+        filter: dict | None = None
+    ) -> list:
+        collection = self._get_collection(collection_name)
+        hits = collection.search_documents(embedding, k, conditions=parse_filter(filter))
+        results = [doc for doc, _ in hits]
+        logger.info(f"NumPy search returned {len(results)} results for collection '{collection_name}'")
+        return results
\ No newline at end of file
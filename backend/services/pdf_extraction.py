@@ -0,0 +1,97 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Iterator
+from langchain_core.documents import Document
+from pypdf import PdfReader
+import logging
+import math
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> list[str]:
+    """Extract text for pages [start, end) (runs in a worker process)."""
+    reader = PdfReader(pdf_path)
+    return [reader.pages[i].extract_text().strip() for i in range(start, end)]
+
+@lru_cache()
+def _get_process_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared extraction pool (spawned, since the API process runs threads)."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+def _page_metadata(source: str, total_pages: int, page: int, page_labels: list[str]) -> dict:
+    """Same per-page metadata keys PyPDFLoader produces."""
+    return {
+        "source": source,
+        "total_pages": total_pages,
+        "page": page,
+        "page_label": page_labels[page]
+    }
+
+def extract_pages(
+    pdf_path: Path,
+    workers: int = 1,
+    min_pages_for_parallel: int = 50,
+    pages_per_task: int | None = None
+) -> Iterator[Document]:
+    """
+    Extract one Document per PDF page, in page order.
+    
+    With workers > 1 and a large enough document, page ranges are extracted
+    in a process pool and reassembled in order; otherwise pages are read
+    serially. Either way each Document carries a zero-based "page" in its
+    metadata, exactly like PyPDFLoader.
+    
+    Args:
+        pdf_path: Local path of the PDF
+        workers: Number of extraction processes (1 = serial)
+        min_pages_for_parallel: Smaller documents are always read serially
+        pages_per_task: Pages per worker task (defaults to ~4 tasks per worker)
+    
+    Yields:
+        Page Documents in page order
+    """
+    source = str(pdf_path)
+    reader = PdfReader(source)
+    total_pages = len(reader.pages)
+    page_labels = list(reader.page_labels)
+    
+    if workers <= 1 or total_pages < min_pages_for_parallel:
+        for page in range(total_pages):
+            yield Document(
+                page_content=reader.pages[page].extract_text().strip(),
+                metadata=_page_metadata(source, total_pages, page, page_labels)
+            )
+        return
+    
+    # Several ranges per worker keeps the pool busy when some pages are heavier than others
+    pages_per_task = pages_per_task or max(1, math.ceil(total_pages / (workers * 4)))
+    ranges = [(start, min(start + pages_per_task, total_pages)) for start in range(0, total_pages, pages_per_task)]
+    logger.info(f"Extracting {total_pages} pages from '{pdf_path.name}' in {len(ranges)} ranges across {workers} processes")
+    
+    # Only a window of ranges is submitted ahead of the consumer, so a slow
+    # consumer doesn't leave the whole document's text buffered in memory
+    pool = _get_process_pool(workers)
+    pending = iter(ranges)
+    futures = deque(
+        (start, pool.submit(_extract_page_range, source, start, end))
+        for start, end in islice(pending, workers * 2)
+    )
+    try:
+        while futures:
+            start, future = futures.popleft()
+            texts = future.result()
+            for next_start, next_end in islice(pending, 1):
+                futures.append((next_start, pool.submit(_extract_page_range, source, next_start, next_end)))
+            for offset, text in enumerate(texts):
+                page = start + offset
+                yield Document(
+                    page_content=text,
+                    metadata=_page_metadata(source, total_pages, page, page_labels)
+                )
+    finally:
+        for _, future in futures:
+            future.cancel()
\ No newline at end of file
@@ -1,113 +1,290 @@
+from collections import deque
+from itertools import count
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFLoader
+from typing import Callable
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from services.vector_store import get_vector_store
-from datetime import datetime
+from services.vector_store import VectorStore, get_vector_store
+from services.registry import get_ingestion_registry
+from services.ingestion import IngestionPipeline, batched, ingestion_stage, make_chunk_id, stale_chunk_ids
+from services.pdf_extraction import extract_pages
+from core.config import get_settings
 import logging
-import uuid
 import hashlib
 
 logger = logging.getLogger(__name__)
 
+def pdf_filter(
+    source: str | None = None,
+    pdf_hash: str | None = None,
+    page_from: int | None = None,
+    page_to: int | None = None
+) -> dict | None:
+    """Metadata filter restricting a PDF search to one document and/or a page range."""
+    filter = {}
+    if source:
+        filter["source"] = source
+    if pdf_hash:
+        filter["pdf_hash"] = pdf_hash
+    pages = {}
+    if page_from is not None:
+        pages["$gte"] = page_from
+    if page_to is not None:
+        pages["$lte"] = page_to
+    if pages:
+        filter["page_number"] = pages
+    return filter or None
+
 class PDFService:
-    def __init__(self):
-        self.vector_store = get_vector_store()
+    def __init__(self, vector_store: VectorStore | None = None):
+        self.settings = get_settings()
+        self.vector_store = vector_store or get_vector_store()
+        self.registry = get_ingestion_registry()  # Track processed PDFs
         self.collection_name = "pdf_data_collection"
-        self.metadata_collection = "pdf_metadata"  # Track processed PDFs
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
             separators=["\n\n", "\n", ". ", " ", ""]
         )
+        self.pipeline = IngestionPipeline(
+            self.vector_store,
+            self.collection_name,
+            self.text_splitter,
+            batch_size=self.settings.ingestion_batch_size,
+            max_in_flight=self.settings.ingestion_max_in_flight,
+            source_type="pdf"
+        )
     
     def _calculate_pdf_hash(self, pdf_path: Path) -> str:
         """Calculate hash of PDF file."""
+        hasher = hashlib.sha256()
         with open(pdf_path, 'rb') as f:
-            return hashlib.sha256(f.read()).hexdigest()
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
     
     def _is_already_processed(self, pdf_hash: str) -> bool:
-        """Check if PDF hash exists in metadata collection."""
-        try:
-            results = self.vector_store.similarity_search(
-                query=pdf_hash,
-                collection_name=self.metadata_collection,
-                k=1
-            )
-            return len(results) > 0 and pdf_hash in results[0].page_content
-        except:
-            return False
+        """Check if PDF hash exists in the ingestion registry."""
+        return self.registry.is_processed(pdf_hash)
     
-    def _store_metadata(self, pdf_hash: str, filename: str, chunks_count: int):
-        """Store PDF metadata to prevent duplicates."""
-        from langchain.schema import Document
-        
-        metadata_doc = Document(
-            page_content=pdf_hash,  # Store hash as content for exact matching
-            metadata={
-                "filename": filename,
-                "pdf_hash": pdf_hash,
-                "chunks_count": chunks_count,
-                "processed_at": str(datetime.utcnow())
-            }
-        )
-        self.vector_store.add_documents([metadata_doc], self.metadata_collection)
+    def list_documents(self) -> list:
+        """List processed PDFs."""
+        return self.registry.list_sources(kind="pdf")
+    
+    def _page_chunks(self, record) -> dict[str, deque[list[str]]]:
+        """Chunk IDs of each page of an ingested PDF by page text hash (pages with the same text in page order)."""
+        chunk_ids = self.registry.get_chunk_ids(record.key)
+        page_chunks = {}
+        position = 0
+        for _, page_hash, num_chunks in record.metadata.get("pages", []):
+            page_chunks.setdefault(page_hash, deque()).append(chunk_ids[position:position + num_chunks])
+            position += num_chunks
+        return page_chunks
     
-    def process_pdf(self, pdf_path: Path, force_reprocess: bool = False) -> int:
-        """Load, chunk, and store PDF."""
+    def process_pdf(
+        self,
+        pdf_path: Path,
+        force_reprocess: bool = False,
+        pdf_hash: str | None = None,
+        filename: str | None = None,
+        progress: Callable | None = None,
+        revision_of: str | None = None
+    ) -> int:
+        """
+        Load, chunk, and store PDF.
+        
+        Every page's text hash and chunk count are recorded with the PDF. With
+        revision_of, the PDF replaces the earlier document of that filename:
+        pages whose text appears in the earlier revision keep their chunks
+        (matched by text, so inserted or removed pages don't shift the pages
+        after them), relabelled with the new hash and page numbers; only new
+        or changed pages are chunked and embedded, and the chunks of changed
+        or removed pages are deleted.
+        
+        Args:
+            pdf_path: Local path of the PDF to process
+            force_reprocess: Whether to reprocess if already exists
+            pdf_hash: SHA-256 of the file, if already computed during upload
+            filename: Original filename (defaults to pdf_path.name)
+            progress: Optional callback(stage, **counts) for job status reporting
+            revision_of: Filename of a processed PDF this is a new revision of
+        
+        Returns:
+            Number of chunks embedded and stored
+        
+        Raises:
+            ValueError: If PDF already processed and force_reprocess=False,
+                or no processed PDF is named revision_of
+        """
+        filename = filename or pdf_path.name
+        progress = progress or (lambda *args, **kwargs: None)
+        
+        previous = None
+        if revision_of:
+            previous = self.registry.find_by_name("pdf", revision_of)
+            if previous is None:
+                raise ValueError(f"No processed PDF named '{revision_of}' to revise")
+            filename = revision_of  # The revision takes over the document's name
+        
+        # Calculate PDF hash
+        if pdf_hash is None:
+            with ingestion_stage("pdf", "hash"):
+                pdf_hash = self._calculate_pdf_hash(pdf_path)
+        
+        # Claim the hash so concurrent uploads of the same file don't both ingest it
+        if not self.registry.claim(pdf_hash, "pdf", filename, force=force_reprocess):
+            logger.warning(f"PDF already processed: {filename} (hash: {pdf_hash[:8]}...)")
+            raise ValueError(
+                f"PDF '{filename}' has already been processed or is being processed. "
+                f"Use force_reprocess=True to override."
+            )
+        
         try:
-            # Calculate PDF hash
-            pdf_hash = self._calculate_pdf_hash(pdf_path)
+            previous_ids = self.registry.get_chunk_ids(pdf_hash)
+            previous_pages = {}
+            reserved_ids = set()  # Chunk IDs of the earlier revision, which reused pages keep
+            if previous is not None and previous.key != pdf_hash:
+                revision_ids = self.registry.get_chunk_ids(previous.key)
+                previous_ids += revision_ids
+                reserved_ids = set(revision_ids)
+                previous_pages = self._page_chunks(previous)
             
-            # Check if already processed
-            if not force_reprocess and self._is_already_processed(pdf_hash):
-                logger.warning(f"PDF already processed: {pdf_path.name} (hash: {pdf_hash[:8]}...)")
-                raise ValueError(
-                    f"PDF '{pdf_path.name}' has already been processed. "
-                    f"Use force_reprocess=True to override."
-                )
+            # Pages are extracted (in parallel for large documents), chunked, and
+            # stored batch by batch, so memory stays flat for large PDFs
+            pages = extract_pages(
+                pdf_path,
+                workers=self.settings.pdf_extraction_workers,
+                min_pages_for_parallel=self.settings.pdf_parallel_min_pages
+            )
             
-            # Load PDF
-            loader = PyPDFLoader(str(pdf_path), extract_images=False)
-            raw_documents = loader.load()
+            page_hashes: dict[int, str] = {}
+            page_chunk_ids: dict[int, list[str]] = {}
+            relabelled: dict[str, dict] = {}  # Reused chunk ID -> metadata of the page it is now on
+            reused_pages = 0
             
-            # Split into chunks
-            documents = self.text_splitter.split_documents(raw_documents)
+            def changed_pages():
+                # A page is kept if the earlier revision had a page with the same text, at any page number
+                nonlocal reused_pages
+                for position, page in enumerate(pages):
+                    index = page.metadata.setdefault("page", position)
+                    page_hashes[index] = hashlib.sha256(page.page_content.encode("utf-8")).hexdigest()
+                    page_chunk_ids[index] = []
+                    if previous_pages.get(page_hashes[index]):
+                        page_chunk_ids[index] = previous_pages[page_hashes[index]].popleft()
+                        metadata = {**page.metadata, "source": filename, "page_number": index + 1, "pdf_hash": pdf_hash}
+                        relabelled.update((chunk_id, metadata) for chunk_id in page_chunk_ids[index])
+                        reused_pages += 1
+                        continue
+                    yield page
             
-            # Add metadata
-            for i, doc in enumerate(documents):
-                doc.metadata["source"] = pdf_path.name
+            positions = count()
+            
+            def annotate(doc, index):
+                doc.metadata["source"] = filename
                 doc.metadata["page_number"] = doc.metadata.get("page", 0) + 1  # Default value for safety
-                doc.metadata["chunk_id"] = str(uuid.uuid4())
+                # A revision back to an earlier file must not reuse the IDs its reused pages kept
+                chunk_id = make_chunk_id(pdf_hash, next(positions))
+                while chunk_id in reserved_ids:
+                    chunk_id = make_chunk_id(pdf_hash, next(positions))
+                doc.metadata["chunk_id"] = chunk_id
                 doc.metadata["pdf_hash"] = pdf_hash  # Track which PDF this came from
+                page_chunk_ids[doc.metadata.get("page", 0)].append(doc.metadata["chunk_id"])
             
-            # Store in vector DB
-            num_stored = self.vector_store.add_documents(documents, self.collection_name)
-            
-            # Store metadata for duplicate detection
-            self._store_metadata(pdf_hash, pdf_path.name, num_stored)
+            # Chunks are upserted over the previous version before its leftovers
+            # are deleted, so the document never drops out of search
+            result = self.pipeline.run(changed_pages(), annotate, progress)
+            num_stored = result.chunks_stored
+            chunk_ids = [chunk_id for index in page_hashes for chunk_id in page_chunk_ids[index]]
+            chunks_reused = len(chunk_ids) - len(result.chunk_ids)
+            with ingestion_stage("pdf", "cleanup"):
+                # Reused chunks are moved to this revision's hash and page numbers (their vectors are kept)
+                for batch in batched(relabelled.items(), self.settings.ingestion_batch_size):
+                    self.vector_store.update_metadata(dict(batch), self.collection_name)
+                self.vector_store.delete(stale_chunk_ids(previous_ids, chunk_ids), self.collection_name)
+                
+                # Record source, chunk IDs, and page hashes for duplicate detection and revisions
+                pages_metadata = [[index, page_hashes[index], len(page_chunk_ids[index])] for index in page_hashes]
+                self.registry.complete(pdf_hash, chunk_ids, {"pages": pages_metadata, "chunks_duplicate": result.chunks_duplicate})
+                if previous is not None and previous.key != pdf_hash:
+                    self.registry.remove(previous.key)
+            progress(
+                "stored",
+                chunks_stored=num_stored,
+                chunks_duplicate=result.chunks_duplicate,
+                pages_reused=reused_pages,
+                chunks_reused=chunks_reused
+            )
             
-            logger.info(f"Processed PDF '{pdf_path.name}': {num_stored} chunks stored")
+            logger.info(
+                f"Processed PDF '{filename}': {num_stored} chunks stored, "
+                f"{result.chunks_duplicate} near-duplicates linked, "
+                f"{chunks_reused} reused from {reused_pages} unchanged pages"
+            )
             return num_stored
             
         except Exception as e:
+            self.registry.release(pdf_hash)
             logger.exception(f"Error processing PDF '{pdf_path}'")
             raise
     
-    def search(self, query: str, k: int = 5) -> list:
+    def delete_document(self, pdf_hash: str) -> int:
+        """
+        Delete a PDF's chunks from the knowledge base and forget it.
+        
+        Args:
+            pdf_hash: SHA-256 of the PDF
+        
+        Returns:
+            Number of chunks deleted
+        
+        Raises:
+            KeyError: If no PDF with this hash was ingested
+            ValueError: If the PDF is being ingested right now
+        """
+        record = self.registry.get(pdf_hash)
+        if record is None or record.kind != "pdf":
+            raise KeyError(pdf_hash)
+        
+        # Claiming blocks a concurrent (re-)ingestion while the chunks are deleted
+        if not self.registry.claim(pdf_hash, "pdf", record.name, force=True):
+            raise ValueError(f"PDF '{record.name}' is being processed; try again when it has finished")
+        try:
+            chunk_ids = self.registry.get_chunk_ids(pdf_hash)
+            self.vector_store.delete(chunk_ids, self.collection_name)
+        except Exception:
+            self.registry.release(pdf_hash)
+            logger.exception(f"Error deleting PDF '{record.name}'")
+            raise
+        
+        self.registry.remove(pdf_hash)
+        logger.info(f"Deleted PDF '{record.name}': {len(chunk_ids)} chunks removed")
+        return len(chunk_ids)
+    
+    def _format_results(self, results: list) -> list:
+        return [
+            {
+                "content": res.page_content,
+                "source": res.metadata.get("source", "unknown"),
+                "page_number": res.metadata.get("page_number", 0)
+            }
+            for res in results
+        ]
+    
+    def search(self, query: str, k: int = 5, filter: dict | None = None) -> list:
         """Search PDF knowledge base."""
         try:
-            results = self.vector_store.similarity_search(query, self.collection_name, k=k)
-            
-            structured_results = []
-            for res in results:
-                structured_results.append({
-                    "content": res.page_content,
-                    "source": res.metadata.get("source", "unknown"),
-                    "page_number": res.metadata.get("page_number", 0)
-                })
-            
-            return structured_results
+            results = self.vector_store.similarity_search(query, self.collection_name, k=k, filter=filter)
+            return self._format_results(results)
             
+        except Exception as e:
+            logger.exception("PDF search failed")
+            raise
+    
+    async def asearch(self, query: str, k: int = 5, mode: str = "dense", filter: dict | None = None) -> list:
+        """Search PDF knowledge base without blocking the event loop (mode: dense, lexical, or hybrid)."""
+        try:
+            results = await self.vector_store.asearch(query, self.collection_name, k=k, mode=mode, filter=filter)
+            return self._format_results(results)
+        
         except Exception as e:
             logger.exception("PDF search failed")
             raise
\ No newline at end of file
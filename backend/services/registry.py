@@ -0,0 +1,555 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from core.config import get_settings
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+STATUS_PROCESSING = "processing"
+STATUS_COMPLETED = "completed"
+
+@dataclass
+class IngestionRecord:
+    """A single ingested source (PDF content hash or URL hash)."""
+    key: str
+    kind: str
+    name: str
+    status: str
+    chunks_count: int = 0
+    created_at: str = ""
+    updated_at: str = ""
+    metadata: dict = field(default_factory=dict)
+
+class ClaimHeartbeat:
+    """
+    Refreshes the claims this process holds while their ingestions run.
+    
+    Claims not refreshed within the TTL belong to crashed workers and can be
+    taken over; a daemon thread refreshes the held ones every interval (it
+    exits once none are held, and is restarted by the next claim).
+    """
+    
+    def __init__(self, refresh, interval: float):
+        self._refresh = refresh
+        self.interval = interval
+        self._keys: set[str] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+    
+    def hold(self, key: str):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            self._keys.add(key)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="registry-heartbeat", daemon=True)
+                self._thread.start()
+    
+    def drop(self, key: str):
+        with self._lock:
+            self._keys.discard(key)
+    
+    def stop(self):
+        """Stop refreshing (the registry is closing); the thread exits at its next wakeup."""
+        with self._lock:
+            self._keys.clear()
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._keys:
+                    self._thread = None
+                    return
+                keys = list(self._keys)
+            try:
+                self._refresh(keys)
+            except Exception:
+                logger.exception(f"Failed to refresh {len(keys)} ingestion claims")
+
+class IngestionRegistry(ABC):
+    """Exact-key registry of ingested sources and their chunk IDs."""
+    
+    def __init__(self, claim_ttl_seconds: int):
+        self.claim_ttl = timedelta(seconds=claim_ttl_seconds)
+        # Held claims are refreshed four times per TTL, so only a crashed worker's claim expires
+        self._heartbeat = ClaimHeartbeat(self.refresh_claims, claim_ttl_seconds / 4)
+
+    @abstractmethod
+    def claim(self, key: str, kind: str, name: str, force: bool = False) -> bool:
+        """
+        Atomically reserve a source for ingestion.
+
+        Returns False if the source is already ingested (unless force=True)
+        or is currently being ingested by another request. A successful
+        claim is kept alive by this process until it is completed,
+        released or removed.
+        """
+        pass
+
+    @abstractmethod
+    def complete(self, key: str, chunk_ids: list[str], metadata: dict | None = None) -> None:
+        """Mark a claimed source as ingested and record its chunk IDs."""
+        pass
+
+    @abstractmethod
+    def release(self, key: str) -> None:
+        """Drop an in-flight claim after a failed ingestion."""
+        pass
+    
+    @abstractmethod
+    def remove(self, key: str) -> None:
+        """Forget a source and its chunk IDs."""
+        pass
+
+    @abstractmethod
+    def refresh_claims(self, keys: list[str]) -> None:
+        """Renew in-flight claims, so they are not taken over as abandoned."""
+        pass
+
+    @abstractmethod
+    def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """
+        Take or renew a named lease for ttl_seconds from now.
+        
+        Returns False while another holder's lease has not expired, so of
+        several processes only one runs singleton work (such as scheduled
+        refreshes); it renews the lease each round, and another process takes
+        over once it stops.
+        """
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> IngestionRecord | None:
+        """Look up a source by key."""
+        pass
+    
+    @abstractmethod
+    def find_by_name(self, kind: str, name: str) -> IngestionRecord | None:
+        """Most recently updated ingested source of a kind with this name."""
+        pass
+
+    @abstractmethod
+    def list_sources(self, kind: str | None = None) -> list[IngestionRecord]:
+        """List ingested sources, optionally filtered by kind."""
+        pass
+
+    @abstractmethod
+    def get_chunk_ids(self, key: str) -> list[str]:
+        """Chunk IDs stored for a source, in chunk order."""
+        pass
+
+    @abstractmethod
+    def find_source_of_chunk(self, chunk_id: str) -> str | None:
+        """Key of the source a chunk belongs to."""
+        pass
+
+    def is_processed(self, key: str) -> bool:
+        """Check if a source has been fully ingested."""
+        record = self.get(key)
+        return record is not None and record.status == STATUS_COMPLETED
+
+    def close(self) -> None:
+        """Stop refreshing held claims and release connections."""
+        self._heartbeat.stop()
+
+class SQLiteIngestionRegistry(IngestionRegistry):
+    """
+    SQLite implementation (single file, safe across threads and worker processes).
+    
+    The file is local to one host, so replicas on other hosts each see their
+    own sources; multi-replica deployments use the PostgreSQL registry.
+    """
+
+    def __init__(self, db_path: str, claim_ttl_seconds: int = 600):
+        super().__init__(claim_ttl_seconds)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_path),
+            check_same_thread=False,
+            isolation_level=None,  # Explicit transactions only
+            timeout=30
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._init_schema()
+        logger.info(f"Initialized ingestion registry at {self.db_path}")
+
+    def _init_schema(self):
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sources (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    chunks_count INTEGER NOT NULL DEFAULT 0,
+                    metadata TEXT NOT NULL DEFAULT '{}',
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_sources_kind ON sources(kind);
+                CREATE TABLE IF NOT EXISTS chunks (
+                    chunk_id TEXT PRIMARY KEY,
+                    source_key TEXT NOT NULL,
+                    position INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source_key, position);
+                CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    expires_at TEXT NOT NULL
+                );
+            """)
+
+    def _now(self) -> str:
+        return datetime.utcnow().isoformat()
+
+    def _row_to_record(self, row: sqlite3.Row) -> IngestionRecord:
+        return IngestionRecord(
+            key=row["key"],
+            kind=row["kind"],
+            name=row["name"],
+            status=row["status"],
+            chunks_count=row["chunks_count"],
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+            metadata=json.loads(row["metadata"])
+        )
+
+    def claim(self, key: str, kind: str, name: str, force: bool = False) -> bool:
+        now = self._now()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock, so check-and-set is atomic across processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT status, updated_at FROM sources WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self._conn.execute(
+                        "INSERT INTO sources (key, kind, name, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, kind, name, STATUS_PROCESSING, now, now)
+                    )
+                    self._conn.execute("COMMIT")
+                    self._heartbeat.hold(key)
+                    return True
+
+                if row["status"] == STATUS_PROCESSING:
+                    # Allow takeover of claims abandoned by a crashed worker
+                    claimed_at = datetime.fromisoformat(row["updated_at"])
+                    if datetime.utcnow() - claimed_at < self.claim_ttl:
+                        self._conn.execute("ROLLBACK")
+                        return False
+                elif not force:
+                    self._conn.execute("ROLLBACK")
+                    return False
+
+                self._conn.execute(
+                    "UPDATE sources SET status = ?, name = ?, updated_at = ? WHERE key = ?",
+                    (STATUS_PROCESSING, name, now, key)
+                )
+                self._conn.execute("COMMIT")
+                self._heartbeat.hold(key)
+                return True
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def complete(self, key: str, chunk_ids: list[str], metadata: dict | None = None) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM chunks WHERE source_key = ?", (key,))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (chunk_id, source_key, position) VALUES (?, ?, ?)",
+                    [(chunk_id, key, position) for position, chunk_id in enumerate(chunk_ids)]
+                )
+                self._conn.execute(
+                    "UPDATE sources SET status = ?, chunks_count = ?, metadata = ?, updated_at = ? WHERE key = ?",
+                    (STATUS_COMPLETED, len(chunk_ids), json.dumps(metadata or {}), self._now(), key)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._heartbeat.drop(key)
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            # Only drop claims for sources that never completed; re-ingestion failures keep the old record
+            self._conn.execute(
+                "DELETE FROM sources WHERE key = ? AND status = ? AND chunks_count = 0",
+                (key, STATUS_PROCESSING)
+            )
+            self._conn.execute(
+                "UPDATE sources SET status = ? WHERE key = ? AND status = ?",
+                (STATUS_COMPLETED, key, STATUS_PROCESSING)
+            )
+        self._heartbeat.drop(key)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM chunks WHERE source_key = ?", (key,))
+                self._conn.execute("DELETE FROM sources WHERE key = ?", (key,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._heartbeat.drop(key)
+
+    def refresh_claims(self, keys: list[str]) -> None:
+        placeholders = ", ".join("?" * len(keys))
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE sources SET updated_at = ? WHERE status = ? AND key IN ({placeholders})",
+                (self._now(), STATUS_PROCESSING, *keys)
+            )
+
+    def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        now = datetime.utcnow()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+                if row is not None and row["holder"] != holder and datetime.fromisoformat(row["expires_at"]) > now:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                    (name, holder, (now + timedelta(seconds=ttl_seconds)).isoformat())
+                )
+                self._conn.execute("COMMIT")
+                return True
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    def get(self, key: str) -> IngestionRecord | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM sources WHERE key = ?", (key,)).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def find_by_name(self, kind: str, name: str) -> IngestionRecord | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM sources WHERE kind = ? AND name = ? AND status = ? ORDER BY updated_at DESC LIMIT 1",
+                (kind, name, STATUS_COMPLETED)
+            ).fetchone()
+        return self._row_to_record(row) if row else None
+    
+    def list_sources(self, kind: str | None = None) -> list[IngestionRecord]:
+        with self._lock:
+            if kind:
+                rows = self._conn.execute(
+                    "SELECT * FROM sources WHERE kind = ? ORDER BY created_at", (kind,)
+                ).fetchall()
+            else:
+                rows = self._conn.execute("SELECT * FROM sources ORDER BY created_at").fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    def get_chunk_ids(self, key: str) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE source_key = ? ORDER BY position", (key,)
+            ).fetchall()
+        return [row["chunk_id"] for row in rows]
+
+    def find_source_of_chunk(self, chunk_id: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT source_key FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()
+        return row["source_key"] if row else None
+
+class PostgresIngestionRegistry(IngestionRegistry):
+    """PostgreSQL implementation, shared by every worker and replica."""
+
+    def __init__(self, database_url: str, claim_ttl_seconds: int = 600, pool_size: int = 4):
+        super().__init__(claim_ttl_seconds)
+        # Imported here so SQLite deployments don't need the driver
+        from psycopg.rows import dict_row
+        from psycopg_pool import ConnectionPool
+        self._pool = ConnectionPool(
+            database_url,
+            min_size=1,
+            max_size=pool_size,
+            kwargs={"row_factory": dict_row},
+            open=True
+        )
+        self._init_schema()
+        logger.info("Initialized ingestion registry in PostgreSQL")
+
+    def _init_schema(self):
+        with self._pool.connection() as conn:
+            # Replicas starting together would otherwise race to create the tables
+            conn.execute("SELECT pg_advisory_xact_lock(hashtext('omniknow_registry_schema'))")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sources (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    chunks_count INTEGER NOT NULL DEFAULT 0,
+                    metadata JSONB NOT NULL DEFAULT '{}',
+                    created_at TIMESTAMP NOT NULL,
+                    updated_at TIMESTAMP NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_sources_kind ON sources(kind);
+                CREATE TABLE IF NOT EXISTS chunks (
+                    chunk_id TEXT PRIMARY KEY,
+                    source_key TEXT NOT NULL,
+                    position INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source_key, position);
+                CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    expires_at TIMESTAMP NOT NULL
+                );
+            """)
+
+    def _row_to_record(self, row: dict) -> IngestionRecord:
+        return IngestionRecord(
+            key=row["key"],
+            kind=row["kind"],
+            name=row["name"],
+            status=row["status"],
+            chunks_count=row["chunks_count"],
+            created_at=row["created_at"].isoformat(),
+            updated_at=row["updated_at"].isoformat(),
+            metadata=row["metadata"]
+        )
+
+    def claim(self, key: str, kind: str, name: str, force: bool = False) -> bool:
+        now = datetime.utcnow()
+        with self._pool.connection() as conn:
+            # One statement, so check-and-set is atomic across replicas: a new source is inserted,
+            # an abandoned claim (or, with force, a completed source) is taken over
+            row = conn.execute(
+                """
+                INSERT INTO sources (key, kind, name, status, created_at, updated_at) VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (key) DO UPDATE SET status = EXCLUDED.status, name = EXCLUDED.name, updated_at = EXCLUDED.updated_at
+                WHERE (sources.status = %s AND sources.updated_at <= %s) OR (sources.status = %s AND %s)
+                RETURNING key
+                """,
+                (key, kind, name, STATUS_PROCESSING, now, now, STATUS_PROCESSING, now - self.claim_ttl, STATUS_COMPLETED, force)
+            ).fetchone()
+        if row is None:
+            return False
+        self._heartbeat.hold(key)
+        return True
+
+    def complete(self, key: str, chunk_ids: list[str], metadata: dict | None = None) -> None:
+        with self._pool.connection() as conn:  # One transaction, committed on exit
+            conn.execute("DELETE FROM chunks WHERE source_key = %s", (key,))
+            with conn.cursor() as cursor:
+                cursor.executemany(
+                    """
+                    INSERT INTO chunks (chunk_id, source_key, position) VALUES (%s, %s, %s)
+                    ON CONFLICT (chunk_id) DO UPDATE SET source_key = EXCLUDED.source_key, position = EXCLUDED.position
+                    """,
+                    [(chunk_id, key, position) for position, chunk_id in enumerate(chunk_ids)]
+                )
+            conn.execute(
+                "UPDATE sources SET status = %s, chunks_count = %s, metadata = %s::jsonb, updated_at = %s WHERE key = %s",
+                (STATUS_COMPLETED, len(chunk_ids), json.dumps(metadata or {}), datetime.utcnow(), key)
+            )
+        self._heartbeat.drop(key)
+
+    def release(self, key: str) -> None:
+        with self._pool.connection() as conn:
+            # Only drop claims for sources that never completed; re-ingestion failures keep the old record
+            conn.execute(
+                "DELETE FROM sources WHERE key = %s AND status = %s AND chunks_count = 0",
+                (key, STATUS_PROCESSING)
+            )
+            conn.execute(
+                "UPDATE sources SET status = %s WHERE key = %s AND status = %s",
+                (STATUS_COMPLETED, key, STATUS_PROCESSING)
+            )
+        self._heartbeat.drop(key)
+
+    def remove(self, key: str) -> None:
+        with self._pool.connection() as conn:
+            conn.execute("DELETE FROM chunks WHERE source_key = %s", (key,))
+            conn.execute("DELETE FROM sources WHERE key = %s", (key,))
+        self._heartbeat.drop(key)
+
+    def refresh_claims(self, keys: list[str]) -> None:
+        with self._pool.connection() as conn:
+            conn.execute(
+                "UPDATE sources SET updated_at = %s WHERE status = %s AND key = ANY(%s)",
+                (datetime.utcnow(), STATUS_PROCESSING, keys)
+            )
+
+    def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        now = datetime.utcnow()
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                """
+                INSERT INTO leases (name, holder, expires_at) VALUES (%s, %s, %s)
+                ON CONFLICT (name) DO UPDATE SET holder = EXCLUDED.holder, expires_at = EXCLUDED.expires_at
+                WHERE leases.holder = EXCLUDED.holder OR leases.expires_at <= %s
+                RETURNING name
+                """,
+                (name, holder, now + timedelta(seconds=ttl_seconds), now)
+            ).fetchone()
+        return row is not None
+
+    def get(self, key: str) -> IngestionRecord | None:
+        with self._pool.connection() as conn:
+            row = conn.execute("SELECT * FROM sources WHERE key = %s", (key,)).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def find_by_name(self, kind: str, name: str) -> IngestionRecord | None:
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM sources WHERE kind = %s AND name = %s AND status = %s ORDER BY updated_at DESC LIMIT 1",
+                (kind, name, STATUS_COMPLETED)
+            ).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def list_sources(self, kind: str | None = None) -> list[IngestionRecord]:
+        with self._pool.connection() as conn:
+            if kind:
+                rows = conn.execute("SELECT * FROM sources WHERE kind = %s ORDER BY created_at", (kind,)).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM sources ORDER BY created_at").fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    def get_chunk_ids(self, key: str) -> list[str]:
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT chunk_id FROM chunks WHERE source_key = %s ORDER BY position", (key,)
+            ).fetchall()
+        return [row["chunk_id"] for row in rows]
+
+    def find_source_of_chunk(self, chunk_id: str) -> str | None:
+        with self._pool.connection() as conn:
+            row = conn.execute("SELECT source_key FROM chunks WHERE chunk_id = %s", (chunk_id,)).fetchone()
+        return row["source_key"] if row else None
+
+    def close(self) -> None:
+        super().close()
+        self._pool.close()
+
+@lru_cache()
+def get_ingestion_registry() -> IngestionRegistry:
+    """Singleton ingestion registry for the configured backend."""
+    settings = get_settings()
+
+    if settings.registry_backend == "sqlite":
+        return SQLiteIngestionRegistry(settings.registry_path, settings.registry_claim_ttl_seconds)
+    if settings.registry_backend == "postgres":
+        if not settings.registry_database_url:
+            raise ValueError("REGISTRY_DATABASE_URL is required for the postgres registry backend")
+        return PostgresIngestionRegistry(settings.registry_database_url, settings.registry_claim_ttl_seconds)
+    raise ValueError(f"Unsupported registry backend: {settings.registry_backend}")
\ No newline at end of file
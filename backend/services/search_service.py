@@ -0,0 +1,102 @@
+from core.config import get_settings
+from services.pdf_service import PDFService
+from services.web_service import WebService
+from services.lexical_index import fuse_ranked
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class KnowledgeSearchService:
+    """Single search across the PDF and web knowledge bases."""
+    
+    def __init__(self, pdf_service: PDFService | None = None, web_service: WebService | None = None):
+        self.settings = get_settings()
+        self.services = {
+            "pdf": pdf_service or PDFService(),
+            "web": web_service or WebService()
+        }
+        self.vector_store = self.services["pdf"].vector_store
+    
+    async def asearch(
+        self,
+        query: str,
+        k: int = 8,
+        mode: str = "dense",
+        sources: list[str] | None = None
+    ) -> list:
+        """
+        Search several collections concurrently and return one ranked list.
+        
+        The query is embedded once and shared by every collection. Each
+        collection's ranked results are then merged by reciprocal rank fusion,
+        and every result records which knowledge base it came from.
+        
+        Args:
+            query: Search query
+            k: Number of results after fusion
+            mode: "dense", "lexical", or "hybrid" (see VectorStore.asearch)
+            sources: Knowledge bases to search ("pdf", "web"); all by default
+        
+        Returns:
+            Results with content, provenance fields, and the fused score
+        """
+        selected = {name: self.services[name] for name in (sources or self.services)}
+        
+        try:
+            embedding = None
+            if mode != "lexical":
+                embedding = await self.vector_store.embeddings.aembed_query(query)
+            
+            per_collection = await asyncio.gather(*[
+                self.vector_store.asearch(query, service.collection_name, k=k, mode=mode, embedding=embedding)
+                for service in selected.values()
+            ])
+            return self._fuse(list(selected), per_collection, k)
+        
+        except Exception as e:
+            logger.exception("Knowledge search failed")
+            raise
+    
+    def search(
+        self,
+        query: str,
+        k: int = 8,
+        mode: str = "dense",
+        sources: list[str] | None = None
+    ) -> list:
+        """Search from synchronous code, one collection after another (arguments as for asearch)."""
+        selected = {name: self.services[name] for name in (sources or self.services)}
+        
+        try:
+            embedding = None
+            if mode != "lexical":
+                embedding = self.vector_store.embeddings.embed_query(query)
+            
+            per_collection = [
+                self.vector_store.search(query, service.collection_name, k=k, mode=mode, embedding=embedding)
+                for service in selected.values()
+            ]
+            return self._fuse(list(selected), per_collection, k)
+        
+        except Exception as e:
+            logger.exception("Knowledge search failed")
+            raise
+    
+    def _fuse(self, names: list[str], per_collection: list[list], k: int) -> list:
+        """Merge each collection's ranked results into one list, recording every result's knowledge base."""
+        # Remember where each document came from before the lists are merged
+        origin = {}
+        for name, results in zip(names, per_collection):
+            for doc in results:
+                origin[id(doc)] = name
+        
+        structured_results = []
+        for doc, score in fuse_ranked(per_collection, k=k, rrf_k=self.settings.rrf_k):
+            name = origin[id(doc)]
+            structured_results.append({
+                **self.services[name]._format_results([doc])[0],
+                "collection": name,
+                "score": round(score, 6)
+            })
+        return structured_results
\ No newline at end of file
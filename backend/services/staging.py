@@ -0,0 +1,157 @@
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from core.config import get_settings
+import logging
+import os
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: pins only protect files within this process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class StagingCache:
+    """
+    Local content-addressed cache of files being ingested.
+    
+    Files are stored as <content_hash><suffix>, so concurrent requests never
+    collide on a shared filename, and the same content is only staged once.
+    The cache is bounded by total size and evicts least-recently-used files
+    that are not pinned by an in-flight ingestion.
+    
+    Worker processes share the directory, so a pin is also a shared flock
+    on pins/<content_hash>.pin, held while this process has any pin on the
+    file; eviction takes the lock exclusively (without waiting) before
+    deleting, and skips files pinned by any process.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.incoming_dir = self.directory / "incoming"  # Spool files still being received
+        self.incoming_dir.mkdir(parents=True, exist_ok=True)
+        self.pins_dir = self.directory / "pins"
+        self.pins_dir.mkdir(exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._pins = Counter()
+        self._pin_files: dict[str, int] = {}  # Locked pin file of each hash pinned in this process
+    
+    def _path_for(self, content_hash: str, suffix: str) -> Path:
+        return self.directory / f"{content_hash}{suffix}"
+    
+    def get(self, content_hash: str, suffix: str = ".pdf") -> Path | None:
+        """Return the staged file for a hash, marking it as recently used."""
+        path = self._path_for(content_hash, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+    
+    def put(self, source_path: Path, content_hash: str, suffix: str = ".pdf") -> Path:
+        """
+        Move a local file into the cache under its content hash.
+        
+        If the content is already staged the source file is discarded.
+        """
+        path = self._path_for(content_hash, suffix)
+        with self._lock:
+            if path.exists():
+                Path(source_path).unlink(missing_ok=True)
+                os.utime(path)
+            else:
+                try:
+                    os.replace(source_path, path)  # Atomic when on the same filesystem
+                except OSError:
+                    shutil.move(str(source_path), path)
+        self.evict()
+        return path
+    
+    def _lock_pin_file(self, content_hash: str, operation: int) -> int | None:
+        """Open and flock a hash's pin file; None if the lock is non-blocking and held elsewhere."""
+        path = self.pins_dir / f"{content_hash}.pin"
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, operation)
+            except BlockingIOError:
+                os.close(fd)
+                return None
+            try:
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)  # Removed by an eviction while we waited; lock the new file
+    
+    def pin(self, content_hash: str):
+        """Protect a staged file from eviction, by any process, until unpin() is called."""
+        with self._lock:
+            self._pins[content_hash] += 1
+            if self._pins[content_hash] == 1 and fcntl is not None:
+                self._pin_files[content_hash] = self._lock_pin_file(content_hash, fcntl.LOCK_SH)
+    
+    def unpin(self, content_hash: str):
+        """Release a pin taken with pin()."""
+        with self._lock:
+            self._pins[content_hash] -= 1
+            if self._pins[content_hash] <= 0:
+                del self._pins[content_hash]
+                if (fd := self._pin_files.pop(content_hash, None)) is not None:
+                    os.close(fd)  # Releases the shared lock
+        self.evict()
+    
+    @contextmanager
+    def pinned(self, content_hash: str):
+        """Protect a staged file from eviction while it is being used."""
+        self.pin(content_hash)
+        try:
+            yield
+        finally:
+            self.unpin(content_hash)
+    
+    def evict(self):
+        """Delete least-recently-used unpinned files until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.directory.iterdir():
+                if not path.is_file():
+                    continue
+                stat = path.stat()
+                total += stat.st_size
+                entries.append((stat.st_mtime, stat.st_size, path))
+            
+            if total <= self.max_bytes:
+                return
+            
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                content_hash = path.name.split(".", 1)[0]
+                if content_hash in self._pins:
+                    continue
+                if fcntl is None:
+                    path.unlink(missing_ok=True)
+                else:
+                    fd = self._lock_pin_file(content_hash, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    if fd is None:
+                        continue  # Pinned by another process
+                    try:
+                        path.unlink(missing_ok=True)
+                        (self.pins_dir / f"{content_hash}.pin").unlink(missing_ok=True)
+                    finally:
+                        os.close(fd)
+                total -= size
+                logger.info(f"Evicted staged file: {path.name}")
+
+@lru_cache()
+def get_staging_cache() -> StagingCache:
+    """Singleton staging cache."""
+    settings = get_settings()
+    return StagingCache(settings.staging_directory, settings.staging_max_bytes)
\ No newline at end of file
@@ -1,9 +1,13 @@
-import boto3
-from google.cloud import storage as gcs
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from core.config import get_settings
+from core.metrics import STORAGE_UPLOAD_SECONDS
+from core.tracing import timed
+import contextvars
 import logging
-import tempfile
+import os
+import shutil
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +18,7 @@ class StorageService:
         self.bucket_name = None
         self.storage_type = "local"  # Default
 
+        # Cloud SDKs are slow to import, so only the configured provider's is loaded
         if self.settings.environment == "production":
             cloud = self.settings.cloud_provider
             
@@ -21,6 +26,8 @@ class StorageService:
                 if not self.settings.gcs_bucket_name:
                     raise ValueError("GCS_BUCKET_NAME required when CLOUD_PROVIDER=gcp")
                 
+                from google.cloud import storage as gcs
+                
                 # Initialize GCS client (uses default credentials)
                 if self.settings.gcs_project_id:
                     self.client = gcs.Client(project=self.settings.gcs_project_id)
@@ -36,7 +43,14 @@ class StorageService:
                 if not self.settings.s3_bucket_name:
                     raise ValueError("S3_BUCKET_NAME required when CLOUD_PROVIDER=aws")
                 
+                import boto3
+                from boto3.s3.transfer import TransferConfig
+                
                 self.client = boto3.client('s3', region_name=self.settings.s3_region)
+                self.transfer_config = TransferConfig(
+                    multipart_chunksize=self.settings.storage_multipart_chunk_size,
+                    max_concurrency=self.settings.storage_upload_concurrency
+                )
                 self.bucket_name = self.settings.s3_bucket_name
                 self.storage_type = "s3"
                 logger.info(f"Using S3 bucket: {self.bucket_name}")
@@ -50,40 +64,49 @@ class StorageService:
             self.local_dir.mkdir(exist_ok=True)
             logger.info(f"Using local storage: {self.local_dir}")
     
-    def save_file(self, filename: str, content: bytes) -> str:
-        """Save file to storage."""
+    def save_file(self, filename: str, source_path: Path) -> str:
+        """Save a local file to storage without loading it into memory."""
+        with timed("storage_upload", STORAGE_UPLOAD_SECONDS, backend=self.storage_type):
+            return self._save_file(filename, source_path)
+    
+    def _save_file(self, filename: str, source_path: Path) -> str:
         key = f"uploads/{filename}"
 
         if self.storage_type == "s3":
-            self.client.put_object(Bucket=self.bucket_name, Key=key, Body=content)
+            # upload_file streams large files as concurrent multipart uploads
+            self.client.upload_file(str(source_path), self.bucket_name, key, Config=self.transfer_config)
             logger.info(f"Uploaded to S3: {key}")
             return f"s3://{self.bucket_name}/{key}"
         elif self.storage_type == "gcs":
-            blob = self.bucket.blob(key)
-            blob.upload_from_string(content)
+            blob = self.bucket.blob(key, chunk_size=self.settings.storage_multipart_chunk_size)  # Resumable upload
+            blob.upload_from_filename(str(source_path))
             logger.info(f"Uploaded to GCS: {key}")
             return f"gs://{self.bucket_name}/{key}"
         else:  # local
-            # Save locally
+            # Save locally (hard link when possible; the source stays in the staging cache)
             file_path = self.local_dir / filename
-            with open(file_path, 'wb') as f:
-                f.write(content)
+            file_path.unlink(missing_ok=True)
+            try:
+                os.link(source_path, file_path)
+            except OSError:
+                shutil.copyfile(source_path, file_path)
             logger.info(f"Saved locally: {file_path}")
             return str(file_path)
     
-    def get_file_path(self, filename: str) -> str:
-        """Get file path for processing."""
-        key = f"uploads/{filename}"
-        temp_path = Path(tempfile.gettempdir()) / filename
+    def close(self):
+        """Close the cloud storage client's connections (called once, at app shutdown)."""
+        if self.client is not None:
+            self.client.close()
+            logger.info(f"Closed {self.storage_type.upper()} storage client")
 
-        if self.storage_type == "s3":
-            self.client.download_file(self.bucket_name, key, str(temp_path))
-            logger.info(f"Downloaded from S3 to: {temp_path}")
-            return str(temp_path)
-        elif self.storage_type == "gcs":
-            blob = self.bucket.blob(key)
-            blob.download_to_filename(str(temp_path))
-            logger.info(f"Downloaded from GCS to: {temp_path}")
-            return str(temp_path)
-        else:  # local
-            return str(self.local_dir / filename)
\ No newline at end of file
+    def save_file_async(self, filename: str, source_path: Path) -> Future:
+        """Save a file to storage in the background, so it can overlap with processing (and is traced with it)."""
+        return _get_upload_executor().submit(contextvars.copy_context().run, self.save_file, filename, source_path)
+
+@lru_cache()
+def _get_upload_executor() -> ThreadPoolExecutor:
+    """Shared pool for background storage uploads."""
+    return ThreadPoolExecutor(
+        max_workers=get_settings().storage_upload_concurrency,
+        thread_name_prefix="storage-upload"
+    )
\ No newline at end of file
@@ -0,0 +1,186 @@
+from dataclasses import dataclass
+from pathlib import Path
+from multipart.multipart import MultipartParser, parse_options_header
+from multipart.exceptions import MultipartParseError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+import hashlib
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+class UploadTooLargeError(Exception):
+    """Upload exceeded the configured size limit."""
+    pass
+
+class InvalidUploadError(Exception):
+    """Upload body is malformed or missing the expected file."""
+    pass
+
+@dataclass
+class SpooledUpload:
+    """An upload written to local disk, with its content hash computed on the way in."""
+    filename: str
+    path: Path
+    sha256: str
+    size: int
+
+class _SpoolingParser:
+    """Multipart callbacks that stream one file field to disk while hashing it."""
+    
+    def __init__(self, field_name: str, spool_dir: Path, max_size: int, allowed_suffixes: tuple[str, ...]):
+        self.field_name = field_name
+        self.spool_dir = spool_dir
+        self.max_size = max_size
+        self.allowed_suffixes = allowed_suffixes
+        
+        self.filename: str | None = None
+        self.size = 0
+        self.hasher = hashlib.sha256()
+        self.spool_file = None
+        self.pending: list[bytes] = []  # Bytes parsed but not yet flushed to disk
+        
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_target = False
+    
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+    
+    def on_part_begin(self):
+        self._disposition = b""
+        self._in_target = False
+    
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+    
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+    
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+    
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        if options.get(b"name", b"").decode("latin-1") != self.field_name or b"filename" not in options:
+            return
+        if self.filename is not None:
+            raise InvalidUploadError(f"Only one '{self.field_name}' file is allowed per upload")
+        
+        # Strip any client-supplied directories from the filename
+        filename = Path(options[b"filename"].decode("utf-8", errors="replace")).name
+        if not filename.lower().endswith(self.allowed_suffixes):
+            raise InvalidUploadError(f"Only {', '.join(self.allowed_suffixes)} files allowed")
+        
+        self.filename = filename
+        self.spool_file = tempfile.NamedTemporaryFile(
+            dir=self.spool_dir, prefix="upload-", suffix=".part", delete=False
+        )
+        self._in_target = True
+    
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self._in_target:
+            return
+        chunk = data[start:end]
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise UploadTooLargeError(f"Upload exceeds maximum size of {self.max_size} bytes")
+        self.hasher.update(chunk)
+        self.pending.append(chunk)
+    
+    def on_part_end(self):
+        self._in_target = False
+    
+    def flush(self):
+        """Write pending bytes to the spool file (called off the event loop)."""
+        for chunk in self.pending:
+            self.spool_file.write(chunk)
+        self.pending.clear()
+    
+    def discard(self):
+        """Remove the partial spool file after a failed upload."""
+        if self.spool_file is not None:
+            self.spool_file.close()
+            Path(self.spool_file.name).unlink(missing_ok=True)
+
+async def receive_upload(
+    request: Request,
+    spool_dir: str | Path | None,
+    max_size: int,
+    field_name: str = "file",
+    allowed_suffixes: tuple[str, ...] = (".pdf",)
+) -> SpooledUpload:
+    """
+    Stream a multipart file upload to a local spool file.
+    
+    The body is consumed as it arrives: bytes are hashed incrementally and
+    flushed to disk, and the upload is aborted as soon as it exceeds max_size,
+    so peak memory is bounded by one receive buffer rather than the file size.
+    
+    Args:
+        request: Incoming multipart/form-data request
+        spool_dir: Directory for the spool file (system temp dir if None)
+        max_size: Maximum accepted file size in bytes
+        field_name: Form field carrying the file
+        allowed_suffixes: Accepted filename extensions
+    
+    Returns:
+        The spooled upload with its SHA-256 and size
+    
+    Raises:
+        UploadTooLargeError: If the declared or actual size exceeds max_size
+        InvalidUploadError: If the body is not a valid single-file upload
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size + 64 * 1024:
+        # Reject before reading anything; 64KB allowance covers multipart framing
+        raise UploadTooLargeError(f"Upload exceeds maximum size of {max_size} bytes")
+    
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise InvalidUploadError("Expected a multipart/form-data upload")
+    
+    spool_path = Path(spool_dir or tempfile.gettempdir())
+    spool_path.mkdir(parents=True, exist_ok=True)
+    
+    receiver = _SpoolingParser(field_name, spool_path, max_size, allowed_suffixes)
+    parser = MultipartParser(params[b"boundary"], receiver.callbacks())
+    
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if receiver.pending:
+                await run_in_threadpool(receiver.flush)
+        parser.finalize()
+        
+        if receiver.filename is None:
+            raise InvalidUploadError(f"Missing '{field_name}' file in upload")
+        
+        receiver.spool_file.close()
+    except MultipartParseError as e:
+        receiver.discard()
+        raise InvalidUploadError(f"Malformed multipart upload: {e}")
+    except BaseException:
+        receiver.discard()
+        raise
+    
+    logger.info(f"Received upload '{receiver.filename}' ({receiver.size} bytes, sha256 {receiver.hasher.hexdigest()[:8]}...)")
+    return SpooledUpload(
+        filename=receiver.filename,
+        path=Path(receiver.spool_file.name),
+        sha256=receiver.hasher.hexdigest(),
+        size=receiver.size
+    )
\ No newline at end of file
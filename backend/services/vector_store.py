@@ -1,64 +1,499 @@
 from abc import ABC, abstractmethod
-from langchain_chroma import Chroma
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone, ServerlessSpec
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from functools import lru_cache, partial
+from pathlib import Path
 from core.config import get_settings
+from core.metrics import (
+    PINECONE_UPSERTED_VECTORS,
+    PINECONE_UPSERT_RETRIES,
+    PINECONE_UPSERT_SECONDS,
+    VECTOR_STORE_DOCUMENTS,
+    VECTOR_STORE_ERRORS,
+    VECTOR_STORE_SECONDS
+)
+from core.tracing import timed
+from langchain_core.documents import Document
 from services.embeddings import get_embeddings
+from services.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from services.near_duplicates import get_near_duplicate_index
+from services.metadata_filter import parse_filter, to_chroma_where, to_pinecone_filter
+import asyncio
+import contextvars
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+@lru_cache()
+def _get_executor() -> ThreadPoolExecutor:
+    """Bounded pool for blocking vector store calls made from async code."""
+    return ThreadPoolExecutor(
+        max_workers=get_settings().vector_store_max_concurrency,
+        thread_name_prefix="vector-store"
+    )
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking vector store call on the bounded executor (in the caller's context, so its trace is kept)."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_get_executor(), partial(context.run, func, *args, **kwargs))
+
 class VectorStore(ABC):
-    """Abstract base class for vector stores."""
+    """Abstract base class for vector stores (implementations set self.embeddings and a backend name)."""
+    
+    backend: str  # Label for metrics
+    
+    def _timed(self, operation: str, collection_name: str):
+        """Time a backend operation into the vector store metrics and the request trace."""
+        return timed(
+            f"{operation}.{collection_name}",
+            VECTOR_STORE_SECONDS,
+            VECTOR_STORE_ERRORS,
+            backend=self.backend,
+            collection=collection_name,
+            operation=operation
+        )
     
-    @abstractmethod
     def add_documents(self, documents: list, collection_name: str) -> int:
-        """Add documents to the store."""
+        """
+        Upsert documents (keyed by metadata "chunk_id") into the store and the collection's lexical index.
+        
+        With near-duplicate detection enabled, a chunk that nearly repeats an
+        embedded chunk, with the same numbers and identifiers, is stored with
+        that chunk's vector instead of being embedded (see
+        services.near_duplicates); it is still found lexically and under its
+        own metadata.
+        
+        Returns:
+            Number of chunks embedded
+        """
+        settings = get_settings()
+        plan = None
+        unique = documents
+        if settings.near_duplicate_detection:
+            plan = get_near_duplicate_index(collection_name).plan(documents)
+            unique = plan.unique
+        
+        count = 0
+        if unique:
+            with self._timed("upsert", collection_name):
+                count = self._add_documents(unique, collection_name)
+            VECTOR_STORE_DOCUMENTS.labels(backend=self.backend, collection=collection_name, operation="upsert").inc(count)
+        if plan is not None and plan.links:
+            count += self._add_linked(plan, collection_name)
+        if settings.lexical_index_enabled:
+            get_lexical_index(collection_name).add_documents(documents)
+        
+        if plan is not None:
+            # Duplicates whose canonical chunk was deleted while this batch was being stored
+            if orphans := get_near_duplicate_index(collection_name).commit(plan):
+                count += self.add_documents(orphans, collection_name)
+        return count
+    
+    def _add_linked(self, plan, collection_name: str) -> int:
+        """Store a plan's linked chunks with their canonical chunk's vector; returns the number that had to be embedded."""
+        with self._timed("fetch", collection_name):
+            stored = self._fetch(list({canonical for canonical, _ in plan.links.values()}), collection_name)
+        
+        linked, vectors, missing = [], [], []
+        for canonical, doc in plan.links.values():
+            if canonical in stored:
+                linked.append(doc)
+                vectors.append(stored[canonical][1])
+            else:
+                missing.append(doc)  # Canonical chunk is not in the store (yet); embed this one instead
+        
+        count = 0
+        with self._timed("upsert", collection_name):
+            if linked:
+                self._add_documents(linked, collection_name, embeddings=vectors)
+            if missing:
+                count = self._add_documents(missing, collection_name)
+        VECTOR_STORE_DOCUMENTS.labels(backend=self.backend, collection=collection_name, operation="upsert").inc(len(linked) + count)
+        return count
+    
+    def update_metadata(self, updates: dict[str, dict], collection_name: str) -> int:
+        """
+        Merge metadata fields into stored chunks (chunk_id -> fields) without re-embedding them.
+        
+        Returns:
+            Number of chunks updated (unknown IDs, and chunks that already have the fields, are skipped)
+        """
+        if not updates:
+            return 0
+        with self._timed("fetch", collection_name):
+            stored = self._fetch(list(updates), collection_name)
+        documents, vectors = [], []
+        for chunk_id, (doc, vector) in stored.items():
+            metadata = {**doc.metadata, **updates[chunk_id]}
+            if metadata == doc.metadata:
+                continue
+            doc.metadata = metadata
+            documents.append(doc)
+            vectors.append(vector)
+        
+        if documents:
+            with self._timed("upsert", collection_name):
+                self._add_documents(documents, collection_name, embeddings=vectors)
+            VECTOR_STORE_DOCUMENTS.labels(backend=self.backend, collection=collection_name, operation="upsert").inc(len(documents))
+        settings = get_settings()
+        if settings.lexical_index_enabled:
+            get_lexical_index(collection_name).add_documents(documents)
+        if settings.near_duplicate_detection:
+            get_near_duplicate_index(collection_name).update_metadata(documents)
+        return len(documents)
+    
+    def delete(self, ids: list[str], collection_name: str) -> int:
+        """Delete chunks by ID from the store and the collection's indexes; a deleted chunk's near-duplicates are re-embedded."""
+        if not ids:
+            return 0
+        self._remove_stored(ids, collection_name)
+        if get_settings().near_duplicate_detection:
+            if promoted := get_near_duplicate_index(collection_name).remove(ids):
+                self.add_documents(promoted, collection_name)
+        return len(ids)
+    
+    def _remove_stored(self, ids: list[str], collection_name: str):
+        with self._timed("delete", collection_name):
+            self._delete(ids, collection_name)
+        VECTOR_STORE_DOCUMENTS.labels(backend=self.backend, collection=collection_name, operation="delete").inc(len(ids))
+        if get_settings().lexical_index_enabled:
+            get_lexical_index(collection_name).delete(ids)
+    
+    @abstractmethod
+    def _add_documents(self, documents: list, collection_name: str, embeddings: list[list[float]] | None = None) -> int:
+        """Upsert documents into the backend, replacing any with the same chunk_id (embeddings: precomputed vectors)."""
+        pass
+    
+    @abstractmethod
+    def _fetch(self, ids: list[str], collection_name: str) -> dict[str, tuple[Document, list[float]]]:
+        """Stored chunks and their vectors by chunk_id (unknown IDs are skipped)."""
         pass
     
     @abstractmethod
-    def similarity_search(self, query: str, collection_name: str, k: int = 5) -> list:
-        """Search for similar documents."""
+    def _delete(self, ids: list[str], collection_name: str) -> int:
+        """Delete chunks by ID from the backend (unknown IDs are ignored)."""
         pass
+    
+    @abstractmethod
+    def similarity_search(self, query: str, collection_name: str, k: int = 5, filter: dict | None = None) -> list:
+        """Search for similar documents (filter: metadata conditions, see services.metadata_filter)."""
+        pass
+    
+    @abstractmethod
+    def similarity_search_by_vector(
+        self,
+        embedding: list[float],
+        collection_name: str,
+        k: int = 5,
+        filter: dict | None = None
+    ) -> list:
+        """Search for documents similar to an already-computed query embedding."""
+        pass
+    
+    def close(self):
+        """Release backend clients and connections (called once, at app shutdown)."""
+        pass
+    
+    async def aadd_documents(self, documents: list, collection_name: str) -> int:
+        """Add documents without blocking the event loop."""
+        return await run_blocking(self.add_documents, documents, collection_name)
+    
+    async def adelete(self, ids: list[str], collection_name: str) -> int:
+        """Delete chunks without blocking the event loop."""
+        return await run_blocking(self.delete, ids, collection_name)
+    
+    async def asimilarity_search(
+        self,
+        query: str,
+        collection_name: str,
+        k: int = 5,
+        embedding: list[float] | None = None,
+        filter: dict | None = None
+    ) -> list:
+        """Search without blocking the event loop (embedding: precomputed query vector)."""
+        # The query is embedded asynchronously (joining a micro-batch), so an
+        # executor thread is only held for the index lookup itself
+        if embedding is None:
+            embedding = await self.embeddings.aembed_query(query)
+        with self._timed("search", collection_name):
+            return await run_blocking(self.similarity_search_by_vector, embedding, collection_name, k, filter)
+    
+    def lexical_search(self, query: str, collection_name: str, k: int = 5, filter: dict | None = None) -> list:
+        """BM25 search over the collection's lexical index (no embedding pass)."""
+        with timed(
+            f"lexical_search.{collection_name}",
+            VECTOR_STORE_SECONDS,
+            VECTOR_STORE_ERRORS,
+            backend="bm25",
+            collection=collection_name,
+            operation="search"
+        ):
+            return get_lexical_index(collection_name).search(query, k=k, conditions=parse_filter(filter))
+    
+    def search(
+        self,
+        query: str,
+        collection_name: str,
+        k: int = 5,
+        mode: str = "dense",
+        embedding: list[float] | None = None,
+        filter: dict | None = None
+    ) -> list:
+        """Search in the given retrieval mode from synchronous code (arguments as for asearch)."""
+        parse_filter(filter)  # Reject a malformed filter before any work is done
+        if mode != "dense":
+            self._check_lexical_mode(mode)
+        if mode == "lexical":
+            return self.lexical_search(query, collection_name, k=k, filter=filter)
+        
+        if embedding is None:
+            embedding = self.embeddings.embed_query(query)
+        settings = get_settings()
+        candidates = k if mode == "dense" else k * settings.hybrid_candidates_multiplier
+        with self._timed("search", collection_name):
+            dense = self.similarity_search_by_vector(embedding, collection_name, candidates, filter)
+        if mode == "dense":
+            return dense
+        lexical = self.lexical_search(query, collection_name, k=candidates, filter=filter)
+        return reciprocal_rank_fusion([dense, lexical], k=k, rrf_k=settings.rrf_k)
+    
+    def _check_lexical_mode(self, mode: str):
+        """Raise ValueError unless mode is a lexical mode that is enabled."""
+        if not get_settings().lexical_index_enabled:
+            raise ValueError(f"Search mode '{mode}' requires LEXICAL_INDEX_ENABLED=true")
+        if mode not in ("lexical", "hybrid"):
+            raise ValueError(f"Unknown search mode: {mode}")
+    
+    async def asearch(
+        self,
+        query: str,
+        collection_name: str,
+        k: int = 5,
+        mode: str = "dense",
+        embedding: list[float] | None = None,
+        filter: dict | None = None
+    ) -> list:
+        """
+        Search in the given retrieval mode.
+        
+        Args:
+            query: Search query
+            collection_name: Collection to search
+            k: Number of results
+            mode: "dense" (embeddings), "lexical" (BM25), or "hybrid" (both, fused by RRF)
+            embedding: Precomputed query embedding, to share one across collections
+            filter: Metadata conditions, applied inside the store before ranking
+        
+        Returns:
+            Matching documents, best first
+        
+        Raises:
+            ValueError: If the mode is unknown or unavailable, or the filter is malformed
+        """
+        parse_filter(filter)  # Reject a malformed filter before any work is done
+        if mode == "dense":
+            return await self.asimilarity_search(query, collection_name, k=k, embedding=embedding, filter=filter)
+        self._check_lexical_mode(mode)
+        if mode == "lexical":
+            return self.lexical_search(query, collection_name, k=k, filter=filter)
+
+        # Over-fetch from both retrievers so fusion has candidates to reorder
+        settings = get_settings()
+        candidates = k * settings.hybrid_candidates_multiplier
+        dense = await self.asimilarity_search(query, collection_name, k=candidates, embedding=embedding, filter=filter)
+        lexical = self.lexical_search(query, collection_name, k=candidates, filter=filter)
+        return reciprocal_rank_fusion([dense, lexical], k=k, rrf_k=settings.rrf_k)
+
+def chroma_collection_metadata(settings) -> dict:
+    """HNSW parameters for new Chroma collections (Chroma fixes them when a collection is created)."""
+    return {
+        "hnsw:space": settings.chroma_hnsw_space,
+        "hnsw:M": settings.chroma_hnsw_m,
+        "hnsw:construction_ef": settings.chroma_hnsw_construction_ef,
+        "hnsw:search_ef": settings.chroma_hnsw_search_ef
+    }
+
+def find_legacy_chroma_stores(persist_directory: str) -> list[Path]:
+    """Per-collection stores (<persist_directory>/<collection>/chroma.sqlite3) from before the shared client."""
+    root = Path(persist_directory)
+    if not root.is_dir():
+        return []
+    return sorted(path for path in root.iterdir() if (path / "chroma.sqlite3").is_file())
+
+def close_chroma_client(client):
+    """
+    Stop a Chroma client's system and drop it from Chroma's per-path cache.
+    
+    chromadb has no public close, so this relies on private attributes;
+    if a chromadb release renames them, the whole client cache is cleared
+    instead (the system is then left to be garbage-collected).
+    """
+    from chromadb.api.client import SharedSystemClient
+    systems = getattr(SharedSystemClient, "_identifier_to_system", None)
+    identifier = getattr(client, "_identifier", None)
+    if not isinstance(systems, dict) or identifier is None:
+        logger.warning("Unrecognized chromadb client internals; clearing Chroma's client cache instead of closing the client")
+        SharedSystemClient.clear_system_cache()
+        return
+    system = systems.pop(identifier, None)
+    if system is not None:  # Not closed already
+        system.stop()
 
 class ChromaVectorStore(VectorStore):
-    """ChromaDB implementation (local development)."""
+    """ChromaDB implementation (local development): one persistent client, one collection per name."""
+    
+    backend = "chroma"
     
     def __init__(self):
+        import chromadb
+        
         self.settings = get_settings()
         self.embeddings = get_embeddings()
+        self.client = chromadb.PersistentClient(path=self.settings.chroma_persist_directory)
         self.stores = {}  # Cache stores by collection name
-        logger.info("Initialized ChromaDB vector store")
+        self._stores_lock = threading.Lock()
+        
+        if legacy := find_legacy_chroma_stores(self.settings.chroma_persist_directory):
+            logger.warning(
+                f"Found {len(legacy)} per-collection ChromaDB stores ({', '.join(path.name for path in legacy)}) "
+                "that are not searched; run scripts/migrate_chroma_stores.py to move them into the shared store"
+            )
+        logger.info(f"Initialized ChromaDB vector store at {self.settings.chroma_persist_directory}")
     
     def _get_store(self, collection_name: str):
-        if collection_name not in self.stores:
-            self.stores[collection_name] = Chroma(
-                collection_name=collection_name,
-                embedding_function=self.embeddings,
-                persist_directory=f"{self.settings.chroma_persist_directory}/{collection_name}"
+        from langchain_chroma import Chroma
+        
+        with self._stores_lock:
+            if collection_name not in self.stores:
+                self.stores[collection_name] = Chroma(
+                    client=self.client,
+                    collection_name=collection_name,
+                    embedding_function=self.embeddings,
+                    collection_metadata=self._collection_metadata(collection_name)
+                )
+            return self.stores[collection_name]
+    
+    def _collection_metadata(self, collection_name: str) -> dict:
+        """
+        HNSW parameters to open a collection with.
+        
+        Chroma fixes an index's parameters when the collection is created;
+        passing others later only rewrites the collection's metadata, not
+        the index. An existing collection is therefore opened with its own
+        metadata, and a configured search_ef it doesn't use is reported.
+        """
+        configured = chroma_collection_metadata(self.settings)
+        try:
+            existing = self.client.get_collection(collection_name, embedding_function=None).metadata or {}
+        except ValueError:  # No such collection yet
+            return configured
+        
+        search_ef = existing.get("hnsw:search_ef")
+        if search_ef != configured["hnsw:search_ef"]:
+            logger.warning(
+                f"ChromaDB collection '{collection_name}' was created with hnsw:search_ef="
+                f"{search_ef if search_ef is not None else 'default (10)'}; CHROMA_HNSW_SEARCH_EF="
+                f"{configured['hnsw:search_ef']} only applies to new collections (recreate the collection to change it)"
             )
-        return self.stores[collection_name]
+        return existing
     
-    def add_documents(self, documents: list, collection_name: str) -> int:
+    def close(self):
+        with self._stores_lock:
+            self.stores.clear()
+        close_chroma_client(self.client)
+        logger.info("Closed ChromaDB vector store")
+    
+    def _get_collection(self, collection_name: str):
+        """The Chroma collection behind a store, for reads and writes with precomputed vectors."""
+        self._get_store(collection_name)  # Creates the collection with the configured HNSW parameters
+        return self.client.get_collection(collection_name, embedding_function=None)
+    
+    def _add_documents(self, documents: list, collection_name: str, embeddings: list[list[float]] | None = None) -> int:
         store = self._get_store(collection_name)
-        store.add_documents(documents)
+        collection = self._get_collection(collection_name) if embeddings is not None else None
+        batch_size = min(self.settings.chroma_insert_batch_size, self.client.get_max_batch_size())
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            ids = [doc.metadata["chunk_id"] for doc in batch]
+            if collection is None:
+                store.add_documents(batch, ids=ids)
+            else:
+                collection.upsert(
+                    ids=ids,
+                    embeddings=embeddings[start:start + batch_size],
+                    documents=[doc.page_content for doc in batch],
+                    metadatas=[doc.metadata for doc in batch]
+                )
         logger.info(f"Added {len(documents)} documents to ChromaDB collection '{collection_name}'")
         return len(documents)
     
-    def similarity_search(self, query: str, collection_name: str, k: int = 5) -> list:
+    def _fetch(self, ids: list[str], collection_name: str) -> dict[str, tuple[Document, list[float]]]:
+        found = self._get_collection(collection_name).get(ids=ids, include=["documents", "metadatas", "embeddings"])
+        return {
+            chunk_id: (Document(page_content=text, metadata=metadata or {}), list(embedding))
+            for chunk_id, text, metadata, embedding in zip(found["ids"], found["documents"], found["metadatas"], found["embeddings"])
+        }
+    
+    def _delete(self, ids: list[str], collection_name: str) -> int:
+        store = self._get_store(collection_name)
+        store.delete(ids=ids)
+        logger.info(f"Deleted {len(ids)} documents from ChromaDB collection '{collection_name}'")
+        return len(ids)
+    
+    def similarity_search(self, query: str, collection_name: str, k: int = 5, filter: dict | None = None) -> list:
+        store = self._get_store(collection_name)
+        results = store.similarity_search(query, k=k, filter=to_chroma_where(parse_filter(filter)))
+        logger.info(f"ChromaDB search returned {len(results)} results for collection '{collection_name}'")
+        return results
+    
+    def similarity_search_by_vector(
+        self,
+        embedding: list[float],
+        collection_name: str,
+        k: int = 5,
+        filter: dict | None = None
+    ) -> list:
         store = self._get_store(collection_name)
-        results = store.similarity_search(query, k=k)
+        results = store.similarity_search_by_vector(embedding, k=k, filter=to_chroma_where(parse_filter(filter)))
         logger.info(f"ChromaDB search returned {len(results)} results for collection '{collection_name}'")
         return results
 
 class PineconeVectorStore(VectorStore):
-    """Pinecone implementation (cloud production)."""
+    """
+    Pinecone implementation (cloud production).
     
-    def __init__(self):
+    Chunks are embedded and upserted in batches of PINECONE_UPSERT_BATCH_SIZE,
+    with up to PINECONE_UPSERT_CONCURRENCY upserts in flight while the next
+    batch is embedded. A failed upsert is retried with exponential backoff;
+    vector IDs are the chunks' deterministic chunk_ids, so a retried (or
+    re-run) batch overwrites instead of duplicating.
+    """
+    
+    backend = "pinecone"
+    
+    def __init__(self, index=None):
+        """
+        Args:
+            index: Pinecone index to use instead of connecting with the configured
+                API key (e.g. an in-process stand-in for tests)
+        """
         self.settings = get_settings()
         self.embeddings = get_embeddings()
+        self.index = index if index is not None else self._connect()
+        self.stores = {}
+        self._stores_lock = threading.Lock()
+        self._upsert_executor = ThreadPoolExecutor(
+            max_workers=self.settings.pinecone_upsert_concurrency,
+            thread_name_prefix="pinecone-upsert"
+        )
+        logger.info(f"Initialized Pinecone vector store on {self.settings.pinecone_cloud}")
+    
+    def _connect(self):
+        """Open the configured index, creating it if it doesn't exist."""
+        from pinecone import Pinecone, ServerlessSpec
         
-        # Initialize Pinecone client
         self.pc = Pinecone(api_key=self.settings.pinecone_api_key)
         
         # Dynamically get embedding dimension
@@ -84,38 +519,143 @@ class PineconeVectorStore(VectorStore):
             )
             logger.info(f"Created Pinecone index '{index_name}' on {self.settings.pinecone_cloud}/{self.settings.pinecone_region}")
         
-        self.index = self.pc.Index(index_name)
-        self.stores = {}
-        logger.info(f"Initialized Pinecone vector store on {self.settings.pinecone_cloud}")
+        return self.pc.Index(index_name)
     
     def _get_store(self, collection_name: str):
-        if collection_name not in self.stores:
-            self.stores[collection_name] = PineconeVectorStore(
-                index=self.index,
-                embedding=self.embeddings,
-                namespace=collection_name  # Use namespace for collections
-            )
-        return self.stores[collection_name]
+        from langchain_pinecone import PineconeVectorStore as LangchainPineconeVectorStore
+        
+        with self._stores_lock:
+            if collection_name not in self.stores:
+                self.stores[collection_name] = LangchainPineconeVectorStore(
+                    index=self.index,
+                    embedding=self.embeddings,
+                    namespace=collection_name  # Use namespace for collections
+                )
+            return self.stores[collection_name]
     
-    def add_documents(self, documents: list, collection_name: str) -> int:
-        store = self._get_store(collection_name)
-        store.add_documents(documents)
-        logger.info(f"Added {len(documents)} documents to Pinecone namespace '{collection_name}'")
+    def close(self):
+        self._upsert_executor.shutdown(wait=True)
+        if hasattr(self.index, "__exit__"):
+            self.index.__exit__(None, None, None)  # Closes the index's HTTP connection pool
+        logger.info("Closed Pinecone vector store")
+    
+    def _add_documents(self, documents: list, collection_name: str, embeddings: list[list[float]] | None = None) -> int:
+        started = time.monotonic()
+        batch_size = self.settings.pinecone_upsert_batch_size
+        max_in_flight = self.settings.pinecone_upsert_concurrency
+        in_flight = set()
+        try:
+            for start in range(0, len(documents), batch_size):
+                batch = documents[start:start + batch_size]
+                if embeddings is None:
+                    batch_embeddings = self.embeddings.embed_documents([doc.page_content for doc in batch])
+                else:
+                    batch_embeddings = embeddings[start:start + batch_size]
+                vectors = [
+                    {
+                        "id": doc.metadata["chunk_id"],
+                        "values": embedding,
+                        "metadata": {**doc.metadata, "text": doc.page_content}  # Same layout as the LangChain store reads
+                    }
+                    for doc, embedding in zip(batch, batch_embeddings)
+                ]
+                
+                # Bound the upserts (and embedded batches) held in memory
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                in_flight.add(self._upsert_executor.submit(contextvars.copy_context().run, self._upsert_batch, vectors, collection_name))
+            
+            for future in as_completed(in_flight):
+                future.result()
+        except BaseException:
+            for future in in_flight:
+                future.cancel()
+            raise
+        
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"Added {len(documents)} documents to Pinecone namespace '{collection_name}' "
+            f"in {elapsed:.2f}s ({len(documents) / max(elapsed, 1e-9):.0f} vectors/s)"
+        )
         return len(documents)
     
-    def similarity_search(self, query: str, collection_name: str, k: int = 5) -> list:
+    def _upsert_batch(self, vectors: list[dict], namespace: str) -> int:
+        """Upsert one batch, retrying failures that may be transient (IDs are deterministic, so retries are idempotent)."""
+        max_retries = self.settings.pinecone_upsert_max_retries
+        for attempt in range(max_retries + 1):
+            started = time.monotonic()
+            try:
+                self.index.upsert(vectors=vectors, namespace=namespace)
+            except Exception as e:
+                status = getattr(e, "status", None)
+                if attempt == max_retries or (status is not None and 400 <= status < 500 and status != 429):
+                    raise
+                delay = self.settings.pinecone_upsert_retry_backoff_seconds * 2 ** attempt
+                logger.warning(f"Pinecone upsert of {len(vectors)} vectors failed ({e}), retrying in {delay:.1f}s")
+                PINECONE_UPSERT_RETRIES.inc()
+                time.sleep(delay)
+            else:
+                PINECONE_UPSERT_SECONDS.observe(time.monotonic() - started)
+                PINECONE_UPSERTED_VECTORS.inc(len(vectors))
+                return len(vectors)
+    
+    def _fetch(self, ids: list[str], collection_name: str) -> dict[str, tuple[Document, list[float]]]:
+        found = {}
+        batch_size = self.settings.pinecone_upsert_batch_size
+        for start in range(0, len(ids), batch_size):
+            response = self.index.fetch(ids=ids[start:start + batch_size], namespace=collection_name)
+            for chunk_id, vector in response.vectors.items():
+                metadata = dict(vector.metadata or {})
+                text = metadata.pop("text", "")
+                found[chunk_id] = (Document(page_content=text, metadata=metadata), list(vector.values))
+        return found
+    
+    def _delete(self, ids: list[str], collection_name: str) -> int:
         store = self._get_store(collection_name)
-        results = store.similarity_search(query, k=k)
+        store.delete(ids=ids, namespace=collection_name)
+        logger.info(f"Deleted {len(ids)} documents from Pinecone namespace '{collection_name}'")
+        return len(ids)
+    
+    def similarity_search(self, query: str, collection_name: str, k: int = 5, filter: dict | None = None) -> list:
+        store = self._get_store(collection_name)
+        results = store.similarity_search(query, k=k, filter=to_pinecone_filter(parse_filter(filter)))
+        logger.info(f"Pinecone search returned {len(results)} results for namespace '{collection_name}'")
+        return results
+    
+    def similarity_search_by_vector(
+        self,
+        embedding: list[float],
+        collection_name: str,
+        k: int = 5,
+        filter: dict | None = None
+    ) -> list:
+        store = self._get_store(collection_name)
+        # The LangChain Pinecone store only implements the scored variant
+        pairs = store.similarity_search_by_vector_with_score(embedding, k=k, filter=to_pinecone_filter(parse_filter(filter)))
+        results = [doc for doc, _ in pairs]
         logger.info(f"Pinecone search returned {len(results)} results for namespace '{collection_name}'")
         return results
 
 def get_vector_store() -> VectorStore:
-    """Factory function - returns ChromaDB locally, Pinecone in production."""
+    """
+    Factory function - returns ChromaDB locally, Pinecone in production, or the in-process NumPy store.
+    
+    Each backend's client library is imported only when that backend is
+    built, so the API process never loads the ones it doesn't use.
+    
+    Every call builds a new store; the API builds one at startup and shares
+    it through its service container (see services.container).
+    """
     settings = get_settings()
     
     if settings.environment == "production" and settings.vector_store_type == "pinecone":
         if not settings.pinecone_api_key:
             raise ValueError("PINECONE_API_KEY required for production environment")
         return PineconeVectorStore()
+    elif settings.vector_store_type == "numpy":
+        from services.numpy_vector_store import NumpyVectorStore
+        return NumpyVectorStore()
     else:
         return ChromaVectorStore()
\ No newline at end of file
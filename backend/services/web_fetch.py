@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from langchain_core.documents import Document
+from core.config import get_settings
+from services.html_extraction import extract_html
+import requests
+
+@dataclass
+class FetchResult:
+    """Outcome of a (conditional) page fetch."""
+    url: str
+    status: int
+    html: str | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+@lru_cache()
+def _get_session() -> requests.Session:
+    """Shared session, so repeated fetches from the same host reuse connections."""
+    session = requests.Session()
+    session.headers["User-Agent"] = get_settings().web_user_agent
+    return session
+
+def fetch_page(url: str, etag: str | None = None, last_modified: str | None = None) -> FetchResult:
+    """
+    GET a page, conditionally if validators from an earlier fetch are given.
+    
+    Args:
+        url: Page URL
+        etag: ETag of the stored version (sent as If-None-Match)
+        last_modified: Last-Modified of the stored version (sent as If-Modified-Since)
+    
+    Returns:
+        FetchResult; status 304 (no body) if the stored version is current
+    
+    Raises:
+        requests.HTTPError: On an error response
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    
+    response = _get_session().get(url, headers=headers, timeout=get_settings().web_request_timeout)
+    if response.status_code == 304:
+        return FetchResult(url, 304, etag=etag, last_modified=last_modified)
+    response.raise_for_status()
+    return FetchResult(
+        url,
+        response.status_code,
+        html=response.text,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified")
+    )
+
+def html_to_document(url: str, html: str) -> Document:
+    """Page main text (boilerplate removed, see services.html_extraction) with WebBaseLoader's metadata keys."""
+    page = extract_html(html)
+    return Document(page_content=page.text, metadata={"source": url, **page.metadata})
\ No newline at end of file
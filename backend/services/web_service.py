@@ -1,110 +1,388 @@
-from langchain_community.document_loaders import WebBaseLoader
+from datetime import datetime, timezone
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from services.vector_store import get_vector_store
-from datetime import datetime
+from services.vector_store import VectorStore, get_vector_store
+from services.registry import get_ingestion_registry, STATUS_COMPLETED
+from services.ingestion import IngestionPipeline, IngestionResult, batched, content_chunk_id, ingestion_stage, stale_chunk_ids
+from services.web_fetch import FetchResult, fetch_page, html_to_document
+from services.crawler import CrawlPlan, get_crawler
+from core.config import get_settings
+from typing import Callable
+from urllib.parse import urlparse
 import logging
-import uuid
 import hashlib
 
 logger = logging.getLogger(__name__)
 
+# Crawled pages are committed to the registry in groups of this many; chunks
+# from all pages in a group share embedding and upsert batches
+_CRAWL_PAGES_PER_RUN = 32
+
+def web_filter(url: str | None = None, url_hash: str | None = None, domain: str | None = None) -> dict | None:
+    """Metadata filter restricting a web search to one page or one site."""
+    filter = {}
+    if url:
+        filter["source_url"] = url
+    if url_hash:
+        filter["url_hash"] = url_hash
+    if domain:
+        filter["source_domain"] = domain.lower()
+    return filter or None
+
 class WebService:
-    def __init__(self):
-        self.vector_store = get_vector_store()
+    def __init__(self, vector_store: VectorStore | None = None):
+        self.settings = get_settings()
+        self.vector_store = vector_store or get_vector_store()
+        self.registry = get_ingestion_registry()  # Track processed URLs
         self.collection_name = "web_data_collection"
-        self.metadata_collection = "web_metadata"  # Track processed URLs
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=500,
             chunk_overlap=100
         )
+        self.pipeline = IngestionPipeline(
+            self.vector_store,
+            self.collection_name,
+            self.text_splitter,
+            batch_size=self.settings.ingestion_batch_size,
+            max_in_flight=self.settings.ingestion_max_in_flight,
+            source_type="web"
+        )
     
     def _calculate_url_hash(self, url: str) -> str:
         """Calculate hash of URL."""
         return hashlib.sha256(url.encode('utf-8')).hexdigest()
     
     def _is_already_processed(self, url_hash: str) -> bool:
-        """Check if URL hash exists in metadata collection."""
-        try:
-            results = self.vector_store.similarity_search(
-                query=url_hash,
-                collection_name=self.metadata_collection,
-                k=1
-            )
-            return len(results) > 0 and url_hash in results[0].page_content
-        except:
-            return False
+        """Check if URL hash exists in the ingestion registry."""
+        return self.registry.is_processed(url_hash)
     
-    def _store_metadata(self, url_hash: str, url: str, chunks_count: int):
-        """Store URL metadata to prevent duplicates."""
-        from langchain.schema import Document
-        
-        metadata_doc = Document(
-            page_content=url_hash,  # Store hash as content
-            metadata={
-                "url": url,
-                "url_hash": url_hash,
-                "chunks_count": chunks_count,
-                "processed_at": str(datetime.utcnow())
-            }
-        )
-        self.vector_store.add_documents([metadata_doc], self.metadata_collection)
+    def list_pages(self) -> list:
+        """List processed URLs."""
+        return self.registry.list_sources(kind="web")
     
-    def process_url(self, url: str, force_reprocess: bool = False) -> int:
-        """Scrape, chunk, and store web page."""
-        try:
-            # Calculate URL hash
-            url_hash = self._calculate_url_hash(url)
-            
-            # Check if already processed
-            if not force_reprocess and self._is_already_processed(url_hash):
-                logger.warning(f"URL already processed: {url} (hash: {url_hash[:8]}...)")
-                raise ValueError(
-                    f"URL '{url}' has already been processed. "
-                    f"Use force_reprocess=True to override."
-                )
-            
-            # Load web page
-            loader = WebBaseLoader(url)
-            raw_documents = loader.load()
-            
-            # Split into chunks
-            documents = self.text_splitter.split_documents(raw_documents)
-            
-            # Add metadata
-            for i, doc in enumerate(documents):
-                doc.metadata["source_url"] = url
-                doc.metadata["chunk_number"] = i + 1
-                doc.metadata["chunk_id"] = str(uuid.uuid4())
-                doc.metadata["url_hash"] = url_hash  # Track which URL this came from
+    def _validators(self, fetched: FetchResult) -> dict:
+        """Registry metadata for conditional refreshes."""
+        return {
+            "etag": fetched.etag,
+            "last_modified": fetched.last_modified,
+            "checked_at": datetime.now(timezone.utc).isoformat()
+        }
+    
+    def _chunk_annotator(self, url: str, url_hash: str) -> tuple[Callable, list[str]]:
+        """Chunk metadata setter for one page, and the list it records the page's chunk IDs in."""
+        chunk_ids = []
+        occurrences: dict[str, int] = {}
+        
+        def annotate(doc, index):
+            # Repeated passages on a page get distinct IDs
+            base_id = content_chunk_id(url_hash, doc.page_content)
+            occurrence = occurrences.get(base_id, 0)
+            occurrences[base_id] = occurrence + 1
             
-            # Store in vector DB
-            num_stored = self.vector_store.add_documents(documents, self.collection_name)
+            doc.metadata["source_url"] = url
+            doc.metadata["source_domain"] = urlparse(url).hostname or ""
+            doc.metadata["chunk_number"] = len(chunk_ids) + 1
+            doc.metadata["chunk_id"] = content_chunk_id(url_hash, doc.page_content, occurrence)
+            doc.metadata["url_hash"] = url_hash  # Track which URL this came from
+            chunk_ids.append(doc.metadata["chunk_id"])
+        
+        return annotate, chunk_ids
+    
+    def _ingest(
+        self,
+        url: str,
+        url_hash: str,
+        fetched: FetchResult,
+        previous_ids: list[str],
+        reuse: bool,
+        progress: Callable
+    ) -> tuple[int, int]:
+        """
+        Chunk and store a fetched page over its previous version.
+        
+        Chunk IDs are derived from the chunk text, so with reuse=True chunks
+        already stored under the same ID are not embedded again; their
+        metadata (chunk_number, ...) is updated to this version of the page.
+        New chunks are upserted before the previous version's leftovers are
+        deleted, so the page never drops out of search.
+        
+        Returns:
+            (chunks embedded, stale chunks deleted)
+        """
+        existing = set(previous_ids) if reuse else set()
+        annotate, _ = self._chunk_annotator(url, url_hash)
+        relabelled: dict[str, dict] = {}  # Reused chunk ID -> its metadata in this version of the page
+        
+        def reused(doc) -> bool:
+            if doc.metadata["chunk_id"] not in existing:
+                return False
+            relabelled[doc.metadata["chunk_id"]] = dict(doc.metadata)
+            return True
+        
+        with ingestion_stage("web", "extract"):
+            pages = [html_to_document(url, fetched.html)]
+        result = self.pipeline.run(pages, annotate, progress, skip=reused)
+        with ingestion_stage("web", "cleanup"):
+            # Reused chunks keep their vectors; only chunks whose position or page metadata changed are rewritten
+            for batch in batched(relabelled.items(), self.settings.ingestion_batch_size):
+                self.vector_store.update_metadata(dict(batch), self.collection_name)
+            stale = stale_chunk_ids(previous_ids, result.chunk_ids)
+            self.vector_store.delete(stale, self.collection_name)
             
-            # Store metadata for duplicate detection
-            self._store_metadata(url_hash, url, num_stored)
+            # Record source, chunk IDs, and HTTP validators for duplicate detection and refreshes
+            metadata = {**self._validators(fetched), "chunks_duplicate": result.chunks_duplicate}
+            self.registry.complete(url_hash, result.chunk_ids, metadata)
+        return result.chunks_stored, len(stale)
+    
+    def process_url(self, url: str, force_reprocess: bool = False, progress: Callable | None = None) -> int:
+        """Scrape, chunk, and store web page (progress is an optional callback(stage, **counts))."""
+        progress = progress or (lambda *args, **kwargs: None)
+        
+        # Calculate URL hash
+        url_hash = self._calculate_url_hash(url)
+        
+        # Claim the hash so concurrent requests for the same URL don't both ingest it
+        if not self.registry.claim(url_hash, "web", url, force=force_reprocess):
+            logger.warning(f"URL already processed: {url} (hash: {url_hash[:8]}...)")
+            raise ValueError(
+                f"URL '{url}' has already been processed or is being processed. "
+                f"Use force_reprocess=True to override."
+            )
+        
+        try:
+            previous_ids = self.registry.get_chunk_ids(url_hash)
+            with ingestion_stage("web", "fetch"):
+                fetched = fetch_page(url)
+            num_stored, _ = self._ingest(url, url_hash, fetched, previous_ids, reuse=False, progress=progress)
+            progress("stored", chunks_stored=num_stored)
             
             logger.info(f"Processed URL '{url}': {num_stored} chunks stored")
             return num_stored
             
         except Exception as e:
+            self.registry.release(url_hash)
             logger.exception(f"Error processing URL '{url}'")
             raise
     
-    def search(self, query: str, k: int = 10) -> list:
-        """Search web knowledge base."""
+    def refresh_url(self, url: str, progress: Callable | None = None) -> dict:
+        """
+        Bring a tracked web page up to date, re-embedding only what changed.
+        
+        The page is fetched with a conditional GET (If-None-Match /
+        If-Modified-Since from the previous fetch). A 304 costs no parsing or
+        embedding; otherwise only chunks whose text is new are embedded and
+        chunks that disappeared are deleted. Untracked URLs are ingested.
+        
+        Args:
+            url: Page URL
+            progress: Optional callback(stage, **counts) for job status reporting
+        
+        Returns:
+            Dict with url, status ("new", "not_modified", "unchanged", or
+            "updated"), chunks_embedded, and chunks_deleted
+        
+        Raises:
+            ValueError: If the page is being ingested right now
+        """
+        progress = progress or (lambda *args, **kwargs: None)
+        url_hash = self._calculate_url_hash(url)
+        
+        record = self.registry.get(url_hash)
+        if record is None or record.status != STATUS_COMPLETED:
+            chunks_embedded = self.process_url(url, progress=progress)
+            return {"url": url, "status": "new", "chunks_embedded": chunks_embedded, "chunks_deleted": 0}
+        
+        if not self.registry.claim(url_hash, "web", url, force=True):
+            raise ValueError(f"URL '{url}' is being processed; try again when it has finished")
+        
         try:
-            results = self.vector_store.similarity_search(query, self.collection_name, k=k)
+            previous_ids = self.registry.get_chunk_ids(url_hash)
+            with ingestion_stage("web", "fetch"):
+                fetched = fetch_page(url, record.metadata.get("etag"), record.metadata.get("last_modified"))
+            if fetched.not_modified:
+                self.registry.complete(url_hash, previous_ids, self._validators(fetched))
+                progress("stored", chunks_stored=0)
+                logger.info(f"Refreshed URL '{url}': not modified")
+                return {"url": url, "status": "not_modified", "chunks_embedded": 0, "chunks_deleted": 0}
             
-            structured_results = []
-            for res in results:
-                structured_results.append({
-                    "content": res.page_content,
-                    "source_url": res.metadata.get("source_url", "unknown"),
-                    "chunk_number": res.metadata.get("chunk_number", 0)
-                })
+            chunks_embedded, chunks_deleted = self._ingest(
+                url, url_hash, fetched, previous_ids, reuse=True, progress=progress
+            )
+            progress("stored", chunks_stored=chunks_embedded, chunks_deleted=chunks_deleted)
             
-            return structured_results
+            logger.info(f"Refreshed URL '{url}': {chunks_embedded} chunks embedded, {chunks_deleted} deleted")
+            status = "updated" if chunks_embedded or chunks_deleted else "unchanged"
+            return {"url": url, "status": status, "chunks_embedded": chunks_embedded, "chunks_deleted": chunks_deleted}
+        
+        except Exception as e:
+            self.registry.release(url_hash)
+            logger.exception(f"Error refreshing URL '{url}'")
+            raise
+    
+    def refresh_all(self, progress: Callable | None = None) -> dict:
+        """Refresh every tracked web page (see refresh_url); returns counts per outcome."""
+        progress = progress or (lambda *args, **kwargs: None)
+        records = [record for record in self.list_pages() if record.status == STATUS_COMPLETED]
+        summary = {
+            "pages": len(records),
+            "new": 0,  # Deleted while the refresh was running, so ingested again
+            "not_modified": 0,
+            "unchanged": 0,
+            "updated": 0,
+            "failed": 0,
+            "chunks_embedded": 0,
+            "chunks_deleted": 0
+        }
+        
+        for checked, record in enumerate(records, start=1):
+            try:
+                result = self.refresh_url(record.name)
+                summary[result["status"]] += 1
+                summary["chunks_embedded"] += result["chunks_embedded"]
+                summary["chunks_deleted"] += result["chunks_deleted"]
+            except Exception:
+                summary["failed"] += 1  # Logged by refresh_url; keep going with the other pages
+            progress(pages_checked=checked, **{key: value for key, value in summary.items() if key != "pages"})
+        
+        progress("refreshed", **summary)
+        logger.info(f"Refreshed {summary['pages']} web pages: {summary}")
+        return summary
+    
+    def _ingest_crawled(self, pages: list) -> IngestionResult:
+        """Ingest a group of claimed, crawled pages in one pipeline run."""
+        ingests = {}  # URL -> (url_hash, fetched, previous chunk IDs, annotate, current chunk IDs)
+        for page in pages:
+            url_hash = self._calculate_url_hash(page.url)
+            ingests[page.url] = (url_hash, page.result, self.registry.get_chunk_ids(url_hash), *self._chunk_annotator(page.url, url_hash))
+        
+        documents = (html_to_document(url, ingest[1].html) for url, ingest in ingests.items())
+        result = self.pipeline.run(documents, lambda doc, index: ingests[doc.metadata["source"]][3](doc, index))
+        
+        for url_hash, fetched, previous_ids, _, chunk_ids in ingests.values():
+            self.vector_store.delete(stale_chunk_ids(previous_ids, chunk_ids), self.collection_name)
+            self.registry.complete(url_hash, chunk_ids, self._validators(fetched))
+        return result
+    
+    def crawl(self, plan: CrawlPlan, force_reprocess: bool = False, progress: Callable | None = None) -> dict:
+        """
+        Crawl pages and ingest them, batching chunks across pages.
+        
+        Pages are fetched concurrently by the shared crawler (see
+        services.crawler) and consumed as they arrive. Chunks of several pages
+        are packed into the same embedding and upsert batches, and each group
+        of pages is recorded in the registry once its chunks are stored.
+        Already processed URLs are skipped unless force_reprocess is set.
+        
+        Args:
+            plan: Seed URLs and link-following rules
+            force_reprocess: Re-ingest pages that were processed before
+            progress: Optional callback(stage, **counts) for job status reporting
+        
+        Returns:
+            Dict with pages_fetched, pages_ingested, pages_skipped,
+            pages_failed, chunks_stored, and chunks_duplicate
+        """
+        progress = progress or (lambda *args, **kwargs: None)
+        summary = {
+            "pages_fetched": 0,
+            "pages_ingested": 0,
+            "pages_skipped": 0,
+            "pages_failed": 0,
+            "chunks_stored": 0,
+            "chunks_duplicate": 0  # Near-duplicates of stored chunks (e.g. page templates), not embedded
+        }
+        unfinished = set()  # Hashes claimed but not yet completed
+        
+        def claimed_pages():
+            for page in get_crawler().crawl(plan):
+                summary["pages_fetched"] += 1
+                if page.error is not None:
+                    summary["pages_failed"] += 1
+                    logger.info(f"Crawl skipped {page.url}: {page.error}")
+                    continue
+                url_hash = self._calculate_url_hash(page.url)
+                if not self.registry.claim(url_hash, "web", page.url, force=force_reprocess):
+                    summary["pages_skipped"] += 1
+                    continue
+                unfinished.add(url_hash)
+                yield page
+        
+        try:
+            for group in batched(claimed_pages(), _CRAWL_PAGES_PER_RUN):
+                result = self._ingest_crawled(group)
+                summary["chunks_stored"] += result.chunks_stored
+                summary["chunks_duplicate"] += result.chunks_duplicate
+                summary["pages_ingested"] += len(group)
+                unfinished.clear()
+                progress("crawling", **summary)
+        except Exception:
+            for url_hash in unfinished:
+                self.registry.release(url_hash)
+            logger.exception(f"Crawl failed after {summary['pages_ingested']} pages")
+            raise
+        
+        progress("stored", **summary)
+        logger.info(f"Crawl finished: {summary}")
+        return summary
+    
+    def delete_page(self, url_hash: str) -> int:
+        """
+        Delete a web page's chunks from the knowledge base and forget it.
+        
+        Args:
+            url_hash: SHA-256 of the URL
+        
+        Returns:
+            Number of chunks deleted
+        
+        Raises:
+            KeyError: If no page with this hash was ingested
+            ValueError: If the page is being scraped right now
+        """
+        record = self.registry.get(url_hash)
+        if record is None or record.kind != "web":
+            raise KeyError(url_hash)
+        
+        # Claiming blocks a concurrent (re-)scrape while the chunks are deleted
+        if not self.registry.claim(url_hash, "web", record.name, force=True):
+            raise ValueError(f"URL '{record.name}' is being processed; try again when it has finished")
+        try:
+            chunk_ids = self.registry.get_chunk_ids(url_hash)
+            self.vector_store.delete(chunk_ids, self.collection_name)
+        except Exception:
+            self.registry.release(url_hash)
+            logger.exception(f"Error deleting URL '{record.name}'")
+            raise
+        
+        self.registry.remove(url_hash)
+        logger.info(f"Deleted URL '{record.name}': {len(chunk_ids)} chunks removed")
+        return len(chunk_ids)
+    
+    def _format_results(self, results: list) -> list:
+        return [
+            {
+                "content": res.page_content,
+                "source_url": res.metadata.get("source_url", "unknown"),
+                "chunk_number": res.metadata.get("chunk_number", 0)
+            }
+            for res in results
+        ]
+    
+    def search(self, query: str, k: int = 10, filter: dict | None = None) -> list:
+        """Search web knowledge base."""
+        try:
+            results = self.vector_store.similarity_search(query, self.collection_name, k=k, filter=filter)
+            return self._format_results(results)
             
+        except Exception as e:
+            logger.exception("Web search failed")
+            raise
+    
+    async def asearch(self, query: str, k: int = 10, mode: str = "dense", filter: dict | None = None) -> list:
+        """Search web knowledge base without blocking the event loop (mode: dense, lexical, or hybrid)."""
+        try:
+            results = await self.vector_store.asearch(query, self.collection_name, k=k, mode=mode, filter=filter)
+            return self._format_results(results)
+        
         except Exception as e:
             logger.exception("Web search failed")
             raise
\ No newline at end of file
@@ -1,5 +1,6 @@
 from langchain_google_community import GoogleSearchAPIWrapper
 from langchain_core.tools import BaseTool
+from pydantic import PrivateAttr
 
 class GoogleSearchTool(BaseTool):
     name: str = "google_search"
@@ -8,8 +9,10 @@ class GoogleSearchTool(BaseTool):
         "Use this for fresh information, news, or fact-checking. "
         "Input should be a search query string."
     )
+    _search_wrapper: GoogleSearchAPIWrapper | None = PrivateAttr(None)
     
     def _run(self, query: str) -> str:
         """Execute Google search."""
-        search_wrapper = GoogleSearchAPIWrapper()
-        return search_wrapper.run(query)
\ No newline at end of file
+        if self._search_wrapper is None:
+            self._search_wrapper = GoogleSearchAPIWrapper()  # Builds the API client once
+        return self._search_wrapper.run(query)
\ No newline at end of file
@@ -0,0 +1,28 @@
+from langchain_core.tools import BaseTool
+from pydantic import Field
+from typing import Any
+from core.config import get_settings
+import json
+
+class KnowledgeSearchTool(BaseTool):
+    name: str = "knowledge_search"
+    description: str = (
+        "Search the whole knowledge base (uploaded PDFs and added web pages) in one call. "
+        "Returns the most relevant text chunks ranked together, each with its collection "
+        "(pdf or web) and source filename/page or URL. "
+        "Input should be a search query string."
+    )
+    search_service: Any = Field(exclude=True)  # Shared KnowledgeSearchService (see services.container)
+    
+    def _mode(self) -> str:
+        return "hybrid" if get_settings().lexical_index_enabled else "dense"
+    
+    def _run(self, query: str) -> str:
+        """Execute knowledge base search."""
+        results = self.search_service.search(query, k=8, mode=self._mode())
+        return json.dumps(results, indent=2)
+    
+    async def _arun(self, query: str) -> str:
+        """Execute knowledge base search asynchronously."""
+        results = await self.search_service.asearch(query, k=8, mode=self._mode())
+        return json.dumps(results, indent=2)
\ No newline at end of file
@@ -1,18 +1,32 @@
 from langchain_core.tools import BaseTool
-from pydantic import Field
+from pydantic import BaseModel, Field
+from typing import Any
 import json
 
+class PDFSearchInput(BaseModel):
+    query: str = Field(description="Search query")
+    source: str | None = Field(None, description="Only search this PDF filename, e.g. 'manual_v3.pdf'")
+    page_from: int | None = Field(None, description="Only search from this page number on")
+    page_to: int | None = Field(None, description="Only search up to this page number")
+
 class PDFSearchTool(BaseTool):
     name: str = "pdf_search"
     description: str = (
         "Search stored PDF documents that were previously uploaded into the knowledge base. "
         "Returns relevant text segments with page numbers and source filenames. "
-        "Input should be a search query string."
+        "Optionally restrict the search to one PDF (source filename) and/or a page range."
     )
+    args_schema: type[BaseModel] = PDFSearchInput
+    pdf_service: Any = Field(exclude=True)  # Shared PDFService (see services.container)
     
-    def _run(self, query: str) -> str:
+    def _run(self, query: str, source: str | None = None, page_from: int | None = None, page_to: int | None = None) -> str:
         """Execute PDF search."""
-        from services.pdf_service import PDFService
-        pdf_service = PDFService()
-        results = pdf_service.search(query, k=5)
+        from services.pdf_service import pdf_filter
+        results = self.pdf_service.search(query, k=5, filter=pdf_filter(source, page_from=page_from, page_to=page_to))
+        return json.dumps(results, indent=2)
+    
+    async def _arun(self, query: str, source: str | None = None, page_from: int | None = None, page_to: int | None = None) -> str:
+        """Execute PDF search asynchronously."""
+        from services.pdf_service import pdf_filter
+        results = await self.pdf_service.asearch(query, k=5, filter=pdf_filter(source, page_from=page_from, page_to=page_to))
         return json.dumps(results, indent=2)
\ No newline at end of file
@@ -1,18 +1,31 @@
 from langchain_core.tools import BaseTool
-from pydantic import Field
+from pydantic import BaseModel, Field
+from typing import Any
 import json
 
+class WebSearchInput(BaseModel):
+    query: str = Field(description="Search query")
+    url: str | None = Field(None, description="Only search this page URL")
+    domain: str | None = Field(None, description="Only search pages from this site, e.g. 'docs.python.org'")
+
 class WebSearchTool(BaseTool):
     name: str = "web_data_search"
     description: str = (
         "Search stored web page content that was previously added to the knowledge base. "
         "Returns relevant text chunks with source URLs. "
-        "Input should be a search query string."
+        "Optionally restrict the search to one page (url) or one site (domain)."
     )
+    args_schema: type[BaseModel] = WebSearchInput
+    web_service: Any = Field(exclude=True)  # Shared WebService (see services.container)
     
-    def _run(self, query: str) -> str:
+    def _run(self, query: str, url: str | None = None, domain: str | None = None) -> str:
         """Execute web search."""
-        from services.web_service import WebService
-        web_service = WebService()
-        results = web_service.search(query, k=10)
+        from services.web_service import web_filter
+        results = self.web_service.search(query, k=10, filter=web_filter(url, domain=domain))
+        return json.dumps(results, indent=2)
+    
+    async def _arun(self, query: str, url: str | None = None, domain: str | None = None) -> str:
+        """Execute web search asynchronously."""
+        from services.web_service import web_filter
+        results = await self.web_service.asearch(query, k=10, filter=web_filter(url, domain=domain))
         return json.dumps(results, indent=2)
\ No newline at end of file
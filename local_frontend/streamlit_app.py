@@ -1,6 +1,7 @@
 import streamlit as st
 import os
 import requests
+import time
 from pathlib import Path
 
 # Streamlit talks to backend via HTTP API only
@@ -42,6 +43,15 @@ except requests.exceptions.RequestException as e:
     st.info("Make sure the backend is running: `docker-compose up backend`")
     st.stop()
 
+def wait_for_job(job_id: str, timeout: int = 300) -> dict:
+    """Poll an ingestion job until it finishes or the timeout passes."""
+    deadline = time.time() + timeout
+    while True:
+        job = requests.get(f"{API_BASE}/jobs/{job_id}", timeout=10).json()
+        if job["status"] in ("completed", "failed") or time.time() > deadline:
+            return job
+        time.sleep(1)
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -103,14 +113,22 @@ with st.sidebar:
                         timeout=60
                     )
                     
-                    if response.status_code == 200:
-                        data = response.json()
-                        st.success(f"✅ {data['message']}")
-                        st.info(f"Stored {data['chunks_stored']} chunks")
-                        st.session_state.uploaded_pdfs.add(file_id)
+                    if response.status_code in (200, 202):
+                        job = wait_for_job(response.json()["job_id"])
+                        if job["status"] == "completed":
+                            st.success("✅ PDF uploaded and processed successfully")
+                            st.info(f"Stored {job['result']['chunks_stored']} chunks")
+                            st.session_state.uploaded_pdfs.add(file_id)
+                        elif job["status"] == "failed":
+                            st.error(f"❌ Processing failed: {job['error']}")
+                        else:
+                            st.info(f"⏳ Still processing (stage: {job.get('stage') or 'queued'}). It will be searchable once done.")
+                            st.session_state.uploaded_pdfs.add(file_id)
                     elif response.status_code == 409:
                         st.warning("⚠️ This PDF has already been uploaded and processed.")
                         st.info("💡 Enable 'Allow re-upload' to process it again.")
+                    elif response.status_code == 429:
+                        st.warning("⏳ The server is busy processing other documents. Please try again shortly.")
                     else:
                         st.error(f"❌ Upload failed: {response.text}")
                 except Exception as e:
@@ -148,6 +166,8 @@ with st.sidebar:
                     elif response.status_code == 409:
                         st.warning("⚠️ This URL has already been processed.")
                         st.info("💡 Enable 'Allow re-process' to scrape it again.")
+                    elif response.status_code == 429:
+                        st.warning("⏳ The server is busy processing other documents. Please try again shortly.")
                     else:
                         st.error(f"❌ Scraping failed: {response.text}")
                 except Exception as e:
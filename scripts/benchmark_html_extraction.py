@@ -0,0 +1,76 @@
+"""
+Benchmark web page extraction: WebBaseLoader's BeautifulSoup parse vs. lxml main-content extraction:
+  python scripts/benchmark_html_extraction.py --repeat 50
+
+Runs both extractors over saved HTML pages (scripts/fixtures/html by
+default; pass --fixtures to use your own saved pages) and reports parse
+time, extracted characters, and the number of chunks WebService would
+embed for each page.
+
+REQUIREMENTS:
+  Backend requirements:
+      pip install -r backend/requirements.txt
+"""
+
+from pathlib import Path
+import argparse
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from bs4 import BeautifulSoup
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from services.html_extraction import extract_html
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "html"
+
+def webbaseloader_text(html: str) -> str:
+    """What WebBaseLoader (and the web ingestion before lxml extraction) indexes: all text of the page."""
+    return BeautifulSoup(html, "html.parser").get_text()
+
+def lxml_text(html: str) -> str:
+    return extract_html(html).text
+
+def time_it(func, html: str, repeat: int) -> tuple[str, float]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = func(html)
+    return text, (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML extraction")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES, help="Directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    
+    pages = sorted(args.fixtures.glob("*.html"))
+    if not pages:
+        sys.exit(f"No .html files in {args.fixtures}")
+    
+    # Same splitter settings as WebService
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
+    extractors = [("WebBaseLoader (bs4)", webbaseloader_text), ("lxml main content", lxml_text)]
+    totals = {name: [0.0, 0, 0] for name, _ in extractors}
+    
+    print(f"{'Page':<26}{'Extractor':<22}{'KB':>7}{'Parse ms':>10}{'Chars':>8}{'Chunks':>8}")
+    for path in pages:
+        html = path.read_text(encoding="utf-8", errors="replace")
+        for name, func in extractors:
+            text, elapsed = time_it(func, html, args.repeat)
+            chunks = len(splitter.split_text(text))
+            totals[name][0] += elapsed
+            totals[name][1] += len(text)
+            totals[name][2] += chunks
+            print(f"{path.stem[:25]:<26}{name:<22}{len(html) / 1024:>7.1f}{elapsed * 1000:>10.2f}{len(text):>8}{chunks:>8}")
+    
+    print()
+    baseline = totals[extractors[0][0]]
+    for name, (elapsed, chars, chunks) in totals.items():
+        print(
+            f"{'Total':<26}{name:<22}{'':>7}{elapsed * 1000:>10.2f}{chars:>8}{chunks:>8}"
+            f"  ({elapsed / baseline[0]:.2f}x time, {chunks / baseline[2]:.0%} of chunks)"
+        )
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+Benchmark serial vs. parallel PDF page extraction:
+  python scripts/benchmark_pdf_extraction.py --pages 500 --workers 2 4 8
+
+Generates a multi-page PDF (see generate_test_pdf.py), then compares
+PyPDFLoader with services.pdf_extraction.extract_pages at several worker
+counts and checks that page text and page numbers match exactly.
+
+REQUIREMENTS:
+  Backend requirements plus reportlab:
+      pip install -r backend/requirements.txt reportlab
+"""
+
+from pathlib import Path
+import argparse
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from langchain_community.document_loaders import PyPDFLoader
+from services.pdf_extraction import extract_pages
+from generate_test_pdf import generate_multipage_document
+
+def time_it(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel PDF extraction")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--pdf", type=Path, default=None, help="Use an existing PDF instead of generating one")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf
+        if pdf_path is None:
+            pdf_path = Path(tmp) / f"benchmark_{args.pages}p.pdf"
+            print(f"Generating {args.pages}-page PDF...")
+            generate_multipage_document(pdf_path, args.pages)
+        
+        baseline, baseline_time = time_it(lambda: PyPDFLoader(str(pdf_path), extract_images=False).load())
+        print(f"\n{'Mode':<22}{'Pages':>8}{'Time (s)':>12}{'Speedup':>10}")
+        print(f"{'PyPDFLoader (serial)':<22}{len(baseline):>8}{baseline_time:>12.2f}{1.0:>10.2f}")
+        
+        for workers in [1] + args.workers:
+            # Warm the process pool so spawn cost isn't counted against extraction
+            if workers > 1:
+                list(extract_pages(pdf_path, workers=workers, min_pages_for_parallel=0))
+            pages, elapsed = time_it(lambda: list(extract_pages(pdf_path, workers=workers, min_pages_for_parallel=0)))
+            
+            assert [p.page_content for p in pages] == [p.page_content for p in baseline], "Page text differs"
+            assert [p.metadata["page"] for p in pages] == [p.metadata["page"] for p in baseline], "Page numbers differ"
+            print(f"{f'extract_pages x{workers}':<22}{len(pages):>8}{elapsed:>12.2f}{baseline_time / elapsed:>10.2f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Recall@k vs. latency vs. memory for quantized NumPy vector storage:
+  python scripts/benchmark_quantization.py --vectors 50000 --dim 768 --k 10
+
+Builds float32, float16 and int8 NumpyCollections from the same synthetic,
+clustered, normalized embeddings and compares each search mode (with and
+without float32 rescoring) against exact float32 brute force.
+
+REQUIREMENTS:
+  Backend requirements:
+      pip install -r backend/requirements.txt
+"""
+
+from pathlib import Path
+import argparse
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from services.numpy_vector_store import NumpyCollection
+
+def make_embeddings(n: int, dim: int, clusters: int, seed: int = 42) -> np.ndarray:
+    """Clustered unit vectors, roughly shaped like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def build(directory: Path, dtype: str, vectors: np.ndarray, batch_size: int = 1000) -> NumpyCollection:
+    collection = NumpyCollection(directory, dtype)
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        ids = [str(i) for i in range(start, start + len(batch))]
+        collection.add(ids, [""] * len(batch), [{}] * len(batch), batch)
+    return collection
+
+def run(collection: NumpyCollection, queries: np.ndarray, truth: list[set], k: int, rescore: int):
+    collection.rescore_multiplier = rescore
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = collection.search(query, k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(expected & {row for row, _ in results})
+    return hits / (k * len(queries)), np.mean(latencies) * 1000, np.percentile(latencies, 95) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized vector storage")
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=200)
+    args = parser.parse_args()
+    
+    print(f"Generating {args.vectors} x {args.dim} embeddings...")
+    vectors = make_embeddings(args.vectors, args.dim, args.clusters)
+    rng = np.random.default_rng(7)
+    queries = vectors[rng.integers(0, args.vectors, args.queries)] + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    exact_scores = queries @ vectors.T
+    truth = [set(np.argpartition(-scores, args.k - 1)[:args.k].tolist()) for scores in exact_scores]
+    
+    modes = [
+        ("float32", 0),
+        ("float16", 0),
+        ("float16", 2),
+        ("int8", 0),
+        ("int8", 2),
+        ("int8", 4),
+        ("int8", 10),
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        collections = {dtype: build(Path(tmp) / dtype, dtype, vectors) for dtype in ("float32", "float16", "int8")}
+        baseline_bytes = collections["float32"]._matrix[:args.vectors].nbytes
+        
+        print(f"\n{'Storage':<10}{'Rescore':>9}{'Scan MB':>10}{'Memory':>9}{f'Recall@{args.k}':>11}{'Mean ms':>10}{'p95 ms':>9}")
+        for dtype, rescore in modes:
+            collection = collections[dtype]
+            scanned = collection._matrix[:args.vectors].nbytes
+            recall, mean_ms, p95_ms = run(collection, queries, truth, args.k, rescore)
+            label = f"x{rescore}" if rescore else "-"
+            print(
+                f"{dtype:<10}{label:>9}{scanned / 1e6:>10.1f}{scanned / baseline_bytes:>8.0%} "
+                f"{recall:>10.3f}{mean_ms:>10.2f}{p95_ms:>9.2f}"
+            )
+        print("\nRescoring reads k * multiplier rows from the on-disk float32 copy (vectors_f32.npy).")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Per-call service construction cost: a new PDFService/WebService per tool call vs. the shared service container:
+  python scripts/benchmark_service_container.py --calls 20
+
+Uses the vector store configured in .env / the environment (Chroma locally,
+Pinecone in production, or VECTOR_STORE_TYPE=numpy). "per call" is what the
+agent tools and API routes did before the container: build both services,
+and with them a new vector store, on every call. "shared" is what they do
+now: build one ServiceContainer at startup and reuse its services.
+
+No searches are run, so the timings are construction cost only (for
+Pinecone this includes the dimension probe and list_indexes() call).
+
+REQUIREMENTS:
+  Backend requirements:
+      pip install -r backend/requirements.txt
+"""
+
+from pathlib import Path
+import argparse
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from core.config import get_settings
+from services.container import ServiceContainer
+from services.pdf_service import PDFService
+from services.web_service import WebService
+
+def time_calls(func, calls: int) -> list[float]:
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def per_call():
+    """The old tool/route path: new services (and vector store) every call."""
+    pdf_service = PDFService()
+    web_service = WebService()
+    return pdf_service, web_service
+
+def report(label: str, latencies: list[float]):
+    print(
+        f"{label:<10} mean {statistics.mean(latencies) * 1000:10.3f} ms   "
+        f"max {max(latencies) * 1000:10.3f} ms   total {sum(latencies) * 1000:10.1f} ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-call vs. shared service construction")
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    print(f"Vector store: {settings.vector_store_type} [Environment: {settings.environment}], {args.calls} calls\n")
+
+    report("per call", time_calls(per_call, args.calls))
+
+    start = time.perf_counter()
+    services = ServiceContainer()
+    startup = time.perf_counter() - start
+    shared = time_calls(lambda: (services.pdf_service, services.web_service), args.calls)
+    report("shared", shared)
+    print(f"\nContainer startup (once per process): {startup * 1000:.1f} ms")
+    services.close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
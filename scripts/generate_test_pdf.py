@@ -1,6 +1,9 @@
 """
 Run this script to generate test PDF:
   python scripts/generate_test_pdf.py
+
+Generate a large multi-page PDF (e.g. for benchmarks):
+  python scripts/generate_test_pdf.py --pages 500 --output tests/fixtures/large_document.pdf
   
 REQUIREMENTS:
   This script needs the reportlab package.
@@ -11,16 +14,57 @@ REQUIREMENTS:
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from pathlib import Path
+import argparse
+import random
 
-output_dir = Path("tests/fixtures")
-output_dir.mkdir(parents=True, exist_ok=True)
+SENTENCES = [
+    "The controller firmware validates each configuration block before applying it.",
+    "Replace filter cartridge FX-{n:04d} every 500 operating hours.",
+    "Error code E{n:03d} indicates a sensor calibration timeout on the primary bus.",
+    "Machine learning models are retrained nightly on the aggregated telemetry.",
+    "Torque the mounting bolts to 12 Nm in a star pattern to avoid warping.",
+    "Section {n} describes the maintenance schedule for the hydraulic subsystem.",
+    "Retrieval-augmented generation combines vector search with a language model.",
+    "Part number PN-{n:05d} supersedes all earlier revisions of this assembly.",
+]
 
-pdf_path = output_dir / "test_document.pdf"
+def generate_test_document(pdf_path: Path):
+    """Small single-page PDF used by the API integration tests."""
+    c = canvas.Canvas(str(pdf_path), pagesize=letter)
+    c.drawString(100, 750, "Test Document for OmniKnow RAG Agent")
+    c.drawString(100, 730, "This is a test PDF for automated testing.")
+    c.drawString(100, 710, "Content: Machine learning and AI research.")
+    c.save()
 
-c = canvas.Canvas(str(pdf_path), pagesize=letter)
-c.drawString(100, 750, "Test Document for OmniKnow RAG Agent")
-c.drawString(100, 730, "This is a test PDF for automated testing.")
-c.drawString(100, 710, "Content: Machine learning and AI research.")
-c.save()
+def generate_multipage_document(pdf_path: Path, pages: int, seed: int = 42):
+    """Multi-page PDF with ~40 lines of technical-manual style text per page."""
+    rng = random.Random(seed)
+    c = canvas.Canvas(str(pdf_path), pagesize=letter)
+    for page in range(1, pages + 1):
+        c.setFont("Helvetica-Bold", 12)
+        c.drawString(72, 750, f"OmniKnow Benchmark Manual - Page {page}")
+        c.setFont("Helvetica", 9)
+        y = 730
+        while y > 60:
+            sentence = rng.choice(SENTENCES).format(n=rng.randint(1, 99999))
+            c.drawString(72, y, sentence)
+            y -= 16
+        c.showPage()
+    c.save()
 
-print(f"✅ Created test PDF at: {pdf_path}")
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate test PDFs")
+    parser.add_argument("--pages", type=int, default=None, help="Generate a multi-page PDF with this many pages")
+    parser.add_argument("--output", type=Path, default=None, help="Output path")
+    args = parser.parse_args()
+    
+    if args.pages:
+        pdf_path = args.output or Path("tests/fixtures") / f"test_document_{args.pages}p.pdf"
+        pdf_path.parent.mkdir(parents=True, exist_ok=True)
+        generate_multipage_document(pdf_path, args.pages)
+    else:
+        pdf_path = args.output or Path("tests/fixtures") / "test_document.pdf"
+        pdf_path.parent.mkdir(parents=True, exist_ok=True)
+        generate_test_document(pdf_path)
+    
+    print(f"✅ Created test PDF at: {pdf_path}")
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Move per-collection ChromaDB stores into the shared store:
+  python scripts/migrate_chroma_stores.py [--dry-run] [--delete]
+
+Earlier versions kept each collection in its own persistent store
+(chroma_db/pdf_data_collection/, chroma_db/web_data_collection/, ...).
+ChromaVectorStore now opens one persistent client at CHROMA_PERSIST_DIRECTORY
+holding every collection. This copies each legacy collection's IDs,
+embeddings, documents and metadata into that client (nothing is
+re-embedded), creating the collections with the configured CHROMA_HNSW_*
+parameters, then moves the legacy directories to
+<CHROMA_PERSIST_DIRECTORY>/.legacy/ (or deletes them with --delete).
+
+Stop the API first: the store must not be written while it is migrated.
+Run from the backend directory (or wherever .env lives).
+
+REQUIREMENTS:
+  Backend requirements:
+      pip install -r backend/requirements.txt
+"""
+
+from pathlib import Path
+import argparse
+import shutil
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import chromadb
+from core.config import get_settings
+from services.vector_store import chroma_collection_metadata, close_chroma_client, find_legacy_chroma_stores
+
+def copy_collection(source, target, batch_size: int) -> int:
+    """Copy every record of one Chroma collection into another, in batches."""
+    copied, offset = 0, 0
+    while True:
+        records = source.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+        if not records["ids"]:
+            return copied
+        target.upsert(
+            ids=records["ids"],
+            embeddings=records["embeddings"],
+            documents=records["documents"],
+            metadatas=records["metadatas"]
+        )
+        copied += len(records["ids"])
+        offset += batch_size
+
+def main():
+    parser = argparse.ArgumentParser(description="Move per-collection ChromaDB stores into the shared store")
+    parser.add_argument("--dry-run", action="store_true", help="List what would be migrated")
+    parser.add_argument("--delete", action="store_true", help="Delete legacy stores instead of moving them to .legacy/")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    legacy_stores = find_legacy_chroma_stores(settings.chroma_persist_directory)
+    if not legacy_stores:
+        print(f"No per-collection stores found in {settings.chroma_persist_directory}")
+        return
+
+    target = chromadb.PersistentClient(path=settings.chroma_persist_directory)
+    batch_size = min(settings.chroma_insert_batch_size, target.get_max_batch_size())
+    migrated = []
+    for path in legacy_stores:
+        source = chromadb.PersistentClient(path=str(path))
+        for collection in source.list_collections():
+            if args.dry_run:
+                print(f"{path.name}: would copy {collection.count()} records into collection '{collection.name}'")
+                continue
+
+            target_collection = target.get_or_create_collection(
+                collection.name,
+                metadata=chroma_collection_metadata(settings),
+                embedding_function=None
+            )
+            copied = copy_collection(collection, target_collection, batch_size)
+            print(f"{path.name}: copied {copied} records into collection '{collection.name}'")
+        close_chroma_client(source)  # Release the legacy store's files before it is moved
+        migrated.append(path)
+
+    close_chroma_client(target)
+    if args.dry_run:
+        return
+
+    backup = Path(settings.chroma_persist_directory) / ".legacy"
+    for path in migrated:
+        if args.delete:
+            shutil.rmtree(path)
+            print(f"Deleted {path}")
+        else:
+            backup.mkdir(exist_ok=True)
+            shutil.move(str(path), str(backup / path.name))
+            print(f"Moved {path} to {backup / path.name}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,9 +1,19 @@
 import requests
 import sys
+import time
 from pathlib import Path
 
 API_BASE = "http://localhost:8000"
 
+def wait_for_job(job_id, timeout=120):
+    """Poll an ingestion job until it finishes."""
+    deadline = time.time() + timeout
+    while True:
+        job = requests.get(f"{API_BASE}/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed") or time.time() > deadline:
+            return job
+        time.sleep(1)
+
 def test_health():
     """Test health endpoint."""
     print("Testing /health...")
@@ -29,12 +39,17 @@ def test_pdf_upload():
             files={"file": f}
         )
     
-    if response.status_code == 200:
-        data = response.json()
-        print(f"✅ PDF upload passed: {data}")
+    if response.status_code != 202:
+        print(f"❌ PDF upload failed: {response.text}")
+        return False
+    
+    # Processing happens in a background job
+    job = wait_for_job(response.json()["job_id"])
+    if job["status"] == "completed":
+        print(f"✅ PDF upload passed: {job['result']}")
         return True
     else:
-        print(f"❌ PDF upload failed: {response.text}")
+        print(f"❌ PDF processing failed: {job}")
         return False
 
 def test_pdf_search():
@@ -0,0 +1,72 @@
+"""
+Shared Chroma client lifecycle and collection parameters:
+  python -m pytest tests/test_chroma_client.py
+
+Runs offline against a persistent client in a temporary directory; a
+deterministic fake embedding model stands in for the configured one.
+"""
+
+from pathlib import Path
+import logging
+import sys
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from chromadb.api.client import SharedSystemClient
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Settings read .env from the working directory
+    monkeypatch.setenv("CHROMA_PERSIST_DIRECTORY", str(tmp_path / "chroma_db"))
+    monkeypatch.setenv("LEXICAL_INDEX_ENABLED", "false")
+    monkeypatch.setenv("ANONYMIZED_TELEMETRY", "false")
+    from core.config import get_settings
+    import services.vector_store as vector_store
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda: DeterministicFakeEmbedding(size=8))
+    get_settings.cache_clear()
+    yield monkeypatch
+    get_settings.cache_clear()
+
+def open_store(monkeypatch, search_ef: int):
+    from core.config import get_settings
+    from services.vector_store import ChromaVectorStore
+    monkeypatch.setenv("CHROMA_HNSW_SEARCH_EF", str(search_ef))
+    get_settings.cache_clear()
+    return ChromaVectorStore()
+
+def test_close_releases_the_client(settings):
+    store = open_store(settings, search_ef=10)
+    identifier = store.client._identifier
+    assert identifier in SharedSystemClient._identifier_to_system
+
+    store.close()
+    assert identifier not in SharedSystemClient._identifier_to_system
+    store.close()  # Closing twice is harmless
+
+def test_close_clears_the_cache_for_unrecognized_clients(settings):
+    store = open_store(settings, search_ef=10)
+    system = store.client._system
+    from services.vector_store import close_chroma_client
+    close_chroma_client(object())
+    assert SharedSystemClient._identifier_to_system == {}
+    system.stop()
+
+def test_existing_collection_keeps_its_search_ef(settings, caplog):
+    store = open_store(settings, search_ef=10)
+    store.add_documents([Document(page_content="pump seal", metadata={"chunk_id": "c-0"})], "pdf_data_collection")
+    store.close()
+
+    store = open_store(settings, search_ef=50)
+    with caplog.at_level(logging.WARNING, logger="services.vector_store"):
+        results = store.similarity_search("pump seal", "pdf_data_collection", k=1)
+    assert results[0].metadata["chunk_id"] == "c-0"
+    assert "hnsw:search_ef=10" in caplog.text and "CHROMA_HNSW_SEARCH_EF=50" in caplog.text
+    assert store.client.get_collection("pdf_data_collection").metadata["hnsw:search_ef"] == 10
+
+    # New collections use the configured value
+    store.similarity_search("pump seal", "web_data_collection", k=1)
+    assert store.client.get_collection("web_data_collection").metadata["hnsw:search_ef"] == 50
+    store.close()
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+Query micro-batching survives callers that give up:
+  python -m pytest tests/test_embedding_batching.py
+
+Runs offline: a deterministic fake embedding model, slowed down so queries
+queue up behind a batch in flight, stands in for the configured one.
+"""
+
+from concurrent.futures import Future
+from pathlib import Path
+import asyncio
+import sys
+import threading
+import time
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from services.embeddings import MicroBatchingEmbeddings
+
+class SlowEmbeddings(DeterministicFakeEmbedding):
+    """Fake embeddings that take `delay` seconds per call and can be told to fail."""
+    delay: float = 0.2
+    fail_next: int = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.delay)
+        if self.fail_next:
+            self.fail_next -= 1
+            raise RuntimeError("injected model failure")
+        return super().embed_documents(texts)
+
+@pytest.fixture
+def model():
+    return SlowEmbeddings(size=8)
+
+@pytest.fixture
+def batcher(model):
+    return MicroBatchingEmbeddings(model, max_batch_size=4, max_wait_ms=1)
+
+def embed_with_timeout(batcher, text: str, timeout: float = 5.0) -> list[float]:
+    """embed_query from a daemon thread, so a dead scheduler fails the test instead of hanging it."""
+    result = Future()
+
+    def run():
+        try:
+            result.set_result(batcher.embed_query(text))
+        except Exception as e:
+            result.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return result.result(timeout=timeout)
+
+def test_cancelled_queued_query_does_not_stop_the_scheduler(batcher, model):
+    async def scenario():
+        busy = asyncio.ensure_future(batcher.aembed_query("keeps the model busy"))
+        await asyncio.sleep(0.05)  # That batch is now in flight
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(batcher.aembed_query("gives up while queued"), 0.05)
+        return await busy
+
+    assert asyncio.run(scenario()) == model.embed_query("keeps the model busy")
+    assert embed_with_timeout(batcher, "next query") == model.embed_query("next query")
+
+def test_cancelled_query_in_flight_does_not_stop_the_scheduler(batcher, model):
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(batcher.aembed_query("gives up while embedded"), 0.05)
+
+    asyncio.run(scenario())
+    assert embed_with_timeout(batcher, "next query") == model.embed_query("next query")
+
+def test_model_failure_reaches_the_batch_and_not_later_queries(batcher, model):
+    model.fail_next = 1
+    with pytest.raises(RuntimeError, match="injected"):
+        embed_with_timeout(batcher, "fails")
+    assert embed_with_timeout(batcher, "next query") == model.embed_query("next query")
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+Embedding cache size accounting and eviction:
+  python -m pytest tests/test_embedding_cache.py
+
+Runs offline against a cache database in a temporary directory.
+"""
+
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from services.embedding_cache import EmbeddingCache
+
+VECTOR = [0.5] * 25  # 100 bytes as float32
+
+def test_replacing_a_vector_does_not_grow_the_stored_bytes(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), max_bytes=1000)
+    cache.put_many({"a": VECTOR, "b": VECTOR})
+    for _ in range(3):
+        cache.put_many({"a": VECTOR, "c": VECTOR})
+
+    # Under the limit, so no eviction recount has corrected the total
+    assert cache._bytes == cache.stats()["bytes"] == 300
+
+def test_least_recently_used_vectors_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"), max_bytes=250)
+    cache.put_many({"a": VECTOR})
+    cache.put_many({"b": VECTOR})
+    cache.get_many(["a"])
+    cache.put_many({"c": VECTOR})  # 300 bytes: evicted down to 225
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+    assert cache._bytes == cache.stats()["bytes"] == 200
\ No newline at end of file
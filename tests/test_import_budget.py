@@ -0,0 +1,75 @@
+"""
+Cold-start import budget for the API process:
+  python -m pytest tests/test_import_budget.py
+
+Imports api.main in a fresh interpreter and fails if a backend-specific
+SDK (cloud storage, Pinecone, Chroma, the LLM, the embedding model stack)
+is loaded at import time, or if the import takes longer or grows the
+process larger than its budget. The budgets are deliberately loose for
+slow CI machines; tighten or relax them with IMPORT_BUDGET_SECONDS and
+IMPORT_BUDGET_RSS_MB.
+"""
+
+from pathlib import Path
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", "3.0"))
+IMPORT_BUDGET_RSS_MB = float(os.environ.get("IMPORT_BUDGET_RSS_MB", "160"))
+
+# Imported only when the backend that needs them is built or first used
+LAZY_MODULES = [
+    "boto3",
+    "google.cloud.storage",
+    "pinecone",
+    "langchain_pinecone",
+    "chromadb",
+    "langchain_chroma",
+    "langchain_google_genai",
+    "langchain_google_community",
+    "langchain_huggingface",
+    "sentence_transformers",
+    "torch"
+]
+
+PROBE = f"""
+import json, resource, sys, time
+started = time.perf_counter()
+import api.main
+seconds = time.perf_counter() - started
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "seconds": seconds,
+    "rss_mb": rss / 1024 / (1024 if sys.platform == "darwin" else 1),  # Bytes on macOS, KiB on Linux
+    "loaded": [name for name in {LAZY_MODULES!r} if name in sys.modules]
+}}))
+"""
+
+def import_api(cwd: Path) -> dict:
+    """Import api.main in a new interpreter and report its import time, peak RSS and loaded SDKs."""
+    environment = {**os.environ, "PYTHONPATH": str(BACKEND_DIR)}
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=cwd,  # Settings read .env from the working directory
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def test_api_import_stays_within_budget(tmp_path):
+    import_api(tmp_path)  # Warm-up: write bytecode caches, as a deployed image already has them
+    result = import_api(tmp_path)
+
+    assert result["loaded"] == [], f"imported at API startup: {', '.join(result['loaded'])}"
+    assert result["seconds"] <= IMPORT_BUDGET_SECONDS, (
+        f"importing api.main took {result['seconds']:.2f}s (budget {IMPORT_BUDGET_SECONDS:.2f}s)"
+    )
+    assert result["rss_mb"] <= IMPORT_BUDGET_RSS_MB, (
+        f"importing api.main peaked at {result['rss_mb']:.0f} MB RSS (budget {IMPORT_BUDGET_RSS_MB:.0f} MB)"
+    )
\ No newline at end of file
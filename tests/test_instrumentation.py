@@ -0,0 +1,121 @@
+"""
+Stage timing metrics and per-request traces:
+  python -m pytest tests/test_instrumentation.py
+
+Runs offline against in-memory stand-ins; no model or vector store backend needed.
+"""
+
+from pathlib import Path
+import asyncio
+import sys
+import uuid
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from prometheus_client import REGISTRY
+from core.tracing import record, server_timing, timed, timings, trace
+
+class ListVectorStore:
+    """Stand-in vector store that keeps upserted chunks in a list."""
+
+    def __init__(self):
+        self.documents = []
+
+    def add_documents(self, documents: list, collection_name: str) -> int:
+        with timed(f"upsert.{collection_name}"):
+            self.documents.extend(documents)
+        return len(documents)
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_trace_follows_tasks_and_executor_calls(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Settings read .env from the working directory
+    from core.config import get_settings
+    from services.vector_store import run_blocking
+    get_settings.cache_clear()
+
+    async def search(collection: str):
+        with timed(f"search.{collection}"):
+            await run_blocking(record, "lookup", 0.002)
+
+    async def request():
+        with trace() as spans:
+            await asyncio.gather(search("pdf"), search("web"))
+        return spans
+
+    spans = asyncio.run(request())
+    assert [stage for stage, _ in spans].count("lookup") == 2
+    assert {"search.pdf", "search.web"} <= {stage for stage, _ in spans}
+
+    header = server_timing(spans, total=0.5)
+    assert 'lookup;desc="2 calls";dur=4.0' in header
+    assert header.endswith("total;dur=500.0")
+    assert timings(spans)["lookup"] == 0.004
+
+    record("outside", 1.0)  # No trace active: metrics only
+    assert len(spans) == 4
+
+def test_pipeline_records_stage_times_and_counts():
+    from services.ingestion import IngestionPipeline
+
+    source = f"test-{uuid.uuid4().hex[:8]}"
+    store = ListVectorStore()
+    pipeline = IngestionPipeline(
+        store,
+        "test_collection",
+        RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=0),
+        batch_size=4,
+        source_type=source
+    )
+    pages = (Document(page_content=" ".join(f"page {n} sentence {i}." for i in range(40))) for n in range(3))
+
+    def annotate(doc, index):
+        doc.metadata["chunk_id"] = f"chunk-{index}"
+
+    with trace() as spans:
+        result = pipeline.run(pages, annotate)
+
+    # Upserts run on the pipeline's worker threads and still join the trace
+    assert {"ingest.parse", "ingest.split", "ingest.store", "upsert.test_collection"} == {stage for stage, _ in spans}
+    assert sample("omniknow_ingestion_stage_seconds_count", source=source, stage="store") == 1
+    assert sample("omniknow_ingestion_stage_items_total", source=source, stage="parse") == 3
+    assert sample("omniknow_ingestion_stage_items_total", source=source, stage="store") == result.chunks_stored
+    assert result.chunks_stored == len(store.documents) > 4
+
+def test_embedding_calls_are_timed():
+    from services.embeddings import InstrumentedEmbeddings
+
+    embeddings = InstrumentedEmbeddings(DeterministicFakeEmbedding(size=8))
+    queries = sample("omniknow_embedding_seconds_count", kind="query")
+    batches = sample("omniknow_embedding_batch_size_sum")
+
+    with trace() as spans:
+        embeddings.embed_documents(["one", "two", "three"])
+        asyncio.run(embeddings.aembed_query("four"))
+
+    assert [stage for stage, _ in spans] == ["embed_documents", "embed_query"]
+    assert sample("omniknow_embedding_seconds_count", kind="query") == queries + 1
+    assert sample("omniknow_embedding_batch_size_sum") == batches + 3
+
+def test_agent_tool_and_llm_calls_are_timed():
+    from agent.callbacks import MetricsCallbackHandler
+    from langchain_core.outputs import ChatGeneration, LLMResult
+    from langchain_core.messages import AIMessage
+
+    handler = MetricsCallbackHandler("test-model")
+    tool_errors = sample("omniknow_agent_tool_errors_total", tool="pdf_search")
+    message = AIMessage(content="ok", usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15})
+
+    with trace() as spans:
+        handler.on_chat_model_start({}, [], run_id=1)
+        handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=1)
+        handler.on_tool_start({"name": "pdf_search"}, "pumps", run_id=2)
+        handler.on_tool_error(RuntimeError("boom"), run_id=2)
+
+    assert [stage for stage, _ in spans] == ["llm.test-model", "tool.pdf_search"]
+    assert sample("omniknow_llm_tokens_total", model="test-model", type="input") == 12
+    assert sample("omniknow_agent_tool_errors_total", tool="pdf_search") == tool_errors + 1
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Knowledge search tool from synchronous and asynchronous callers:
+  python -m pytest tests/test_knowledge_tool.py
+
+Runs offline: the NumPy vector store and a deterministic fake embedding
+model stand in for the configured backends.
+"""
+
+from pathlib import Path
+import asyncio
+import json
+import sys
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+PUMP = "Replace the pump seal when fault E-4711 is shown."
+VALVE = "Clean the valve spring every 200 hours."
+
+@pytest.fixture(params=["false", "true"], ids=["dense", "hybrid"])
+def tool(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Settings read .env from the working directory
+    monkeypatch.setenv("VECTOR_STORE_TYPE", "numpy")
+    monkeypatch.setenv("NUMPY_PERSIST_DIRECTORY", str(tmp_path / "numpy_store"))
+    monkeypatch.setenv("LEXICAL_INDEX_ENABLED", request.param)
+    monkeypatch.setenv("LEXICAL_INDEX_DIRECTORY", str(tmp_path / "lexical_index"))
+    monkeypatch.setenv("REGISTRY_PATH", str(tmp_path / "ingestion.db"))
+    from core.config import get_settings
+    from services.lexical_index import _open_lexical_index
+    from services.registry import get_ingestion_registry
+    import services.numpy_vector_store as numpy_vector_store
+    embeddings = DeterministicFakeEmbedding(size=16)
+    monkeypatch.setattr(numpy_vector_store, "get_embeddings", lambda: embeddings)
+    get_settings.cache_clear()
+    get_ingestion_registry.cache_clear()
+
+    from services.search_service import KnowledgeSearchService
+    from tools.knowledge_tool import KnowledgeSearchTool
+    search_service = KnowledgeSearchService()
+    search_service.vector_store.add_documents([
+        Document(page_content=PUMP, metadata={"chunk_id": "pump", "source": "manual.pdf", "page_number": 3}),
+        Document(page_content=VALVE, metadata={"chunk_id": "valve", "source": "manual.pdf", "page_number": 4})
+    ], "pdf_data_collection")
+    yield KnowledgeSearchTool(search_service=search_service)
+    # Shared collections and indexes point into this test's directory
+    numpy_vector_store._open_collection.cache_clear()
+    _open_lexical_index.cache_clear()
+    get_ingestion_registry.cache_clear()
+    get_settings.cache_clear()
+
+def test_run_matches_arun(tool):
+    results = json.loads(tool._run(PUMP))
+    assert results[0]["content"] == PUMP
+    assert results[0]["collection"] == "pdf" and results[0]["page_number"] == 3
+    assert results == json.loads(asyncio.run(tool._arun(PUMP)))
+
+def test_run_works_inside_a_running_event_loop(tool):
+    async def call_synchronously():
+        return tool._run(PUMP)
+
+    results = json.loads(asyncio.run(call_synchronously()))
+    assert results[0]["content"] == PUMP
\ No newline at end of file
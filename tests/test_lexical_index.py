@@ -0,0 +1,136 @@
+"""
+BM25 lexical index and reciprocal rank fusion:
+  python -m pytest tests/test_lexical_index.py
+
+Runs offline against an index file in a temporary directory.
+"""
+
+from pathlib import Path
+import math
+import subprocess
+import sys
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from langchain_core.documents import Document
+from core.process_lock import hold_process_lock
+from services.lexical_index import LexicalIndex, fuse_ranked, reciprocal_rank_fusion, tokenize
+from services.metadata_filter import parse_filter
+
+CHUNKS = {
+    "pump": "The pump delivers 40 litres per minute. Inspect the pump seal monthly.",
+    "valve": "The relief valve opens at 6 bar. Replace the valve spring yearly.",
+    "filter": "Clean the intake filter after 200 hours of pump operation.",
+    "e4711": "Fault E-4711 means the pressure sensor reads below range; check its wiring.",
+    "e4712": "Fault E-4712 means the pressure sensor reads above range; check its wiring.",
+    "manual": "Firmware v2.3.1 adds fault codes for the pressure sensor."
+}
+
+def chunk(chunk_id: str, text: str, source: str = "manual.pdf") -> Document:
+    return Document(page_content=text, metadata={"chunk_id": chunk_id, "source": source})
+
+def bm25_scores(query: str, texts: dict[str, str], k1: float = 1.2, b: float = 0.75) -> dict[str, float]:
+    """Reference BM25 (Lucene idf) over whole texts, for checking the vectorized scoring."""
+    docs = {chunk_id: tokenize(text) for chunk_id, text in texts.items()}
+    avg_length = sum(len(tokens) for tokens in docs.values()) / len(docs)
+    scores = {}
+    for chunk_id, tokens in docs.items():
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in other for other in docs.values())
+            tf = tokens.count(term)
+            if tf:
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / avg_length))
+        if score:
+            scores[chunk_id] = score
+    return scores
+
+@pytest.fixture
+def index(tmp_path):
+    index = LexicalIndex(tmp_path / "pdf_data_collection.jsonl")
+    index.add_documents([chunk(chunk_id, text) for chunk_id, text in CHUNKS.items()])
+    return index
+
+def ids(results: list[Document]) -> list[str]:
+    return [doc.metadata["chunk_id"] for doc in results]
+
+@pytest.mark.parametrize("text, expected", [
+    ("Pump SEAL", ["pump", "seal"]),
+    ("Fault E-4711.", ["fault", "e-4711", "e", "4711"]),
+    ("firmware v2.3.1", ["firmware", "v2.3.1", "v2", "3", "1"]),
+    ("part AB_12/7", ["part", "ab_12/7", "ab", "12", "7"]),
+    ("don't", ["don", "t"])
+])
+def test_tokenize_keeps_identifiers_whole_and_split(text, expected):
+    assert tokenize(text) == expected
+
+@pytest.mark.parametrize("query", ["pump", "pump seal", "pressure sensor wiring", "fault range", "valve bar yearly"])
+def test_scores_match_reference_bm25(index, query):
+    expected = bm25_scores(query, CHUNKS)
+    ranked = sorted(expected, key=expected.get, reverse=True)
+    assert ids(index.search(query, k=len(CHUNKS))) == ranked
+
+def test_exact_identifier_ranks_its_chunk_first(index):
+    assert ids(index.search("E-4712", k=2)) == ["e4712", "e4711"]
+    assert ids(index.search("e-4711", k=1)) == ["e4711"]
+    assert ids(index.search("v2.3.1", k=1)) == ["manual"]
+    assert index.search("Q-9999") == []
+
+def test_filters_deletes_and_replacements(index):
+    index.add_documents([chunk("other", "The pump in the other manual.", source="other.pdf")])
+    assert ids(index.search("pump", k=5, conditions=parse_filter({"source": "other.pdf"}))) == ["other"]
+    assert "other" not in ids(index.search("pump", k=5, conditions=parse_filter({"source": "manual.pdf"})))
+
+    assert index.delete(["pump", "missing"]) == 1
+    assert "pump" not in ids(index.search("pump seal", k=5))
+
+    index.add_documents([chunk("valve", "The check valve prevents backflow.")])
+    assert ids(index.search("backflow")) == ["valve"]
+    assert index.search("spring") == []  # The replaced text is gone
+
+def test_index_reloads_and_compacts(tmp_path, index):
+    index.delete(["pump"])
+    index.add_documents([chunk("valve", "The check valve prevents backflow.")])
+    expected = ids(index.search("pressure sensor backflow", k=5))
+
+    reloaded = LexicalIndex(tmp_path / "pdf_data_collection.jsonl")
+    assert reloaded.live_count == len(CHUNKS) - 1
+    assert ids(reloaded.search("pressure sensor backflow", k=5)) == expected
+
+    reloaded._compact()
+    assert len(reloaded.ids) == reloaded.live_count
+    assert ids(reloaded.search("pressure sensor backflow", k=5)) == expected
+    assert ids(LexicalIndex(tmp_path / "pdf_data_collection.jsonl").search("pressure sensor backflow", k=5)) == expected
+
+@pytest.mark.skipif(sys.platform == "win32", reason="flock is POSIX only")
+def test_index_directory_is_held_by_one_process(tmp_path):
+    lock_path = tmp_path / "lexical_index" / ".lock"
+    hold_process_lock(lock_path, "LEXICAL_INDEX_ENABLED")
+    hold_process_lock(lock_path, "LEXICAL_INDEX_ENABLED")  # Again from the owner is a no-op
+
+    # A second worker process is refused
+    other = subprocess.run(
+        [sys.executable, "-c", "import sys; from pathlib import Path; from core.process_lock import hold_process_lock; "
+         "hold_process_lock(Path(sys.argv[1]), 'LEXICAL_INDEX_ENABLED')", str(lock_path)],
+        cwd=Path(__file__).resolve().parent.parent / "backend",
+        capture_output=True,
+        text=True
+    )
+    assert other.returncode != 0
+    assert "RuntimeError" in other.stderr and "WEB_CONCURRENCY=1" in other.stderr
+
+def test_reciprocal_rank_fusion():
+    dense = [chunk("a", "A"), chunk("b", "B"), chunk("c", "C")]
+    lexical = [chunk("c", "C"), chunk("d", "D"), chunk("a", "A")]
+
+    fused = fuse_ranked([dense, lexical], k=4, rrf_k=60)
+    assert [doc.metadata["chunk_id"] for doc, _ in fused] == ["a", "c", "b", "d"]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 63)
+    assert fused[1][1] == pytest.approx(1 / 63 + 1 / 61)  # Ties keep first-seen order
+    assert fused[2][1] == pytest.approx(1 / 62)
+
+    assert ids(reciprocal_rank_fusion([dense, lexical], k=2)) == ["a", "c"]
+    assert ids(reciprocal_rank_fusion([dense, []], k=5)) == ["a", "b", "c"]
+    assert reciprocal_rank_fusion([[], []], k=5) == []
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""
+Metadata filter parsing and translation to each backend:
+  python -m pytest tests/test_metadata_filter.py
+
+Runs offline; pure functions only.
+"""
+
+from pathlib import Path
+import sys
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from services.metadata_filter import MetadataIndex, matches, parse_filter, to_chroma_where, to_pinecone_filter
+
+@pytest.mark.parametrize("filter, conditions", [
+    (None, []),
+    ({}, []),
+    ({"source": "manual.pdf"}, [("source", "$eq", "manual.pdf")]),
+    ({"page": {"$eq": 3}}, [("page", "$eq", 3)]),
+    ({"page": {"$ne": 3}}, [("page", "$ne", 3)]),
+    ({"page": {"$gt": 3}}, [("page", "$gt", 3)]),
+    ({"page": {"$gte": 3}}, [("page", "$gte", 3)]),
+    ({"page": {"$lt": 3}}, [("page", "$lt", 3)]),
+    ({"page": {"$lte": 3}}, [("page", "$lte", 3)]),
+    ({"source": {"$in": ["a.pdf", "b.pdf"]}}, [("source", "$in", ["a.pdf", "b.pdf"])]),
+    ({"source": {"$nin": ["a.pdf"]}}, [("source", "$nin", ["a.pdf"])]),
+    (
+        {"source": "manual.pdf", "page": {"$gte": 10, "$lte": 40}},
+        [("source", "$eq", "manual.pdf"), ("page", "$gte", 10), ("page", "$lte", 40)]
+    )
+])
+def test_parse_filter(filter, conditions):
+    assert parse_filter(filter) == conditions
+
+@pytest.mark.parametrize("filter, message", [
+    (["source", "manual.pdf"], "must be an object"),
+    ({"$or": [{"source": "a.pdf"}]}, "top-level filter operator"),
+    ({"page": {}}, "Empty condition"),
+    ({"page": {"$between": [1, 2]}}, "Unsupported filter operator"),
+    ({"source": {"$in": "a.pdf"}}, "needs a list"),
+    ({"source": {"$nin": "a.pdf"}}, "needs a list")
+])
+def test_parse_filter_rejects_malformed_filters(filter, message):
+    with pytest.raises(ValueError, match=message):
+        parse_filter(filter)
+
+@pytest.mark.parametrize("translate", [to_chroma_where, to_pinecone_filter])
+@pytest.mark.parametrize("filter, expected", [
+    (None, None),
+    ({"source": "manual.pdf"}, {"source": {"$eq": "manual.pdf"}}),
+    ({"source": {"$in": ["a.pdf", "b.pdf"]}}, {"source": {"$in": ["a.pdf", "b.pdf"]}}),
+    ({"page": {"$gte": 10, "$lte": 40}}, {"$and": [{"page": {"$gte": 10}}, {"page": {"$lte": 40}}]}),
+    (
+        {"source": "manual.pdf", "page": {"$ne": 2}},
+        {"$and": [{"source": {"$eq": "manual.pdf"}}, {"page": {"$ne": 2}}]}
+    )
+])
+def test_backend_translations(translate, filter, expected):
+    assert translate(parse_filter(filter)) == expected
+
+@pytest.mark.parametrize("filter, expected", [
+    ({"source": "manual.pdf"}, True),
+    ({"source": "other.pdf"}, False),
+    ({"page": {"$ne": 12}}, False),
+    ({"page": {"$gt": 11, "$lt": 13}}, True),
+    ({"page": {"$gte": 13}}, False),
+    ({"page": {"$lte": 12}}, True),
+    ({"source": {"$in": ["a.pdf", "manual.pdf"]}}, True),
+    ({"source": {"$nin": ["a.pdf", "manual.pdf"]}}, False),
+    ({"missing": {"$gt": 0}}, False),  # Absent fields never satisfy a range
+    ({"missing": {"$ne": 0}}, True),
+    ({"source": {"$gt": 3}}, False)  # Incomparable types don't match instead of raising
+])
+def test_matches(filter, expected):
+    assert matches({"source": "manual.pdf", "page": 12}, parse_filter(filter)) is expected
+
+def test_metadata_index_selects_matching_rows():
+    metadatas = [
+        {"source": "a.pdf", "page": 1},
+        {"source": "b.pdf", "page": 2},
+        {"source": "a.pdf", "page": 3},
+        {"source_url": "https://example.com", "page": 4}
+    ]
+    index = MetadataIndex()
+    for row, metadata in enumerate(metadatas):
+        index.add(row, metadata)
+
+    def select(filter: dict, count: int = len(metadatas)) -> list[int] | None:
+        rows = index.select(parse_filter(filter), metadatas, count)
+        return None if rows is None else rows.tolist()
+
+    assert select({}) is None
+    assert select({"source": "a.pdf"}) == [0, 2]
+    assert select({"source": {"$in": ["a.pdf", "b.pdf"]}}) == [0, 1, 2]
+    assert select({"source": "a.pdf", "page": {"$gt": 1}}) == [2]
+    assert select({"page": {"$gte": 3}}) == [2, 3]  # Unindexed field: every row is checked
+    assert select({"source": "a.pdf"}, count=2) == [0]  # Rows beyond count are not yet in use
+    assert select({"source": "c.pdf"}) == []
\ No newline at end of file
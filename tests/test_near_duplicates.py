@@ -0,0 +1,166 @@
+"""
+Near-duplicate suppression through the vector store:
+  python -m pytest tests/test_near_duplicates.py
+
+Runs offline: the NumPy vector store and a deterministic fake embedding
+model stand in for the configured backends.
+"""
+
+from pathlib import Path
+import subprocess
+import sys
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from services.near_duplicates import NearDuplicateIndex, identifier_digest
+
+COLLECTION = "pdf_data_collection"
+
+BOILERPLATE = " ".join(
+    f"Clause {word}: the warranty does not cover damage caused by improper installation, misuse or unauthorised repair."
+    for word in ("one", "two", "three", "four", "five", "six", "seven", "eight")
+)
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Fake embeddings that count the texts embedded for documents."""
+    embedded: int = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+def chunk(chunk_id: str, text: str, source: str = "manual.pdf") -> Document:
+    return Document(page_content=text, metadata={"chunk_id": chunk_id, "source": source})
+
+def fault(code: str) -> str:
+    return f"{BOILERPLATE} Fault {code} means the pressure sensor reads out of range."
+
+def ids(results: list[Document]) -> list[str]:
+    return [doc.metadata["chunk_id"] for doc in results]
+
+@pytest.fixture
+def embeddings():
+    return CountingEmbeddings(size=16)
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, embeddings):
+    monkeypatch.chdir(tmp_path)  # Settings read .env from the working directory
+    monkeypatch.setenv("VECTOR_STORE_TYPE", "numpy")
+    monkeypatch.setenv("NUMPY_PERSIST_DIRECTORY", str(tmp_path / "numpy_store"))
+    monkeypatch.setenv("LEXICAL_INDEX_ENABLED", "true")
+    monkeypatch.setenv("LEXICAL_INDEX_DIRECTORY", str(tmp_path / "lexical_index"))
+    monkeypatch.setenv("NEAR_DUPLICATE_DIRECTORY", str(tmp_path / "near_duplicates"))
+    monkeypatch.setenv("NEAR_DUPLICATE_DETECTION", "true")
+    from core.config import get_settings
+    from services.lexical_index import _open_lexical_index
+    from services.near_duplicates import _open_near_duplicate_index
+    import services.numpy_vector_store as numpy_vector_store
+    monkeypatch.setattr(numpy_vector_store, "get_embeddings", lambda: embeddings)
+    get_settings.cache_clear()
+    yield numpy_vector_store.NumpyVectorStore()
+    # Shared collections and indexes point into this test's directory
+    numpy_vector_store._open_collection.cache_clear()
+    _open_lexical_index.cache_clear()
+    _open_near_duplicate_index.cache_clear()
+    get_settings.cache_clear()
+
+def test_identifier_digest_covers_numbers_and_identifiers_only():
+    assert identifier_digest("Fault E-4711 at 40 bar") == identifier_digest("fault e-4711, rated 40 BAR")
+    assert identifier_digest("Fault E-4711 at 40 bar") != identifier_digest("Fault E-4712 at 40 bar")
+    assert identifier_digest("Fault E-4711 at 40 bar") != identifier_digest("Fault E-4711 at 60 bar")
+    assert identifier_digest("Replace the pump seal") == identifier_digest("Inspect the valve spring")
+
+def test_plan_links_only_near_duplicates_with_the_same_identifiers(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "index.jsonl", threshold=0.9)
+    plan = index.plan([
+        chunk("a", fault("E-4711")),
+        chunk("b", fault("E-4711").replace("improper", "careless", 1)),  # One word edited
+        chunk("c", fault("E-4712")),  # Same wording, different fault code
+        chunk("d", "Clean the intake filter after 200 hours of pump operation.")
+    ])
+    assert ids(plan.unique) == ["a", "c", "d"]
+    assert {chunk_id: canonical for chunk_id, (canonical, _) in plan.links.items()} == {"b": "a"}
+
+    # Digests are persisted with the signatures
+    index.commit(plan)
+    reloaded = NearDuplicateIndex(tmp_path / "index.jsonl", threshold=0.9)
+    plan = reloaded.plan([chunk("e", fault("E-4712")), chunk("f", fault("E-4713"))])
+    assert ids(plan.unique) == ["f"]
+    assert plan.links["e"][0] == "c"
+
+def test_different_identifiers_are_both_embedded(store, embeddings):
+    assert store.add_documents([chunk("e4711", fault("E-4711")), chunk("e4712", fault("E-4712"))], COLLECTION) == 2
+    assert embeddings.embedded == 2
+
+    assert ids(store.lexical_search("E-4712", COLLECTION, k=1)) == ["e4712"]
+    query = embeddings.embed_query(fault("E-4712"))
+    assert ids(store.similarity_search_by_vector(query, COLLECTION, k=1)) == ["e4712"]
+
+def test_linked_duplicate_is_searchable_under_its_own_metadata(store, embeddings):
+    store.add_documents([chunk("manual-1", fault("E-4711"))], COLLECTION)
+    assert store.add_documents([chunk("other-1", fault("E-4711"), source="other.pdf")], COLLECTION) == 0
+    assert embeddings.embedded == 1  # The duplicate reused the stored chunk's vector
+
+    query = embeddings.embed_query(fault("E-4711"))
+    results = store.similarity_search_by_vector(query, COLLECTION, k=1, filter={"source": "other.pdf"})
+    assert ids(results) == ["other-1"]
+    assert results[0].metadata["source"] == "other.pdf"
+    assert set(ids(store.similarity_search_by_vector(query, COLLECTION, k=5))) == {"manual-1", "other-1"}
+
+    assert ids(store.lexical_search("E-4711", COLLECTION, k=5, filter={"source": "other.pdf"})) == ["other-1"]
+    assert set(ids(store.lexical_search("E-4711", COLLECTION, k=5))) == {"manual-1", "other-1"}
+
+def test_deleting_the_embedded_chunk_reembeds_its_duplicates(store, embeddings):
+    store.add_documents([chunk("manual-1", fault("E-4711")), chunk("other-1", fault("E-4711"), source="other.pdf")], COLLECTION)
+    assert embeddings.embedded == 1
+
+    assert store.delete(["manual-1"], COLLECTION) == 1
+    assert embeddings.embedded == 2
+
+    query = embeddings.embed_query(fault("E-4711"))
+    assert ids(store.similarity_search_by_vector(query, COLLECTION, k=5)) == ["other-1"]
+    assert ids(store.lexical_search("E-4711", COLLECTION, k=5)) == ["other-1"]
+
+    # The re-embedded duplicate is now the chunk later duplicates link to
+    assert store.add_documents([chunk("third-1", fault("E-4711"), source="third.pdf")], COLLECTION) == 0
+    assert embeddings.embedded == 2
+
+def test_detection_is_off_by_default(store, embeddings, monkeypatch):
+    monkeypatch.delenv("NEAR_DUPLICATE_DETECTION")
+    from core.config import get_settings
+    get_settings.cache_clear()
+    assert get_settings().near_duplicate_detection is False
+
+    documents = [chunk("manual-1", fault("E-4711")), chunk("other-1", fault("E-4711"), source="other.pdf")]
+    assert store.add_documents(documents, COLLECTION) == 2
+    assert embeddings.embedded == 2
+
+def test_metadata_updates_reach_linked_duplicates(store, embeddings):
+    store.add_documents([chunk("manual-1", fault("E-4711")), chunk("other-1", fault("E-4711"), source="other.pdf")], COLLECTION)
+    assert store.update_metadata({"other-1": {"source": "renamed.pdf"}, "missing": {"source": "x.pdf"}}, COLLECTION) == 1
+
+    query = embeddings.embed_query(fault("E-4711"))
+    assert ids(store.similarity_search_by_vector(query, COLLECTION, k=5, filter={"source": "renamed.pdf"})) == ["other-1"]
+    assert ids(store.lexical_search("E-4711", COLLECTION, k=5, filter={"source": "renamed.pdf"})) == ["other-1"]
+    assert embeddings.embedded == 1
+
+    # The copy kept in the near-duplicate index was updated too, so re-embedding keeps the new metadata
+    store.delete(["manual-1"], COLLECTION)
+    assert store.similarity_search_by_vector(query, COLLECTION, k=5)[0].metadata["source"] == "renamed.pdf"
+
+@pytest.mark.skipif(sys.platform == "win32", reason="flock is POSIX only")
+def test_index_directory_is_held_by_the_process_using_it(store, tmp_path):
+    store.add_documents([chunk("manual-1", fault("E-4711"))], COLLECTION)
+
+    other = subprocess.run(
+        [sys.executable, "-c", "import sys; from pathlib import Path; from core.process_lock import hold_process_lock; "
+         "hold_process_lock(Path(sys.argv[1]), 'NEAR_DUPLICATE_DETECTION')", str(tmp_path / "near_duplicates" / ".lock")],
+        cwd=Path(__file__).resolve().parent.parent / "backend",
+        capture_output=True,
+        text=True
+    )
+    assert other.returncode != 0
+    assert "NEAR_DUPLICATE_DETECTION" in other.stderr
\ No newline at end of file
@@ -0,0 +1,297 @@
+"""
+In-process NumPy vector store:
+  python -m pytest tests/test_numpy_vector_store.py
+
+Runs offline: collections are exercised directly with random unit vectors,
+and a deterministic fake embedding model stands in for the configured one
+where the store is used through the VectorStore API.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import shutil
+import sys
+import threading
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from services.metadata_filter import parse_filter
+from services.numpy_vector_store import NumpyCollection
+
+DIM = 16
+
+def unit_vectors(count: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def add_rows(collection: NumpyCollection, vectors: np.ndarray, prefix: str = "doc", source: str = "manual.pdf"):
+    ids = [f"{prefix}-{i}" for i in range(len(vectors))]
+    collection.add(
+        ids,
+        [f"text of {doc_id}" for doc_id in ids],
+        [{"source": source, "page": i} for i in range(len(vectors))],
+        vectors
+    )
+
+def top_ids(collection: NumpyCollection, query, k: int = 5, filter: dict | None = None) -> list[str]:
+    return [collection.ids[row] for row, _ in collection.search(query, k, conditions=parse_filter(filter))]
+
+@pytest.fixture
+def vectors():
+    return unit_vectors(50)
+
+@pytest.fixture
+def collection(tmp_path, vectors):
+    collection = NumpyCollection(tmp_path / "pdf_data_collection")
+    add_rows(collection, vectors)
+    return collection
+
+def test_search_ranks_by_cosine_similarity(collection, vectors):
+    hits = collection.search(vectors[7] * 3.0, k=5)  # Query scale doesn't matter
+    assert collection.ids[hits[0][0]] == "doc-7"
+    assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+
+    expected = np.argsort(-(vectors @ vectors[7]))[:5]
+    assert top_ids(collection, vectors[7]) == [f"doc-{i}" for i in expected]
+    assert len(collection.search(vectors[0], k=500)) == 50
+
+def test_filtered_search_only_returns_matching_rows(collection, vectors):
+    add_rows(collection, vectors[:5], prefix="other", source="other.pdf")
+
+    assert top_ids(collection, vectors[3], k=3, filter={"source": "other.pdf"})[0] == "other-3"
+    assert all(doc_id.startswith("other-") for doc_id in top_ids(collection, vectors[3], k=10, filter={"source": "other.pdf"}))
+    assert set(top_ids(collection, vectors[3], k=10, filter={"source": "manual.pdf", "page": {"$lt": 2}})) == {"doc-0", "doc-1"}
+    assert top_ids(collection, vectors[3], filter={"source": "missing.pdf"}) == []
+
+def test_adding_an_existing_id_replaces_it(collection, vectors):
+    replacement = unit_vectors(1, seed=1)
+    collection.add(["doc-4"], ["new text"], [{"source": "manual.pdf", "page": 4}], replacement)
+
+    assert collection.live_count == 50
+    hit = collection.search(replacement[0], k=1)[0][0]
+    assert collection.document(hit).page_content == "new text"
+    assert top_ids(collection, vectors[4], k=50).count("doc-4") == 1
+
+def test_deleted_rows_are_not_returned(collection, vectors):
+    assert collection.delete(["doc-3", "doc-3", "missing"]) == 1
+    assert collection.delete(["doc-3"]) == 0
+
+    assert collection.live_count == 49
+    assert "doc-3" not in top_ids(collection, vectors[3], k=50)
+
+def test_collection_reloads_from_disk(tmp_path, collection, vectors):
+    collection.add(["doc-4"], ["new text"], [{"source": "manual.pdf", "page": 4}], unit_vectors(1, seed=1))
+    collection.delete(["doc-3"])
+    expected = top_ids(collection, vectors[10], k=10)
+
+    reloaded = NumpyCollection(tmp_path / "pdf_data_collection")
+    assert reloaded.live_count == 49
+    assert top_ids(reloaded, vectors[10], k=10) == expected
+    assert reloaded.document(reloaded._row_of["doc-4"]).page_content == "new text"
+    assert "doc-3" not in reloaded._row_of
+
+def test_compaction_keeps_live_rows(tmp_path, collection, vectors):
+    collection.add(["doc-4"], ["new text"], [{"source": "manual.pdf", "page": 4}], unit_vectors(1, seed=1))
+    collection.delete([f"doc-{i}" for i in range(20, 30)])
+    expected = top_ids(collection, vectors[12], k=10)
+
+    collection.compact()
+    assert collection.count == collection.live_count == 40
+    assert top_ids(collection, vectors[12], k=10) == expected
+    assert top_ids(NumpyCollection(tmp_path / "pdf_data_collection"), vectors[12], k=10) == expected
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["pdf_data_collection"]
+
+def test_delete_reload_compact_reload(tmp_path, collection, vectors):
+    directory = tmp_path / "pdf_data_collection"
+    collection.delete([f"doc-{i}" for i in range(0, 50, 2)])
+    collection.add(["doc-1"], ["new text"], [{"source": "manual.pdf", "page": 1}], unit_vectors(1, seed=1))
+    expected = top_ids(collection, vectors[9], k=10)
+    assert (directory / "deleted.txt").read_text().split() == [str(row) for row in range(0, 50, 2)]
+
+    # deleted.txt is replayed, and the later row of an upserted id supersedes the earlier one
+    reloaded = NumpyCollection(directory)
+    assert (reloaded.count, reloaded.live_count) == (51, 25)
+    assert top_ids(reloaded, vectors[9], k=10) == expected
+    assert reloaded.document(reloaded._row_of["doc-1"]).page_content == "new text"
+
+    reloaded.compact()
+    assert (reloaded.count, reloaded.live_count) == (25, 25)
+    assert not (directory / "deleted.txt").exists()
+    assert top_ids(reloaded, vectors[9], k=10) == expected
+
+    compacted = NumpyCollection(directory)
+    assert (compacted.count, compacted.live_count) == (25, 25)
+    assert top_ids(compacted, vectors[9], k=10) == expected
+    assert compacted.document(compacted._row_of["doc-1"]).page_content == "new text"
+
+    # Deletes after a compaction refer to the new row numbers
+    compacted.delete(["doc-9"])
+    assert "doc-9" not in top_ids(NumpyCollection(directory), vectors[9], k=25)
+
+def test_search_documents_survive_a_concurrent_compaction(collection, vectors, monkeypatch):
+    collection.delete([f"doc-{i}" for i in range(20)])
+    search = collection.search
+    compacted = []
+
+    def search_then_compact(*args, **kwargs):
+        # Another thread compacts between the scan and the document lookup
+        hits = search(*args, **kwargs)
+        if not compacted:
+            compacted.append(True)
+            collection.compact()
+        return hits
+
+    monkeypatch.setattr(collection, "search", search_then_compact)
+    results = collection.search_documents(vectors[42], k=3)
+    assert compacted and collection.count == 30
+    assert results[0][0].id == "doc-42"
+    assert results[0][0].page_content == "text of doc-42"
+    assert [doc.id for doc, _ in results] == top_ids(collection, vectors[42], k=3)
+
+def test_compaction_runs_once_dead_rows_outnumber_live(tmp_path, collection, vectors, monkeypatch):
+    import services.numpy_vector_store as numpy_vector_store
+    monkeypatch.setattr(numpy_vector_store, "_COMPACTION_MIN_DEAD_ROWS", 10)
+
+    collection.delete([f"doc-{i}" for i in range(25)])
+    assert collection.count == 50  # Half dead: not yet
+    collection.delete(["doc-25"])
+    assert collection.count == collection.live_count == 24
+    assert sorted(NumpyCollection(tmp_path / "pdf_data_collection")._row_of) == sorted(f"doc-{i}" for i in range(26, 50))
+
+def test_interrupted_compaction_is_finished_on_open(tmp_path, collection, vectors):
+    directory = tmp_path / "pdf_data_collection"
+    collection.delete(["doc-0"])
+    expected = top_ids(collection, vectors[0], k=10)
+    compacted_directory = tmp_path / "pdf_data_collection.compact"
+
+    # Crash while the compacted copy was being written: the original is kept
+    compacted_directory.mkdir()
+    (compacted_directory / "documents.jsonl").write_text("{\"id\": \"partial")
+    assert top_ids(NumpyCollection(directory), vectors[0], k=10) == expected
+
+    # Crash between retiring the original and renaming the copy into place
+    collection.compact()
+    directory.rename(compacted_directory.with_name("moved"))
+    shutil.rmtree(compacted_directory, ignore_errors=True)
+    compacted_directory.with_name("moved").rename(compacted_directory)
+    recovered = NumpyCollection(directory)
+    assert not compacted_directory.exists()
+    assert top_ids(recovered, vectors[0], k=10) == expected
+
+def exact_top(vectors: np.ndarray, query: np.ndarray, k: int) -> list[str]:
+    return [f"doc-{i}" for i in np.argsort(-(vectors @ query))[:k]]
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_quantized_search_rescores_in_float32(tmp_path, dtype):
+    vectors = unit_vectors(300)
+    collection = NumpyCollection(tmp_path / "pdf_data_collection", dtype=dtype, rescore_multiplier=4)
+    add_rows(collection, vectors)
+    assert collection._matrix.dtype == np.dtype(dtype)
+
+    for query in vectors[:20]:
+        hits = collection.search(query, k=5)
+        assert [collection.ids[row] for row, _ in hits] == exact_top(vectors, query, 5)
+        for row, score in hits:
+            assert score == pytest.approx(float(vectors[row] @ query), abs=1e-5)  # Exact float32 scores
+
+def test_int8_recalibration_re_encodes_earlier_rows(tmp_path):
+    narrow = unit_vectors(10) * 0.1 + np.eye(DIM, dtype=np.float32)[0]  # Small range on every dimension
+    narrow /= np.linalg.norm(narrow, axis=1, keepdims=True)
+    wide = unit_vectors(20, seed=1)
+    vectors = np.concatenate([narrow, wide])
+    collection = NumpyCollection(tmp_path / "pdf_data_collection", dtype="int8", rescore_multiplier=0)
+
+    add_rows(collection, narrow)
+    first_scale = collection._scale.copy()
+    collection.add([f"doc-{i}" for i in range(10, 30)], ["text"] * 20, [{}] * 20, wide)  # Doubles: recalibrates
+    assert collection._calibrated_rows == 30
+    assert np.all(collection._scale > first_scale)
+
+    # Approximate scan scores of old and new rows decode with the new parameters
+    for query in vectors:
+        for row, score in collection.search(query, k=30):
+            assert score == pytest.approx(float(vectors[row] @ query), abs=0.05)
+    offset, scale = np.load(tmp_path / "pdf_data_collection" / "quantization.npy")
+    assert np.array_equal(offset, collection._offset) and np.array_equal(scale, collection._scale)
+
+def test_search_during_recalibration_uses_one_encoding(tmp_path, monkeypatch):
+    narrow = unit_vectors(10) * 0.1 + np.eye(DIM, dtype=np.float32)[0]
+    narrow /= np.linalg.norm(narrow, axis=1, keepdims=True)
+    collection = NumpyCollection(tmp_path / "pdf_data_collection", dtype="int8", rescore_multiplier=0)
+    add_rows(collection, narrow)
+    expected = collection.search(narrow[3], 10)
+
+    # Hold a search between reading the quantization parameters and scanning the matrix
+    scanning, recalibrated = threading.Event(), threading.Event()
+    scan = NumpyCollection._scan
+
+    def paused_scan(matrix, query, offset, scale):
+        scanning.set()
+        recalibrated.wait(timeout=5)
+        return scan(matrix, query, offset, scale)
+
+    monkeypatch.setattr(NumpyCollection, "_scan", staticmethod(paused_scan))
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        search = pool.submit(collection.search, narrow[3], 10)
+        assert scanning.wait(timeout=5)
+        collection.add([f"doc-{i}" for i in range(10, 30)], ["text"] * 20, [{}] * 20, unit_vectors(20, seed=1))
+        recalibrated.set()
+        hits = search.result(timeout=5)
+
+    assert hits == expected  # Old rows scored with the old codes and parameters, not a mix
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_quantized_collection_reloads_in_its_stored_dtype(tmp_path, dtype):
+    vectors = unit_vectors(100)
+    collection = NumpyCollection(tmp_path / "pdf_data_collection", dtype=dtype)
+    add_rows(collection, vectors)
+    collection.delete(["doc-5"])
+    expected = collection.search(vectors[5], k=5)
+
+    reloaded = NumpyCollection(tmp_path / "pdf_data_collection", dtype="float32")  # Configured dtype is ignored
+    assert reloaded.dtype == np.dtype(dtype)
+    assert reloaded.search(vectors[5], k=5) == expected
+    if dtype == "int8":
+        assert np.array_equal(reloaded._scale, collection._scale)
+
+    # Rows added after a reload land in the same encoding
+    reloaded.add(["extra"], ["extra text"], [{}], unit_vectors(1, seed=2))
+    assert reloaded.ids[reloaded.search(unit_vectors(1, seed=2)[0], k=1)[0][0]] == "extra"
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Settings read .env from the working directory
+    monkeypatch.setenv("VECTOR_STORE_TYPE", "numpy")
+    monkeypatch.setenv("NUMPY_PERSIST_DIRECTORY", str(tmp_path / "numpy_store"))
+    monkeypatch.setenv("LEXICAL_INDEX_DIRECTORY", str(tmp_path / "lexical_index"))
+    monkeypatch.setenv("NEAR_DUPLICATE_DETECTION", "false")
+    from core.config import get_settings
+    from services.lexical_index import _open_lexical_index
+    import services.numpy_vector_store as numpy_vector_store
+    monkeypatch.setattr(numpy_vector_store, "get_embeddings", lambda: DeterministicFakeEmbedding(size=DIM))
+    get_settings.cache_clear()
+    yield numpy_vector_store.NumpyVectorStore()
+    # Shared collections and indexes point into this test's directory
+    numpy_vector_store._open_collection.cache_clear()
+    _open_lexical_index.cache_clear()
+    get_settings.cache_clear()
+
+def test_store_round_trip(store):
+    documents = [
+        Document(page_content=f"the {part} is inspected every {i + 2} months", metadata={"chunk_id": f"c-{i}", "source": "manual.pdf"})
+        for i, part in enumerate(["pump", "valve", "filter", "sensor"])
+    ]
+    assert store.add_documents(documents, "pdf_data_collection") == 4
+
+    results = store.similarity_search(documents[2].page_content, "pdf_data_collection", k=2)
+    assert results[0].metadata["chunk_id"] == "c-2"
+    assert store.similarity_search(documents[2].page_content, "pdf_data_collection", filter={"source": "other.pdf"}) == []
+
+    assert store.delete(["c-2"], "pdf_data_collection") == 1
+    results = store.similarity_search(documents[2].page_content, "pdf_data_collection", k=4)
+    assert sorted(doc.metadata["chunk_id"] for doc in results) == ["c-0", "c-1", "c-3"]
\ No newline at end of file
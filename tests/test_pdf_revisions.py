@@ -0,0 +1,142 @@
+"""
+Incremental re-ingestion of revised PDFs:
+  python -m pytest tests/test_pdf_revisions.py
+
+Runs offline: "PDFs" are JSON lists of page texts read by a stand-in for
+the page extractor, and the NumPy vector store and a deterministic fake
+embedding model stand in for the configured backends.
+"""
+
+from pathlib import Path
+import json
+import sys
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+FILENAME = "manual.pdf"
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Fake embeddings that count the texts embedded for documents."""
+    embedded: int = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+def page_text(topic: str) -> str:
+    """A ~400 character page, so each page is one chunk."""
+    return " ".join(f"{topic} sentence {i} describes the maintenance procedure in detail." for i in range(7))
+
+def extract_json_pages(pdf_path: Path, **kwargs):
+    texts = json.loads(Path(pdf_path).read_text())
+    for page, text in enumerate(texts):
+        yield Document(
+            page_content=text,
+            metadata={"source": str(pdf_path), "total_pages": len(texts), "page": page, "page_label": str(page + 1)}
+        )
+
+@pytest.fixture
+def embeddings():
+    return CountingEmbeddings(size=16)
+
+@pytest.fixture
+def service(tmp_path, monkeypatch, embeddings):
+    monkeypatch.chdir(tmp_path)  # Settings read .env from the working directory
+    monkeypatch.setenv("VECTOR_STORE_TYPE", "numpy")
+    monkeypatch.setenv("NUMPY_PERSIST_DIRECTORY", str(tmp_path / "numpy_store"))
+    monkeypatch.setenv("LEXICAL_INDEX_ENABLED", "true")
+    monkeypatch.setenv("LEXICAL_INDEX_DIRECTORY", str(tmp_path / "lexical_index"))
+    monkeypatch.setenv("REGISTRY_PATH", str(tmp_path / "ingestion.db"))
+    from core.config import get_settings
+    from services.lexical_index import _open_lexical_index
+    from services.registry import get_ingestion_registry
+    import services.numpy_vector_store as numpy_vector_store
+    import services.pdf_service as pdf_service
+    monkeypatch.setattr(numpy_vector_store, "get_embeddings", lambda: embeddings)
+    monkeypatch.setattr(pdf_service, "extract_pages", extract_json_pages)
+    get_settings.cache_clear()
+    get_ingestion_registry.cache_clear()
+    yield pdf_service.PDFService()
+    # Shared collections and indexes point into this test's directory
+    numpy_vector_store._open_collection.cache_clear()
+    _open_lexical_index.cache_clear()
+    get_ingestion_registry.cache_clear()
+    get_settings.cache_clear()
+
+@pytest.fixture
+def write_pdf(tmp_path):
+    def write(name: str, topics: list[str]) -> Path:
+        path = tmp_path / name
+        path.write_text(json.dumps([page_text(topic) for topic in topics]))
+        return path
+    return write
+
+def stored(service) -> dict[str, dict]:
+    """Metadata of every live chunk, by chunk ID."""
+    collection = service.vector_store._get_collection(service.collection_name)
+    return {chunk_id: collection.metadatas[row] for chunk_id, row in collection._row_of.items()}
+
+def pages_of(service, pdf_hash: str) -> dict[str, int]:
+    """Page number of each live chunk of a PDF, by the chunk's text topic."""
+    collection = service.vector_store._get_collection(service.collection_name)
+    return {
+        collection.texts[row].split(" sentence")[0]: collection.metadatas[row]["page_number"]
+        for row in collection._row_of.values() if collection.metadatas[row]["pdf_hash"] == pdf_hash
+    }
+
+def test_inserted_page_reembeds_only_that_page(service, write_pdf, embeddings):
+    assert service.process_pdf(write_pdf("v1.pdf", ["Pump", "Valve", "Filter"]), filename=FILENAME) == 3
+    old_hash = service.registry.find_by_name("pdf", FILENAME).key
+
+    revision = write_pdf("v2.pdf", ["Cover", "Pump", "Valve", "Filter"])
+    assert service.process_pdf(revision, revision_of=FILENAME) == 1
+    assert embeddings.embedded == 4
+
+    new_hash = service.registry.find_by_name("pdf", FILENAME).key
+    assert new_hash != old_hash and service.registry.get(old_hash) is None
+    assert len(service.registry.get_chunk_ids(new_hash)) == 4
+
+    # Reused chunks moved to the new hash and their new page numbers
+    assert pages_of(service, new_hash) == {"Cover": 1, "Pump": 2, "Valve": 3, "Filter": 4}
+    assert pages_of(service, old_hash) == {}
+    assert all(metadata["total_pages"] == 4 and metadata["source"] == FILENAME for metadata in stored(service).values())
+
+    query = embeddings.embed_query(page_text("Valve"))
+    results = service.vector_store.similarity_search_by_vector(query, service.collection_name, k=1, filter={"pdf_hash": new_hash})
+    assert results[0].metadata["page_number"] == 3
+    lexical = service.vector_store.lexical_search("Valve", service.collection_name, k=1, filter={"pdf_hash": new_hash})
+    assert lexical[0].metadata["page_number"] == 3
+    assert service.vector_store.lexical_search("Valve", service.collection_name, filter={"pdf_hash": old_hash}) == []
+
+def test_changed_and_removed_pages_are_deleted(service, write_pdf, embeddings):
+    service.process_pdf(write_pdf("v1.pdf", ["Pump", "Valve", "Filter"]), filename=FILENAME)
+
+    assert service.process_pdf(write_pdf("v2.pdf", ["Valve (revised)", "Pump"]), revision_of=FILENAME) == 1
+    new_hash = service.registry.find_by_name("pdf", FILENAME).key
+    assert pages_of(service, new_hash) == {"Valve (revised)": 1, "Pump": 2}
+    assert len(stored(service)) == 2
+
+def test_repeated_pages_are_matched_one_to_one(service, write_pdf, embeddings):
+    service.process_pdf(write_pdf("v1.pdf", ["Notes", "Pump", "Notes"]), filename=FILENAME)
+
+    assert service.process_pdf(write_pdf("v2.pdf", ["Notes", "Notes", "Notes", "Pump"]), revision_of=FILENAME) == 1
+    new_hash = service.registry.find_by_name("pdf", FILENAME).key
+    chunk_ids = service.registry.get_chunk_ids(new_hash)
+    assert len(chunk_ids) == len(set(chunk_ids)) == 4
+    assert sorted(metadata["page_number"] for metadata in stored(service).values()) == [1, 2, 3, 4]
+
+def test_revision_back_to_an_earlier_file_keeps_chunk_ids_distinct(service, write_pdf, embeddings):
+    original = write_pdf("v1.pdf", ["Pump", "Valve", "Filter"])
+    service.process_pdf(original, filename=FILENAME)
+    service.process_pdf(write_pdf("v2.pdf", ["Valve", "Gasket"]), revision_of=FILENAME)
+
+    # Same file as v1, so its fresh chunks are numbered under v1's hash again
+    assert service.process_pdf(original, revision_of=FILENAME) == 2
+    pdf_hash = service.registry.find_by_name("pdf", FILENAME).key
+    chunk_ids = service.registry.get_chunk_ids(pdf_hash)
+    assert len(chunk_ids) == len(set(chunk_ids)) == 3
+    assert pages_of(service, pdf_hash) == {"Pump": 1, "Valve": 2, "Filter": 3}
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+Batched, parallel Pinecone upserts against an in-process stand-in index:
+  python -m pytest tests/test_pinecone_upserts.py
+
+Runs offline: FakePineconeIndex implements the parts of the Pinecone index
+API the vector store uses (upsert, query, fetch, delete), and a deterministic
+fake embedding model stands in for the configured one.
+"""
+
+from pathlib import Path
+from types import SimpleNamespace
+import os
+import sys
+import threading
+import time
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+class FakePineconeIndex:
+    """In-process Pinecone index: namespaces of id -> (values, metadata), with injectable upsert failures."""
+
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.namespaces = {}
+        self.upsert_sizes = []
+        self.fail_next = 0  # Upsert requests to fail before any succeed
+        self.fail_status = None  # HTTP status carried by injected failures
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: list[dict], namespace: str = ""):
+        with self._lock:
+            self._active += 1
+            self.max_concurrent = max(self.max_concurrent, self._active)
+        try:
+            time.sleep(self.latency)
+            with self._lock:
+                if self.fail_next:
+                    self.fail_next -= 1
+                    error = ConnectionError("injected upsert failure")
+                    error.status = self.fail_status
+                    raise error
+                records = self.namespaces.setdefault(namespace, {})
+                for vector in vectors:
+                    records[vector["id"]] = (np.asarray(vector["values"]), dict(vector["metadata"]))
+                self.upsert_sizes.append(len(vectors))
+            return {"upserted_count": len(vectors)}
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def query(self, vector, top_k: int, include_metadata: bool = True, namespace: str = "", filter: dict | None = None):
+        assert filter is None, "the stand-in index does not implement metadata filters"
+        records = self.namespaces.get(namespace, {})
+        query = np.asarray(vector)
+        scored = sorted(
+            (
+                float(values @ query / (np.linalg.norm(values) * np.linalg.norm(query))),
+                chunk_id,
+                metadata
+            )
+            for chunk_id, (values, metadata) in records.items()
+        )[::-1][:top_k]
+        return {"matches": [{"id": chunk_id, "score": score, "metadata": dict(metadata)} for score, chunk_id, metadata in scored]}
+
+    def fetch(self, ids: list[str], namespace: str = ""):
+        records = self.namespaces.get(namespace, {})
+        return SimpleNamespace(vectors={
+            chunk_id: SimpleNamespace(id=chunk_id, values=list(records[chunk_id][0]), metadata=dict(records[chunk_id][1]))
+            for chunk_id in ids if chunk_id in records
+        })
+
+    def delete(self, ids: list[str], namespace: str = ""):
+        records = self.namespaces.get(namespace, {})
+        for chunk_id in ids:
+            records.pop(chunk_id, None)
+
+def chunks(count: int, prefix: str = "chunk") -> list[Document]:
+    return [
+        Document(
+            page_content=f"{prefix} {i}: the pump {i} is rated for {i * 7} litres per minute at {i % 13} bar",
+            metadata={"chunk_id": f"{prefix}-{i}", "source": "manual.pdf", "page": i}
+        )
+        for i in range(count)
+    ]
+
+@pytest.fixture(scope="module")
+def settings(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("pinecone")
+    cwd = os.getcwd()
+    os.chdir(tmp)  # Settings read .env from the working directory
+    environment = dict(
+        PINECONE_UPSERT_BATCH_SIZE="10",
+        PINECONE_UPSERT_CONCURRENCY="3",
+        PINECONE_UPSERT_MAX_RETRIES="2",
+        PINECONE_UPSERT_RETRY_BACKOFF_SECONDS="0.01",
+        NEAR_DUPLICATE_DETECTION="false",  # Every chunk reaches the index
+        LEXICAL_INDEX_ENABLED="false"
+    )
+    os.environ.update(environment)
+    from core.config import get_settings
+    get_settings.cache_clear()
+    yield get_settings()
+    for name in environment:
+        del os.environ[name]
+    get_settings.cache_clear()
+    os.chdir(cwd)
+
+@pytest.fixture
+def store(settings):
+    import services.vector_store as vector_store
+    original = vector_store.get_embeddings
+    vector_store.get_embeddings = lambda: DeterministicFakeEmbedding(size=16)
+    store = vector_store.PineconeVectorStore(index=FakePineconeIndex())
+    vector_store.get_embeddings = original
+    yield store
+    store.close()
+
+def test_upserts_in_concurrent_batches(store):
+    assert store.add_documents(chunks(45), "pdf_data_collection") == 45
+
+    index = store.index
+    assert sorted(index.upsert_sizes) == [5, 10, 10, 10, 10]
+    assert len(index.namespaces["pdf_data_collection"]) == 45
+    assert 1 < index.max_concurrent <= 3
+
+def test_failed_batches_are_retried_without_duplicates(store):
+    store.index.fail_next = 2
+    assert store.add_documents(chunks(30), "pdf_data_collection") == 30
+
+    # The retried batches replace rather than duplicate
+    assert store.add_documents(chunks(30), "pdf_data_collection") == 30
+    assert len(store.index.namespaces["pdf_data_collection"]) == 30
+    assert sum(store.index.upsert_sizes) == 60
+
+def test_upsert_fails_after_retries_are_exhausted(store):
+    store.index.fail_next = 3  # First attempt + 2 retries
+    with pytest.raises(ConnectionError):
+        store.add_documents(chunks(5), "pdf_data_collection")
+
+def test_client_errors_are_not_retried(store):
+    store.index.fail_next = 1
+    store.index.fail_status = 400
+    with pytest.raises(ConnectionError):
+        store.add_documents(chunks(5), "pdf_data_collection")
+    assert store.index.fail_next == 0
+    assert store.index.upsert_sizes == []
+
+def test_upserted_chunks_are_searchable_and_deletable(store):
+    documents = chunks(20)
+    store.add_documents(documents, "web_data_collection")
+
+    embedding = store.embeddings.embed_query(documents[7].page_content)
+    results = store.similarity_search_by_vector(embedding, "web_data_collection", k=3)
+    assert results[0].page_content == documents[7].page_content
+    assert results[0].metadata["chunk_id"] == "chunk-7"
+
+    assert store.delete(["chunk-7"], "web_data_collection") == 1
+    results = store.similarity_search_by_vector(embedding, "web_data_collection", k=3)
+    assert "chunk-7" not in {doc.metadata["chunk_id"] for doc in results}
+
+def test_near_duplicates_are_upserted_with_the_fetched_vector(store, tmp_path, monkeypatch):
+    monkeypatch.setenv("NEAR_DUPLICATE_DETECTION", "true")
+    monkeypatch.setenv("NEAR_DUPLICATE_DIRECTORY", str(tmp_path / "near_duplicates"))
+    from core.config import get_settings
+    from services.near_duplicates import _open_near_duplicate_index
+    get_settings.cache_clear()
+    try:
+        original = chunks(1)[0]
+        duplicate = Document(page_content=original.page_content, metadata={**original.metadata, "chunk_id": "copy-0", "source": "copy.pdf"})
+        assert store.add_documents([original], "pdf_data_collection") == 1
+        assert store.add_documents([duplicate], "pdf_data_collection") == 0
+
+        records = store.index.namespaces["pdf_data_collection"]
+        assert np.array_equal(records["copy-0"][0], records["chunk-0"][0])
+        assert records["copy-0"][1] == {**duplicate.metadata, "text": duplicate.page_content}
+    finally:
+        monkeypatch.undo()
+        _open_near_duplicate_index.cache_clear()
+        get_settings.cache_clear()
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Ingestion registry claim / complete / release state machine:
+  python -m pytest tests/test_registry.py
+
+Runs offline against a SQLite registry in a temporary directory, and also
+against PostgreSQL when REGISTRY_TEST_DATABASE_URL names a scratch
+database (its registry tables are dropped before each test).
+"""
+
+from pathlib import Path
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from services.registry import STATUS_COMPLETED, STATUS_PROCESSING, PostgresIngestionRegistry, SQLiteIngestionRegistry
+
+DATABASE_URL = os.environ.get("REGISTRY_TEST_DATABASE_URL")
+
+@pytest.fixture(params=[
+    "sqlite",
+    pytest.param("postgres", marks=pytest.mark.skipif(not DATABASE_URL, reason="REGISTRY_TEST_DATABASE_URL is not set"))
+])
+def open_registry(request, tmp_path):
+    """Opens registries on one shared store, as separate worker processes would."""
+    opened = []
+    if request.param == "postgres":
+        import psycopg
+        with psycopg.connect(DATABASE_URL) as conn:
+            conn.execute("DROP TABLE IF EXISTS sources, chunks, leases")
+    
+    def open_registry(claim_ttl_seconds: int = 600):
+        if request.param == "sqlite":
+            registry = SQLiteIngestionRegistry(str(tmp_path / "ingestion.db"), claim_ttl_seconds)
+        else:
+            registry = PostgresIngestionRegistry(DATABASE_URL, claim_ttl_seconds)
+        opened.append(registry)
+        return registry
+    
+    yield open_registry
+    for registry in opened:
+        registry.close()
+
+@pytest.fixture
+def registry(open_registry):
+    return open_registry()
+
+def test_claim_is_exclusive_until_completed(registry):
+    assert registry.claim("hash-a", "pdf", "manual.pdf")
+    assert registry.get("hash-a").status == STATUS_PROCESSING
+    assert not registry.claim("hash-a", "pdf", "manual.pdf")  # In flight elsewhere
+    assert not registry.is_processed("hash-a")
+
+    registry.complete("hash-a", ["hash-a-2", "hash-a-0", "hash-a-1"], {"pages": 3})
+    record = registry.get("hash-a")
+    assert record.status == STATUS_COMPLETED
+    assert record.chunks_count == 3
+    assert record.metadata == {"pages": 3}
+    assert registry.is_processed("hash-a")
+    assert registry.get_chunk_ids("hash-a") == ["hash-a-2", "hash-a-0", "hash-a-1"]  # Chunk order kept
+    assert registry.find_source_of_chunk("hash-a-0") == "hash-a"
+
+    assert not registry.claim("hash-a", "pdf", "manual.pdf")  # Already ingested
+    assert registry.claim("hash-a", "pdf", "manual.pdf", force=True)
+
+def test_claim_is_atomic_across_connections(open_registry):
+    first = open_registry()
+    second = open_registry()  # Another worker process
+
+    assert first.claim("hash-a", "pdf", "manual.pdf")
+    assert not second.claim("hash-a", "pdf", "manual.pdf")
+    first.complete("hash-a", ["hash-a-0"])
+    assert second.is_processed("hash-a")
+
+def test_release_of_a_first_ingestion_forgets_the_source(registry):
+    registry.claim("hash-a", "pdf", "manual.pdf")
+    registry.release("hash-a")
+
+    assert registry.get("hash-a") is None
+    assert registry.claim("hash-a", "pdf", "manual.pdf")
+
+def test_release_after_failed_refresh_keeps_the_completed_record(registry):
+    registry.claim("hash-a", "web", "https://example.com/docs")
+    registry.complete("hash-a", ["hash-a-0", "hash-a-1"], {"etag": '"v1"'})
+
+    assert registry.claim("hash-a", "web", "https://example.com/docs", force=True)  # Refresh starts
+    registry.release("hash-a")  # ... and fails
+
+    record = registry.get("hash-a")
+    assert record.status == STATUS_COMPLETED
+    assert record.chunks_count == 2
+    assert record.metadata == {"etag": '"v1"'}
+    assert registry.get_chunk_ids("hash-a") == ["hash-a-0", "hash-a-1"]
+    assert registry.find_by_name("web", "https://example.com/docs").key == "hash-a"
+
+def test_abandoned_claim_is_taken_over_after_ttl(open_registry):
+    live = open_registry(claim_ttl_seconds=3600)
+    live.claim("hash-a", "pdf", "manual.pdf")
+    assert not live.claim("hash-a", "pdf", "manual.pdf")
+
+    expired = open_registry(claim_ttl_seconds=0)
+    expired.claim("hash-b", "pdf", "manual.pdf")
+    assert expired.claim("hash-b", "pdf", "manual-v2.pdf")  # Claim of a crashed worker
+    assert expired.get("hash-b").name == "manual-v2.pdf"
+
+def test_held_claims_are_refreshed_until_finished(open_registry):
+    holder = open_registry(claim_ttl_seconds=1)  # Refreshed every 0.25s
+    other = open_registry(claim_ttl_seconds=1)
+
+    assert holder.claim("hash-a", "pdf", "manual.pdf")
+    time.sleep(1.5)
+    assert not other.claim("hash-a", "pdf", "manual.pdf")  # Still being ingested, past the TTL
+    holder.complete("hash-a", ["hash-a-0"])
+
+    assert holder.claim("hash-b", "pdf", "other.pdf")
+    holder._heartbeat.drop("hash-b")  # The holder crashes
+    time.sleep(1.5)
+    assert other.claim("hash-b", "pdf", "other.pdf")
+
+def test_lease_has_one_holder_until_it_expires(open_registry):
+    first = open_registry()
+    second = open_registry()
+
+    assert first.acquire_lease("web_refresh", "pod-a:7", 60)
+    assert not second.acquire_lease("web_refresh", "pod-b:7", 60)
+    assert first.acquire_lease("web_refresh", "pod-a:7", 0)  # Renewed by its holder, then left to expire
+    assert second.acquire_lease("web_refresh", "pod-b:7", 60)
+    assert not first.acquire_lease("web_refresh", "pod-a:7", 60)
+
+def test_lookup_by_name_and_removal(registry):
+    registry.claim("hash-a", "pdf", "manual.pdf")
+    registry.complete("hash-a", ["hash-a-0"])
+    registry.claim("hash-b", "pdf", "manual.pdf")  # A newer revision, still processing
+    registry.claim("hash-c", "web", "https://example.com")
+    registry.complete("hash-c", ["hash-c-0"])
+
+    assert registry.find_by_name("pdf", "manual.pdf").key == "hash-a"  # Completed sources only
+    assert [record.key for record in registry.list_sources("pdf")] == ["hash-a", "hash-b"]
+    assert len(registry.list_sources()) == 3
+
+    registry.remove("hash-a")
+    assert registry.get("hash-a") is None
+    assert registry.get_chunk_ids("hash-a") == []
+    assert registry.find_source_of_chunk("hash-a-0") is None
+    assert registry.find_by_name("pdf", "manual.pdf") is None
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""
+Staging cache eviction and pins shared between worker processes:
+  python -m pytest tests/test_staging.py
+
+Runs offline against a cache in a temporary directory; a second worker
+process is started with the same directory where pins must cross processes.
+"""
+
+from pathlib import Path
+import subprocess
+import sys
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND))
+
+from services.staging import StagingCache
+
+# Pins a hash in a separate process until its stdin is closed
+PIN_IN_OTHER_WORKER = """
+import sys
+from services.staging import StagingCache
+cache = StagingCache(sys.argv[1], max_bytes=10**9)
+cache.pin(sys.argv[2])
+print("pinned", flush=True)
+sys.stdin.read()
+cache.unpin(sys.argv[2])
+"""
+
+def stage(cache: StagingCache, tmp_path: Path, content_hash: str, size: int = 100) -> Path:
+    source = tmp_path / f"{content_hash}.upload"
+    source.write_bytes(b"x" * size)
+    return cache.put(source, content_hash)
+
+def test_least_recently_used_unpinned_files_are_evicted(tmp_path):
+    cache = StagingCache(str(tmp_path / "staging"), max_bytes=250)
+    first = stage(cache, tmp_path, "a" * 64)
+    with cache.pinned("b" * 64):
+        second = stage(cache, tmp_path, "b" * 64)
+        third = stage(cache, tmp_path, "c" * 64)
+        assert not first.exists()  # Oldest, unpinned
+        stage(cache, tmp_path, "d" * 64)
+        assert second.exists() and not third.exists()
+
+    stage(cache, tmp_path, "e" * 64)
+    assert not second.exists()  # Unpinned, so evicted once it is the oldest
+
+@pytest.mark.skipif(sys.platform == "win32", reason="flock is POSIX only")
+def test_pins_of_another_worker_process_prevent_eviction(tmp_path):
+    directory = tmp_path / "staging"
+    cache = StagingCache(str(directory), max_bytes=150)
+    pinned_hash = "a" * 64
+    staged = stage(cache, tmp_path, pinned_hash)
+
+    worker = subprocess.Popen(
+        [sys.executable, "-c", PIN_IN_OTHER_WORKER, str(directory), pinned_hash],
+        cwd=BACKEND,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    try:
+        assert worker.stdout.readline().strip() == "pinned"
+        stage(cache, tmp_path, "b" * 64)  # Over budget; the oldest file is pinned elsewhere
+        assert staged.exists()
+    finally:
+        worker.stdin.close()
+        worker.wait(timeout=30)
+
+    stage(cache, tmp_path, "c" * 64)
+    assert not staged.exists()
+    assert not (directory / "pins" / f"{pinned_hash}.pin").exists()
\ No newline at end of file
@@ -0,0 +1,219 @@
+"""
+Conditional web refresh against a local HTTP stand-in server:
+  python -m pytest tests/test_web_refresh.py
+
+Runs offline: the NumPy vector store and a deterministic fake embedding
+model stand in for the configured backends.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import asyncio
+import sys
+import threading
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Fake embeddings that count the texts embedded for documents."""
+    embedded: int = 0
+    
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+def paragraph(topic: str) -> str:
+    """A ~400 character paragraph, so each paragraph is one chunk."""
+    return " ".join(f"{topic} sentence {i} describes the maintenance procedure in detail." for i in range(7))
+
+def html_page(paragraphs: list[str]) -> str:
+    body = "\n\n".join(f"<p>{text}</p>" for text in paragraphs)
+    return f"<html lang='en'><head><title>Docs</title></head><body>{body}</body></html>"
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves server.pages: path -> (html, etag or None, last_modified or None)."""
+    
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        if self.path not in self.server.pages:
+            self.send_error(404)
+            return
+        html, etag, last_modified = self.server.pages[self.path]
+        
+        if (etag and self.headers.get("If-None-Match") == etag) or (
+            not etag and last_modified and self.headers.get("If-Modified-Since") == last_modified
+        ):
+            self.send_response(304)
+            self.end_headers()
+            return
+        
+        body = html.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        if last_modified:
+            self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    httpd.pages = {}
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+
+@pytest.fixture(scope="module")
+def embeddings():
+    return CountingEmbeddings(size=32)
+
+@pytest.fixture(scope="module")
+def web_service(tmp_path_factory, embeddings):
+    tmp = tmp_path_factory.mktemp("refresh")
+    from core.config import get_settings
+    from services.registry import get_ingestion_registry
+    import services.numpy_vector_store as numpy_vector_store
+    from services.web_service import WebService
+    
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(tmp)  # Settings read .env from the working directory
+        patch.setenv("VECTOR_STORE_TYPE", "numpy")
+        patch.setenv("NUMPY_PERSIST_DIRECTORY", str(tmp / "numpy_store"))
+        patch.setenv("LEXICAL_INDEX_DIRECTORY", str(tmp / "lexical_index"))
+        patch.setenv("REGISTRY_PATH", str(tmp / "ingestion.db"))
+        patch.setattr(numpy_vector_store, "get_embeddings", lambda: embeddings)
+        get_settings.cache_clear()
+        get_ingestion_registry.cache_clear()
+        yield WebService()
+    get_settings.cache_clear()
+    get_ingestion_registry.cache_clear()
+
+def url_of(server, path: str) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+def stored_chunk_ids(web_service) -> set[str]:
+    collection = web_service.vector_store._get_collection(web_service.collection_name)
+    return set(collection._row_of)
+
+def stored_chunk_numbers(web_service, chunk_ids: list[str]) -> list[int]:
+    collection = web_service.vector_store._get_collection(web_service.collection_name)
+    return [collection.metadatas[collection._row_of[chunk_id]]["chunk_number"] for chunk_id in chunk_ids]
+
+def test_unchanged_page_costs_one_304(server, web_service, embeddings):
+    paragraphs = [paragraph(topic) for topic in ("Pump", "Valve", "Filter", "Sensor")]
+    server.pages["/etag"] = (html_page(paragraphs), '"v1"', None)
+    url = url_of(server, "/etag")
+    
+    assert web_service.process_url(url) > 0
+    embedded = embeddings.embedded
+    
+    result = web_service.refresh_url(url)
+    assert result == {"url": url, "status": "not_modified", "chunks_embedded": 0, "chunks_deleted": 0}
+    assert server.requests[-1][1].get("If-None-Match") == '"v1"'
+    assert embeddings.embedded == embedded
+
+def test_changed_page_embeds_only_changed_chunks(server, web_service, embeddings):
+    url = url_of(server, "/etag")
+    before = set(web_service.registry.get_chunk_ids(web_service._calculate_url_hash(url)))
+    
+    # One paragraph edited, one removed, one added; the others are unchanged
+    paragraphs = [paragraph(topic) for topic in ("Pump", "Valve (revised)", "Sensor", "Gasket")]
+    server.pages["/etag"] = (html_page(paragraphs), '"v2"', None)
+    embedded = embeddings.embedded
+    
+    result = web_service.refresh_url(url)
+    after = web_service.registry.get_chunk_ids(web_service._calculate_url_hash(url))
+    
+    assert result["status"] == "updated"
+    assert 0 < result["chunks_embedded"] < len(after)
+    assert embeddings.embedded - embedded == result["chunks_embedded"]
+    assert result["chunks_deleted"] == len(before - set(after))
+    assert before - set(after) and not (before - set(after)) & stored_chunk_ids(web_service)
+    assert set(after) <= stored_chunk_ids(web_service)
+    assert stored_chunk_numbers(web_service, after) == list(range(1, len(after) + 1))
+    
+    # The new validator is used for the next refresh
+    assert web_service.refresh_url(url)["status"] == "not_modified"
+
+def test_reused_chunks_are_renumbered(server, web_service, embeddings):
+    server.pages["/moved"] = (html_page([paragraph(topic) for topic in ("Intro", "Pump", "Valve", "Filter")]), '"m1"', None)
+    url = url_of(server, "/moved")
+    web_service.process_url(url)
+    
+    # The first paragraph is removed, so every other chunk moves up one place
+    server.pages["/moved"] = (html_page([paragraph(topic) for topic in ("Pump", "Valve", "Filter")]), '"m2"', None)
+    result = web_service.refresh_url(url)
+    after = web_service.registry.get_chunk_ids(web_service._calculate_url_hash(url))
+    
+    assert result["chunks_embedded"] == 0 and result["chunks_deleted"] > 0
+    assert stored_chunk_numbers(web_service, after) == list(range(1, len(after) + 1))
+
+def test_last_modified_validator(server, web_service):
+    stamp = "Wed, 01 Oct 2025 10:00:00 GMT"
+    server.pages["/dated"] = (html_page([paragraph("Bearing")]), None, stamp)
+    url = url_of(server, "/dated")
+    
+    web_service.process_url(url)
+    assert web_service.refresh_url(url)["status"] == "not_modified"
+    assert server.requests[-1][1].get("If-Modified-Since") == stamp
+
+def test_same_content_without_validators_embeds_nothing(server, web_service, embeddings):
+    server.pages["/plain"] = (html_page([paragraph("Motor"), paragraph("Belt")]), None, None)
+    url = url_of(server, "/plain")
+    
+    web_service.process_url(url)
+    embedded = embeddings.embedded
+    rows = web_service.vector_store._get_collection(web_service.collection_name).count
+    result = web_service.refresh_url(url)
+    
+    assert result["status"] == "unchanged"
+    assert embeddings.embedded == embedded
+    assert web_service.vector_store._get_collection(web_service.collection_name).count == rows  # Nothing was rewritten
+
+def test_refresh_untracked_url_ingests_it(server, web_service):
+    server.pages["/new"] = (html_page([paragraph("Coupling")]), '"n1"', None)
+    result = web_service.refresh_url(url_of(server, "/new"))
+    
+    assert result["status"] == "new"
+    assert result["chunks_embedded"] > 0
+
+def test_refresh_all_is_mostly_304s(server, web_service, embeddings):
+    server.pages["/etag"] = (server.pages["/etag"][0], '"v2"', None)
+    embedded = embeddings.embedded
+    
+    summary = web_service.refresh_all()
+    
+    assert summary["pages"] == 5
+    assert summary["failed"] == 0
+    assert summary["not_modified"] == 4  # /etag, /moved, /dated, /new
+    assert summary["unchanged"] == 1  # /plain sends no validators, so it is re-fetched and diffed
+    assert embeddings.embedded == embedded
+
+def test_scheduled_refresh_is_queued_by_one_worker(web_service, monkeypatch):
+    from api.routes import web
+    hosts = iter(["pod-a", "pod-b"])
+    monkeypatch.setattr(web.socket, "gethostname", lambda: next(hosts))
+    queued_by = []
+    monkeypatch.setattr(web, "submit_refresh_all", lambda service: queued_by.append(asyncio.current_task()))
+    
+    async def run_two_workers():
+        workers = [asyncio.create_task(web.refresh_periodically(web_service, 0.05)) for _ in range(2)]
+        await asyncio.sleep(0.5)
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    
+    asyncio.run(run_two_workers())
+    assert len(queued_by) >= 3
+    assert len(set(queued_by)) == 1  # The lease holder renewed it every round
\ No newline at end of file